@@ -1,7 +1,6 @@
 from django.contrib import admin
 
 from .models import Hall, Service, Client, Employee, Visit
-from .time_slots import update_status_visits
 
 
 # Register your models here.
@@ -15,13 +14,18 @@ class EmployeeAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'phone_number', 'position', 'get_halls', 'get_services')
     list_display_links = ('id', 'user')
     search_fields = ('user__username', 'phone_number', 'position', 'halls__name', 'services__name')
+    readonly_fields = ('service_halls',)  # Заполняется автоматически по залам и услугам
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_related()
 
     def get_halls(self, obj):
-        return ', '.join([hall.name for hall in obj.halls.all()]) if obj.halls.exists() else "Нет залов"
+        # Используем предзагруженные залы вместо отдельных запросов exists() и all()
+        return ', '.join([hall.name for hall in obj.halls.all()]) or "Нет залов"
     get_halls.short_description = 'Залы'
 
     def get_services(self, obj):
-        return ', '.join([service.name for service in obj.services.all()]) if obj.services.exists() else "Нет услуг"
+        return ', '.join([service.name for service in obj.services.all()]) or "Нет услуг"
     get_services.short_description = 'Услуги'
 
 
@@ -38,11 +42,18 @@ class ServiceAdmin(admin.ModelAdmin):
 
 
 class VisitAdmin(admin.ModelAdmin):
-    update_status_visits()
-    list_display = ('id', 'client', 'employee', 'hall', 'service', 'date', 'time', 'status')
+    list_display = ('id', 'client', 'employee', 'hall', 'service', 'date', 'time', 'get_status')
     list_display_links = ('id', 'employee')
     search_fields = ('client', 'employee', 'hall', 'service', 'date', 'time', 'status')
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_effective_status()
+
+    def get_status(self, obj):
+        return obj.effective_status
+    get_status.short_description = 'Статус'
+    get_status.admin_order_field = 'effective_status'
+
 
 admin.site.register(Client, ClientAdmin)
 admin.site.register(Employee, EmployeeAdmin)
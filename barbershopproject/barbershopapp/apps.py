@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class BarbershopappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'barbershopapp'
+
+    def ready(self):
+        from . import signals  # noqa: F401 Подключаем обработчики сигналов
@@ -0,0 +1,219 @@
+"""
+Асинхронные варианты читающих эндпоинтов для запуска под ASGI (uvicorn, daphne).
+
+DRF не поддерживает асинхронные обработчики, поэтому здесь обычные async-view Django:
+аутентификация по токену и ответы повторяют синхронные представления DRF, запросы
+к базе идут через асинхронный ORM (aget, afirst, async for) и, если настроена реплика,
+читают с неё. Пока запрос ждёт базу, поток событийного цикла обслуживает другие запросы.
+"""
+import asyncio
+from base64 import b64decode, b64encode, urlsafe_b64decode
+from datetime import datetime
+from functools import wraps
+from urllib.parse import parse_qs, urlencode
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, HttpResponseNotModified
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.urls import replace_query_param
+
+from . import authentication, catalog_cache, replica
+from .catalog_cache import CatalogCacheMixin
+from .models import Hall, Service, Employee, ServiceHall, CatalogVersion
+from .pagination import CatalogCursorPagination
+from .serializers import HallSerializer, ServiceSerializer, EmployeeSerializer
+from .time_slots import get_time_slots, get_employees_by_service
+
+
+def json_response(data, status=200):
+    # Тот же рендерер, что у DRF: ответы совпадают с синхронными побайтно
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+async def authenticate(request):
+    """
+    Асинхронный аналог CachedAuthTokenAuthentication: пользователь по заголовку
+    «Authorization: Token <токен>» или None.
+    """
+
+    auth = request.headers.get('Authorization', '').split()
+    if len(auth) != 2 or auth[0].lower() != 'token':
+        return None
+
+    try:
+        token = urlsafe_b64decode(auth[1])
+    except ValueError:
+        return None
+
+    return await authentication.aget_user(token)
+
+
+def async_api_view(view):
+    """
+    GET-представление только для авторизованных пользователей (как IsAuthenticated в DRF).
+    """
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return json_response({'detail': f'Метод "{request.method}" не разрешен.'}, status=405)
+
+        user = await authenticate(request)
+        if user is None:
+            response = json_response({'detail': 'Учетные данные не были предоставлены.'}, status=401)
+            response['WWW-Authenticate'] = 'Token'
+            return response
+
+        request.user = user
+        with replica.reads(user):  # Все асинхронные эндпоинты только читают
+            return await view(request, *args, **kwargs)
+
+    return wrapper
+
+
+# Функция get_available_time (ASGI)
+@async_api_view
+async def get_available_time(request):
+    """
+    Показ временных слотов для выбранного сотрудника, услуги и даты.
+    """
+
+    employee_id = request.GET.get('employee')  # Получение параметров из запроса
+    service_id = request.GET.get('service')
+    date_id = request.GET.get('date')
+    raw = request.GET.get('minutes') == '1'  # Минуты от начала суток вместо строк 'HH:MM'
+
+    if not (employee_id and service_id and date_id):
+        return json_response([])
+
+    try:
+        date = datetime.strptime(date_id, '%Y-%m-%d').date()
+
+        # Сотрудник, зал и услуга не зависят друг от друга: запрашиваются одновременно
+        employee, service_hall, service = await asyncio.gather(
+            Employee.objects.aget(id=employee_id),
+            ServiceHall.objects.filter(employees=employee_id, service_id=service_id)
+            .select_related('hall').order_by('id').afirst(),
+            Service.objects.aget(id=service_id),
+        )
+    except ValueError:
+        return json_response({'detail': "Некорректные параметры запроса."}, status=400)
+    except (Employee.DoesNotExist, Service.DoesNotExist):
+        return json_response({'detail': "Сотрудник или услуга не найдены."}, status=404)
+
+    if service_hall is None:
+        return json_response({'detail': "Сотрудник не оказывает эту услугу."}, status=404)
+
+    # Расчёт слотов синхронный (кэш, сетка, блокировки): выполняется в потоке
+    available_time = await sync_to_async(get_time_slots)(service_hall.hall, service, date, employee, raw)
+    return json_response(available_time)
+
+
+# Функция get_employees_by_service (ASGI)
+@async_api_view
+async def get_employees_by_service_view(request):
+    """
+    Показ сотрудников по выбранной услуге.
+    """
+
+    service_id = request.GET.get('service')  # Получение параметров из запроса
+
+    try:
+        service = await Service.objects.aget(id=service_id)
+        employees = [employee async for employee in get_employees_by_service(service).with_related()]
+
+        return json_response(EmployeeSerializer(employees, many=True).data)
+
+    except Exception as e:
+        return json_response({'error': str(e)})
+
+
+def _decode_cursor(request):
+    # Курсор в формате CursorPagination DRF: страницы переносимы между синхронным и асинхронным API.
+    # Возвращает (позиция или None, назад)
+    encoded = request.GET.get('cursor')
+    if not encoded:
+        return None, False
+
+    tokens = parse_qs(b64decode(encoded.encode('ascii')).decode('ascii'), keep_blank_values=True)
+    if tokens.get('o', ['0'])[0] != '0':
+        raise ValueError(encoded)  # Смещение нужно DRF только при неуникальном порядке, по id его нет
+    position = tokens.get('p', [None])[0]
+    return (int(position) if position is not None else None), bool(int(tokens.get('r', ['0'])[0]))
+
+
+def _encode_cursor(request, position, reverse=False):
+    # Ссылка на страницу с курсором, как CursorPagination.encode_cursor
+    tokens = {'r': '1'} if reverse else {}
+    tokens['p'] = position
+    cursor = b64encode(urlencode(tokens).encode('ascii')).decode('ascii')
+    return replace_query_param(request.build_absolute_uri(), 'cursor', cursor)
+
+
+def _page_size(request):
+    pagination = CatalogCursorPagination
+    try:
+        page_size = int(request.GET.get(pagination.page_size_query_param, pagination.page_size))
+    except ValueError:
+        return pagination.page_size
+    return min(max(page_size, 1), pagination.max_page_size)
+
+
+def async_catalog_view(name, queryset, serializer_class, catalogs):
+    """
+    Асинхронный список справочника: страницы по id, ETag и Last-Modified по версиям справочников
+    и кэш отрендеренного JSON, как у CatalogCacheMixin.
+    """
+
+    @async_api_view
+    async def view(request):
+        rows = [row async for row in CatalogVersion.objects.filter(name__in=catalogs)
+                .values_list('name', 'version', 'updated_at')]
+        etag, last_modified = catalog_cache.validators(catalogs, rows, request.get_full_path(), 'application/json')
+
+        if CatalogCacheMixin.not_modified(request, etag, last_modified):
+            return catalog_cache.set_validators(HttpResponseNotModified(), etag, last_modified)
+
+        key = (name, request.build_absolute_uri(), 'application/json')
+        entry = catalog_cache.cached(key, etag)
+        if entry:
+            return catalog_cache.set_validators(HttpResponse(entry[1], content_type=entry[2]), etag, last_modified)
+
+        try:
+            position, reverse = _decode_cursor(request)
+        except ValueError:
+            return json_response({'detail': "Некорректный курсор."}, status=404)
+
+        page_size = _page_size(request)
+
+        # Лишняя строка показывает, есть ли страница дальше в направлении чтения
+        page = queryset
+        if position is not None:
+            page = page.filter(**{'id__lt' if reverse else 'id__gt': position})
+        objects = [obj async for obj in page.order_by('-id' if reverse else 'id')[:page_size + 1]]
+        has_more = len(objects) > page_size
+        objects = objects[:page_size]
+        if reverse:
+            objects.reverse()
+
+        # Как в CursorPagination: назад от следующей страницы и вперёд от предыдущей строки есть всегда
+        has_next = position is not None if reverse else has_more
+        has_previous = has_more if reverse else position is not None
+        next_link = _encode_cursor(request, objects[-1].id if objects else position) if has_next else None
+        previous_link = (_encode_cursor(request, objects[0].id if objects else position, reverse=True)
+                         if has_previous else None)
+
+        response = json_response({'next': next_link, 'previous': previous_link,
+                                  'results': serializer_class(objects, many=True).data})
+        catalog_cache.store(key, (etag, response.content, response['Content-Type']))
+        return catalog_cache.set_validators(response, etag, last_modified)
+
+    view.__name__ = name
+    return view
+
+
+# Функции employee_show, hall_show, service_show (ASGI)
+employee_show = async_catalog_view('employee_show', Employee.objects.with_related(), EmployeeSerializer,
+                                   ('employee', 'hall', 'service'))
+hall_show = async_catalog_view('hall_show', Hall.objects.all(), HallSerializer, ('hall',))
+service_show = async_catalog_view('service_show', Service.objects.all(), ServiceSerializer, ('service',))
@@ -0,0 +1,154 @@
+"""
+Аутентификация по токену с кэшем пользователей.
+
+AuthTokenAuthentication на каждый запрос читает токен вместе с пользователем, а представления
+клиента затем отдельным запросом читают request.user.client. Здесь по хэшу токена в кэше
+auth_tokens (CACHES, TTL и ограничение размера) хранится пользователь вместе с профилями
+клиента и сотрудника, поэтому при попадании запросов к базе нет, а при промахе — один запрос.
+
+Запись сбрасывается при выходе и удалении токена, изменении пользователя (в том числе
+деактивации) и изменении или удалении его профиля (см. signals.py). Массовые update()
+в обход сигналов видны после истечения TTL.
+"""
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.timezone import now
+from rest_authtoken.auth import AuthTokenAuthentication
+from rest_authtoken.models import AuthToken
+from rest_framework.exceptions import AuthenticationFailed
+
+from .cache_stats import CacheStats
+
+CACHE_ALIAS = 'auth_tokens'  # Алиас кэша в настройках CACHES
+
+_stats = CacheStats()  # Счётчики текущего процесса
+
+
+def _key(hashed_token):
+    return f"auth:token:{bytes(hashed_token).hex()}"
+
+
+def _tokens():
+    # Токены вместе с пользователем и его профилями одним запросом
+    return AuthToken.objects.select_related('user', 'user__client', 'user__employee')
+
+
+def _entry(auth_token):
+    # Профили уже загружены select_related и сохраняются в кэше вместе с пользователем
+    return auth_token.user, auth_token.created
+
+
+def _valid_user(entry):
+    """
+    Пользователь из записи кэша или None, если токен истёк или пользователь деактивирован.
+    """
+
+    user, created = entry
+    if now() - created > AuthToken.TOKEN_VALIDITY or not user.is_active:
+        return None
+    return user
+
+
+def get_user(token):
+    """
+    Возвращает пользователя по токену (кэш, затем база) или None.
+    Истёкший токен удаляется, как в AuthToken.get_token.
+    """
+
+    hashed_token = AuthToken._hash_token(token)
+    cache = caches[CACHE_ALIAS]
+
+    entry = cache.get(_key(hashed_token))
+    if entry is not None:
+        _stats.count('hits')
+        return _valid_user(entry)
+    _stats.count('misses')
+
+    auth_token = _tokens().filter(hashed_token=hashed_token).first()
+    if auth_token is None:
+        return None
+
+    if auth_token.age > AuthToken.TOKEN_VALIDITY:
+        auth_token.delete()  # Токен истёк
+        return None
+
+    cache.set(_key(hashed_token), _entry(auth_token))
+    return _valid_user(_entry(auth_token))
+
+
+async def aget_user(token):
+    """
+    Асинхронный вариант get_user для async-view.
+    """
+
+    hashed_token = AuthToken._hash_token(token)
+    cache = caches[CACHE_ALIAS]
+
+    entry = await cache.aget(_key(hashed_token))
+    if entry is not None:
+        _stats.count('hits')
+        return _valid_user(entry)
+    _stats.count('misses')
+
+    auth_token = await _tokens().filter(hashed_token=hashed_token).afirst()
+    if auth_token is None:
+        return None
+
+    if auth_token.age > AuthToken.TOKEN_VALIDITY:
+        await auth_token.adelete()  # Токен истёк
+        return None
+
+    await cache.aset(_key(hashed_token), _entry(auth_token))
+    return _valid_user(_entry(auth_token))
+
+
+def invalidate(hashed_tokens):
+    """
+    Сбрасывает записи токенов сразу и повторно после фиксации транзакции,
+    чтобы параллельный запрос не закэшировал незафиксированное состояние.
+    """
+
+    keys = [_key(hashed_token) for hashed_token in hashed_tokens]
+    if not keys:
+        return
+
+    def delete():
+        caches[CACHE_ALIAS].delete_many(keys)
+        _stats.count('invalidations', len(keys))
+
+    delete()
+    transaction.on_commit(delete)
+
+
+def invalidate_user(user_id):
+    """
+    Сбрасывает записи всех токенов пользователя.
+    """
+
+    invalidate(AuthToken.objects.filter(user_id=user_id).values_list('hashed_token', flat=True))
+
+
+def clear():
+    caches[CACHE_ALIAS].clear()
+
+
+def stats():
+    """
+    Возвращает счётчики попаданий и промахов кэша текущего процесса.
+    """
+
+    return _stats.snapshot()
+
+
+class CachedAuthTokenAuthentication(AuthTokenAuthentication):
+    """
+    AuthTokenAuthentication с кэшем пользователя и профилей по хэшу токена.
+    """
+
+    def authenticate_credentials(self, token, request=None):
+        user = get_user(token)
+
+        if user is None:
+            raise AuthenticationFailed('invalid auth token')
+
+        return user, token
@@ -0,0 +1,253 @@
+from array import array
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.db.models import Q
+
+from .models import Visit
+
+
+# Перевод времени (time или строки 'HH:MM[:SS]') в минуты от начала суток
+def to_minutes(value):
+    if isinstance(value, str):
+        value = datetime.strptime(value[:5], '%H:%M').time()
+
+    return value.hour * 60 + value.minute
+
+
+# Перевод минут от начала суток в строку 'HH:MM' (только на границе API)
+def format_minutes(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+MINUTES = 'H'  # Код типа array для минут от начала суток (конец визита может выходить за полночь)
+MINUTES_MAX = 0xFFFF  # «Бесконечность» для интервалов в минутах
+
+
+class HallAvailability:
+    """
+    Индекс занятости зала на одну дату.
+
+    Визиты загружаются один раз и сворачиваются в отсортированный список
+    непересекающихся интервалов, в которых число одновременных визитов
+    достигло вместимости зала. Проверка слота — бинарный поиск по этому списку.
+    Границы интервалов и слоты — минуты от начала суток в array('H'), без объектов времени.
+    """
+
+    def __init__(self, capacity, start, end, intervals):
+        """
+        :param capacity: вместимость зала (макс. одновременных визитов)
+        :param start: начало работы зала в минутах
+        :param end: конец работы зала в минутах
+        :param intervals: итерируемое пар (начало, конец) занятых интервалов в минутах
+        """
+
+        self.capacity = capacity
+        self.start = start
+        self.end = end
+
+        self._blocked_starts = array(MINUTES)  # Начала заблокированных интервалов
+        self._blocked_ends = array(MINUTES)  # Концы заблокированных интервалов
+
+        if capacity <= 0:
+            # Зал без мест заблокирован целиком
+            self._blocked_starts.append(0)
+            self._blocked_ends.append(MINUTES_MAX)
+            return
+
+        # События заметания: +1 в начале визита, -1 в конце.
+        # При равном времени окончание обрабатывается раньше начала (-1 < +1)
+        events = []
+        for visit_start, visit_end in intervals:
+            if visit_end > visit_start:
+                events.append((visit_start, 1))
+                events.append((visit_end, -1))
+        events.sort()
+
+        load = 0  # Текущее число одновременных визитов
+        for minute, delta in events:
+            was_blocked = load >= capacity
+            load += delta
+            is_blocked = load >= capacity
+
+            if is_blocked and not was_blocked:
+                # Склеиваем с предыдущим интервалом, если они соприкасаются
+                if self._blocked_ends and self._blocked_ends[-1] == minute:
+                    self._blocked_ends.pop()
+                else:
+                    self._blocked_starts.append(minute)
+            elif was_blocked and not is_blocked:
+                self._blocked_ends.append(minute)
+
+    @classmethod
+    def _from_blocked(cls, capacity, start, end, blocked_starts, blocked_ends):
+        availability = cls(capacity, start, end, ())
+        availability._blocked_starts = blocked_starts
+        availability._blocked_ends = blocked_ends
+        return availability
+
+    def union(self, other):
+        """
+        Возвращает индекс, в котором заблокировано всё, что заблокировано в self или в other
+        (слияние двух отсортированных списков интервалов за линейное время).
+        """
+
+        starts, ends = array(MINUTES), array(MINUTES)
+        left, right = 0, 0  # Указатели на очередной интервал self и other
+        left_count, right_count = len(self._blocked_starts), len(other._blocked_starts)
+
+        while left < left_count or right < right_count:
+            # Следующим берётся интервал с меньшим началом: оба списка отсортированы
+            if right == right_count or (left < left_count and
+                                        self._blocked_starts[left] <= other._blocked_starts[right]):
+                blocked_start, blocked_end = self._blocked_starts[left], self._blocked_ends[left]
+                left += 1
+            else:
+                blocked_start, blocked_end = other._blocked_starts[right], other._blocked_ends[right]
+                right += 1
+
+            if ends and blocked_start <= ends[-1]:
+                ends[-1] = max(ends[-1], blocked_end)
+            else:
+                starts.append(blocked_start)
+                ends.append(blocked_end)
+
+        return self._from_blocked(self.capacity, self.start, self.end, starts, ends)
+
+    def is_free(self, start, end):
+        """
+        Проверяет, что в интервале [start, end) зал не заполнен до вместимости.
+        """
+
+        # Первый заблокированный интервал, который заканчивается позже start
+        index = bisect_right(self._blocked_ends, start)
+        return index == len(self._blocked_starts) or self._blocked_starts[index] >= end
+
+    def free_slots(self, duration):
+        """
+        Возвращает начала свободных слотов длительностью duration минут: array('H') минут от начала суток.
+        Слоты идут с шагом duration от начала работы зала и заканчиваются не позже его закрытия
+        (как проверяет booking.conflict при бронировании).
+        """
+
+        slots = array(MINUTES)
+        if duration <= 0:
+            return slots
+
+        index = 0  # Указатель на заблокированный интервал: слоты идут по возрастанию
+        count = len(self._blocked_starts)
+
+        for slot_start in range(self.start, self.end - duration + 1, duration):
+            slot_end = slot_start + duration
+
+            # Пропускаем заблокированные интервалы, закончившиеся до начала слота
+            while index < count and self._blocked_ends[index] <= slot_start:
+                index += 1
+
+            if index == count or self._blocked_starts[index] >= slot_end:
+                slots.append(slot_start)
+
+        return slots
+
+
+# Загрузка визитов с длительностями их услуг
+def visit_rows(visits):
+    """
+    Возвращает строки (id зала, id мастера, дата, начало, длительность) в минутах.
+    Длительность берётся из услуги самого визита через JOIN в том же запросе.
+
+    :param visits: QuerySet визитов
+    """
+
+    return [(hall_id, employee_id, date, to_minutes(time), to_minutes(duration))
+            for hall_id, employee_id, date, time, duration in visits.values_list(
+                'hall_id', 'employee_id', 'date', 'time', 'service__duration')]
+
+
+class ScheduleAvailability:
+    """
+    Занятость зала и мастера на одну дату.
+
+    Слот свободен, если в зале есть место (HallAvailability с вместимостью зала)
+    и у мастера нет другого визита в это время, в том числе в другом зале
+    (HallAvailability с вместимостью 1). Каждый визит занимает интервал
+    длиной своей услуги.
+    """
+
+    def __init__(self, hall, employee_id, rows):
+        """
+        :param hall: объект Hall
+        :param employee_id: id мастера или None (учитывается только зал)
+        :param rows: строки visit_rows за дату; лишние залы и мастера пропускаются
+        """
+
+        hall_intervals = []  # Визиты зала
+        employee_intervals = []  # Визиты мастера во всех залах
+
+        for hall_id, visit_employee_id, _, visit_start, duration in rows:
+            if hall_id == hall.id:
+                hall_intervals.append((visit_start, visit_start + duration))
+            if employee_id is not None and visit_employee_id == employee_id:
+                employee_intervals.append((visit_start, visit_start + duration))
+
+        start, end = to_minutes(hall.start_time), to_minutes(hall.end_time)
+        self.hall = HallAvailability(hall.capacity, start, end, hall_intervals)
+        self.employee = HallAvailability(1, start, end, employee_intervals)  # Мастер ведёт один визит за раз
+        self._combined = self.hall.union(self.employee)
+
+    @classmethod
+    def for_date(cls, hall, date, employee_id=None, exclude=None):
+        """
+        Строит занятость по визитам зала и мастера на дату одним запросом.
+
+        :param exclude: id визита, который не учитывается (при переносе)
+        """
+
+        visits = Visit.objects.filter(Q(hall=hall) | Q(employee_id=employee_id), date=date) \
+            if employee_id is not None else Visit.objects.filter(hall=hall, date=date)
+        if exclude is not None:
+            visits = visits.exclude(pk=exclude)
+
+        return cls(hall, employee_id, visit_rows(visits))
+
+    @classmethod
+    def for_range(cls, employee_halls, date_from, date_to):
+        """
+        Строит занятость для нескольких пар (мастер, зал) на каждый день диапазона одним запросом.
+
+        :param employee_halls: словарь {id мастера: объект Hall}
+        :return: словарь {(id мастера, дата): ScheduleAvailability}
+        """
+
+        halls = {hall.id for hall in employee_halls.values()}
+        visits = Visit.objects.filter(Q(hall_id__in=halls) | Q(employee_id__in=employee_halls.keys()),
+                                      date__range=(date_from, date_to))
+
+        # Визиты всех залов и мастеров за диапазон, сгруппированные по дате
+        grouped = defaultdict(list)
+        for row in visit_rows(visits):
+            grouped[row[2]].append(row)
+
+        availability = {}
+        for employee_id, hall in employee_halls.items():
+            date = date_from
+            while date <= date_to:
+                availability[(employee_id, date)] = cls(hall, employee_id, grouped.get(date, ()))
+                date += timedelta(days=1)
+
+        return availability
+
+    def is_free(self, start, end):
+        """
+        Проверяет, что в интервале [start, end) в зале есть место и мастер свободен.
+        """
+
+        return self._combined.is_free(start, end)
+
+    def free_slots(self, duration):
+        """
+        Возвращает начала свободных слотов длительностью duration минут: array('H') минут от начала суток.
+        """
+
+        return self._combined.free_slots(duration)
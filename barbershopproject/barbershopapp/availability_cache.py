@@ -0,0 +1,127 @@
+from uuid import uuid4
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db import transaction
+
+from .cache_stats import CacheStats
+
+CACHE_ALIAS = 'availability'  # Алиас кэша в настройках CACHES
+
+_stats = CacheStats()  # Счётчики текущего процесса
+
+
+def _day(date):
+    # Дата может прийти как date, datetime или строка 'YYYY-MM-DD'
+    return str(date)[:10]
+
+
+def _generation_key(scope, scope_id, date):
+    # scope — 'hall' или 'employee': поколения зала и мастера сбрасываются независимо
+    return f"availability:gen:{scope}:{scope_id}:{_day(date)}"
+
+
+def _slots_key(hall_id, employee_id, duration, date, generations):
+    hall_generation, employee_generation = generations
+    # Слоты хранятся как array('H') минут: префикс отличается от прежних записей со строками
+    return (f"availability:minutes:{hall_id}:{employee_id}:{duration}:{_day(date)}:"
+            f"{hall_generation}:{employee_generation}")
+
+
+def _scopes(hall_id, employee_id, date):
+    # Ключи поколений, от которых зависят слоты (зал, мастер, дата); без мастера — только зал
+    return (('hall', hall_id, _day(date)),
+            ('employee', employee_id, _day(date)) if employee_id is not None else None)
+
+
+def _generations(cache, slot_keys):
+    """
+    Возвращает поколения залов и мастеров для троек (зал, мастер, дата), создавая недостающие.
+    Поколение — случайная строка, поэтому вытесненный счётчик не «воскрешает» старые записи.
+    """
+
+    scopes = {scope for key in slot_keys for scope in _scopes(*key) if scope is not None}
+    keys = {_generation_key(*scope): scope for scope in scopes}
+    generations = cache.get_many(keys)
+
+    for key in keys.keys() - generations.keys():
+        cache.add(key, uuid4().hex)
+        generations[key] = cache.get(key)
+
+    by_scope = {keys[key]: generation for key, generation in generations.items()}
+    return {key: tuple(by_scope.get(scope) for scope in _scopes(*key)) for key in slot_keys}
+
+
+def get_many(slot_keys, duration):
+    """
+    Возвращает закэшированные слоты для троек (зал, мастер, дата).
+
+    :param slot_keys: список троек (id зала, id мастера или None, дата)
+    :param duration: длительность услуги в минутах
+    :return: (найденные {(id зала, id мастера, дата): слоты}, поколения для последующей записи)
+    """
+
+    cache = caches[CACHE_ALIAS]
+    generations = _generations(cache, slot_keys)
+    keys = {_slots_key(hall_id, employee_id, duration, date, generations[(hall_id, employee_id, date)]):
+            (hall_id, employee_id, date) for hall_id, employee_id, date in slot_keys}
+
+    found = {keys[key]: slots for key, slots in cache.get_many(keys).items()}
+
+    _stats.count('hits', len(found))
+    _stats.count('misses', len(keys) - len(found))
+
+    return found, generations
+
+
+def set_many(time_slots, duration, generations, timeout=DEFAULT_TIMEOUT):
+    """
+    Сохраняет слоты {(id зала, id мастера, дата): слоты} под поколениями, прочитанными до расчёта.
+    Если за время расчёта зал или мастер были сброшены, запись уйдёт под устаревший ключ и не будет прочитана.
+    """
+
+    caches[CACHE_ALIAS].set_many({
+        _slots_key(hall_id, employee_id, duration, date, generations[(hall_id, employee_id, date)]): slots
+        for (hall_id, employee_id, date), slots in time_slots.items()
+    }, timeout)
+
+
+def invalidate(visit_days):
+    """
+    Сбрасывает кэш залов и мастеров для троек (id зала, id мастера, дата) сразу
+    и повторно после фиксации транзакции, чтобы параллельный расчёт не закэшировал
+    незафиксированное состояние.
+    """
+
+    scopes = set()
+    for hall_id, employee_id, date in visit_days:
+        if hall_id is not None:
+            scopes.add(('hall', hall_id, _day(date)))
+        if employee_id is not None:
+            scopes.add(('employee', employee_id, _day(date)))
+    if not scopes:
+        return
+
+    def bump():
+        caches[CACHE_ALIAS].set_many({_generation_key(*scope): uuid4().hex for scope in scopes})
+        _stats.count('invalidations', len(scopes))
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def clear():
+    """
+    Сбрасывает весь кэш свободных слотов (например, после изменения длительности услуги).
+    """
+
+    caches[CACHE_ALIAS].clear()
+    _stats.count('invalidations')
+
+
+def stats():
+    """
+    Возвращает счётчики попаданий и промахов кэша текущего процесса.
+    """
+
+    return _stats.snapshot()
@@ -0,0 +1,244 @@
+from collections import defaultdict
+
+from django.db import transaction, IntegrityError
+from django.db.models import F, Q
+from rest_framework.exceptions import ValidationError
+
+from . import availability_cache, slot_grid
+from .availability import ScheduleAvailability, format_minutes, to_minutes, visit_rows
+from .models import Visit, HallDayLock, Employee, Hall, Service
+
+
+# Функция блокировки записи в зал на дату
+def lock_hall_day(hall, date):
+    """
+    Захватывает строку-блокировку (зал, дата) до конца текущей транзакции.
+
+    Первой выполняется запись (UPDATE): в PostgreSQL она блокирует строку,
+    в SQLite сразу берёт блокировку на запись, поэтому проверка вместимости
+    и вставка визита выполняются без гонки.
+    """
+
+    locks = HallDayLock.objects.filter(hall=hall, date=date)
+
+    if not locks.update(version=F('version') + 1):
+        try:
+            with transaction.atomic():
+                HallDayLock.objects.create(hall=hall, date=date, version=1)
+        except IntegrityError:
+            # Строку одновременно создала другая транзакция — ждём её блокировку
+            locks.update(version=F('version') + 1)
+
+
+# Функция блокировки расписания мастеров
+def lock_employees(employee_ids):
+    """
+    Блокирует строки мастеров до конца транзакции (PostgreSQL), чтобы параллельные записи
+    к одному мастеру в разные залы не пересеклись. В SQLite запись уже сериализована
+    блокировкой lock_hall_day, select_for_update там не выполняется.
+    Вызывается после lock_hall_day: залы, затем мастера по возрастанию id.
+    """
+
+    list(Employee.objects.select_for_update().filter(pk__in=sorted(employee_ids)).order_by('pk').values_list(
+        'pk', flat=True))
+
+
+def conflict(availability, start, duration):
+    """
+    Возвращает причину, по которой интервал занят, или None.
+
+    :param availability: объект ScheduleAvailability
+    """
+
+    if start < availability.hall.start or start + duration > availability.hall.end:
+        return "Визит выходит за часы работы зала."
+    if not availability.hall.is_free(start, start + duration):
+        return "Зал переполнен на выбранное время."
+    if not availability.employee.is_free(start, start + duration):
+        return "Мастер занят в выбранное время."
+    return None
+
+
+# Функция проверки вместимости зала и занятости мастера
+def check_capacity(hall, service, date, time, employee=None, exclude=None):
+    """
+    Проверяет, что на время визита в зале есть свободное место, а у мастера нет другого визита.
+    Визиты зала и мастера читаются из базы одним запросом, минуя кэш свободных слотов.
+
+    :param employee: объект Employee или None (проверяется только зал)
+    :param exclude: id визита, который не учитывается (при переносе)
+    """
+
+    duration = to_minutes(service.duration)  # Длительность услуги в минутах
+
+    availability = ScheduleAvailability.for_date(hall, date, employee.id if employee else None, exclude=exclude)
+
+    reason = conflict(availability, to_minutes(time), duration)
+    if reason:
+        raise ValidationError(reason)
+
+
+# Функция бронирования визита
+def book_visit(client, employee, service, date, time, hall):
+    """
+    Создаёт визит: блокировка (зал, дата) и мастера, проверка вместимости и вставка в одной транзакции.
+
+    :return: созданный объект Visit
+    """
+
+    with transaction.atomic():
+        lock_hall_day(hall, date)
+        lock_employees([employee.id])
+        check_capacity(hall, service, date, time, employee)
+
+        return Visit.objects.create(client=client, employee=employee, service=service,
+                                    date=date, time=time, hall=hall)
+
+
+# Функция переноса визита
+def reschedule_visit(visit, validated_data):
+    """
+    Обновляет визит с блокировкой и проверкой вместимости нового зала и занятости мастера на новую дату.
+
+    :return: обновлённый объект Visit
+    """
+
+    with transaction.atomic():
+        for attr, value in validated_data.items():
+            setattr(visit, attr, value)
+
+        lock_hall_day(visit.hall, visit.date)
+        lock_employees([visit.employee_id])
+        check_capacity(visit.hall, visit.service, visit.date, visit.time, visit.employee, exclude=visit.pk)
+
+        visit.save()
+        return visit
+
+
+class BatchBookingError(Exception):
+    """
+    Пакет визитов не может быть забронирован целиком.
+    """
+
+    def __init__(self, errors, chain=None):
+        super().__init__(errors)
+        self.errors = errors  # Ошибки по позициям пакета (None — позиция допустима)
+        self.chain = chain  # Предложение записи «подряд» или None
+
+
+class BookingSnapshot:
+    """
+    Снимок занятости залов и мастеров для пакета визитов: визиты всех затронутых залов и мастеров
+    на даты пакета загружаются одним запросом, уже принятые позиции пакета учитываются при проверке следующих.
+    """
+
+    def __init__(self, hall_ids, employee_ids, dates):
+        self._rows = defaultdict(list)  # Дата -> строки visit_rows существующих визитов и принятых позиций
+
+        visits = Visit.objects.filter(Q(hall_id__in=hall_ids) | Q(employee_id__in=employee_ids), date__in=dates)
+        for row in visit_rows(visits):
+            self._rows[row[2]].append(row)
+
+    def conflict(self, hall, employee_id, date, start, duration):
+        return conflict(ScheduleAvailability(hall, employee_id, self._rows[date]), start, duration)
+
+    def accept(self, hall, employee_id, date, start, duration):
+        self._rows[date].append((hall.id, employee_id, date, start, duration))
+
+
+# Функция бронирования нескольких визитов
+def book_visits(client, items):
+    """
+    Бронирует пакет визитов целиком или не бронирует ничего.
+
+    Сотрудники, услуги и залы загружаются пакетно, все затронутые (зал, дата) блокируются
+    в фиксированном порядке, проверка идёт по одному снимку занятости, вставка — одним bulk_create.
+
+    :param items: список словарей с ключами employee, service (id), date, time
+    :return: (созданные визиты, предложение записи «подряд» или None)
+    :raises BatchBookingError: если хотя бы одна позиция недопустима
+    """
+
+    services = Service.objects.in_bulk({item['service'] for item in items})
+
+    # Зал для пары (сотрудник, услуга) — первая связь, как при одиночном бронировании
+    item_halls = {}
+    links = Employee.service_halls.through.objects.filter(
+        employee_id__in={item['employee'] for item in items},
+        servicehall__service_id__in=services.keys(),
+    ).order_by('servicehall_id').values_list('employee_id', 'servicehall__service_id', 'servicehall__hall_id')
+    for employee_id, service_id, hall_id in links:
+        item_halls.setdefault((employee_id, service_id), hall_id)
+    halls = Hall.objects.in_bulk(set(item_halls.values()))
+
+    errors = []
+    for item in items:
+        if item['service'] not in services:
+            errors.append("Услуга не найдена.")
+        elif (item['employee'], item['service']) not in item_halls:
+            errors.append("Сотрудник не оказывает выбранную услугу.")
+        else:
+            errors.append(None)
+    if any(errors):
+        raise BatchBookingError(errors)
+
+    def hall_of(item):
+        return halls[item_halls[(item['employee'], item['service'])]]
+
+    with transaction.atomic():
+        hall_days = sorted({(hall_of(item).id, item['date']) for item in items})
+        for hall_id, date in hall_days:  # Фиксированный порядок блокировок исключает взаимоблокировки
+            lock_hall_day(halls[hall_id], date)
+        employee_ids = {item['employee'] for item in items}
+        lock_employees(employee_ids)
+
+        snapshot = BookingSnapshot({hall_id for hall_id, _ in hall_days}, employee_ids,
+                                   {date for _, date in hall_days})
+        for index, item in enumerate(items):
+            duration = to_minutes(services[item['service']].duration)
+            start = to_minutes(item['time'])
+            errors[index] = snapshot.conflict(hall_of(item), item['employee'], item['date'], start, duration)
+            if errors[index] is None:
+                snapshot.accept(hall_of(item), item['employee'], item['date'], start, duration)
+
+        chain = _chain(items, services, hall_of)
+        if any(errors):
+            raise BatchBookingError(errors, chain)
+
+        visits = Visit.objects.bulk_create([
+            Visit(client=client, employee_id=item['employee'], service=services[item['service']],
+                  hall=hall_of(item), date=item['date'], time=item['time'])
+            for item in items
+        ])
+
+        # bulk_create не вызывает сигналы: сбрасываем кэш свободных слотов и обновляем сетки явно
+        availability_cache.invalidate([(visit.hall_id, visit.employee_id, visit.date) for visit in visits])
+        if slot_grid.enabled():
+            slot_grid.apply([(visit.hall_id, visit.date, visit.time, visit.service_id, -1) for visit in visits])
+
+    return visits, chain
+
+
+def _chain(items, services, hall_of):
+    """
+    Предложение записи «подряд»: позиции идут одна за другой с времени первой из них в её дату.
+    Проверяется по свежему снимку (без позиций текущего пакета); None, если цепочка не помещается.
+    """
+
+    date = items[0]['date']
+    snapshot = BookingSnapshot({hall_of(item).id for item in items}, {item['employee'] for item in items}, {date})
+
+    chain = []
+    start = to_minutes(items[0]['time'])
+    for item in items:
+        hall = hall_of(item)
+        duration = to_minutes(services[item['service']].duration)
+        if snapshot.conflict(hall, item['employee'], date, start, duration):
+            return None
+
+        snapshot.accept(hall, item['employee'], date, start, duration)
+        chain.append({'employee': item['employee'], 'service': item['service'], 'date': date.isoformat(),
+                      'time': format_minutes(start)})
+        start += duration
+
+    return chain
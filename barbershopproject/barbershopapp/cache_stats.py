@@ -0,0 +1,32 @@
+"""
+Счётчики попаданий, промахов и сбросов кэшей текущего процесса (кэш свободных слотов, аутентификации).
+"""
+from threading import Lock
+
+
+class CacheStats:
+    """
+    Потокобезопасные счётчики hits, misses и invalidations с долей попаданий.
+    """
+
+    names = ('hits', 'misses', 'invalidations')
+
+    def __init__(self):
+        self._lock = Lock()
+        self._counts = dict.fromkeys(self.names, 0)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self._counts[name] += value
+
+    def snapshot(self):
+        """
+        Возвращает счётчики и долю попаданий hit_rate.
+        """
+
+        with self._lock:
+            result = dict(self._counts)
+
+        lookups = result['hits'] + result['misses']
+        result['hit_rate'] = round(result['hits'] / lookups, 4) if lookups else 0.0
+        return result
@@ -0,0 +1,148 @@
+"""
+Условные GET-запросы и кэш ответов справочников (залы, услуги, сотрудники).
+
+Для каждого справочника в базе хранится счётчик версии (CatalogVersion), который
+сигналы увеличивают при сохранении и удалении записей. ETag ответа вычисляется
+из версий справочников и адреса запроса, поэтому проверка If-None-Match стоит
+одного запроса к базе и не затрагивает сериализатор. Отрендеренный JSON хранится
+в памяти процесса, пока версия не изменится.
+"""
+from collections import OrderedDict
+from hashlib import md5
+from threading import Lock
+
+from django.db import transaction, IntegrityError
+from django.db.models import F
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+from django.utils.timezone import now
+from rest_framework.response import Response
+
+from .models import CatalogVersion
+
+MAX_ENTRIES = 256  # Количество отрендеренных ответов в памяти процесса
+
+_responses = OrderedDict()  # (view, адрес, тип) -> (ETag, содержимое, Content-Type), вытеснение LRU
+_responses_lock = Lock()
+
+
+def bump(*names):
+    """
+    Увеличивает версии справочников. Внутри транзакции новая версия видна
+    другим соединениям одновременно с изменёнными данными.
+    """
+
+    for name in names:
+        versions = CatalogVersion.objects.filter(name=name)
+        if not versions.update(version=F('version') + 1, updated_at=now()):
+            try:
+                with transaction.atomic():
+                    CatalogVersion.objects.create(name=name, version=1, updated_at=now())
+            except IntegrityError:
+                # Строку одновременно создал другой запрос
+                versions.update(version=F('version') + 1, updated_at=now())
+
+
+def cached(key, etag):
+    with _responses_lock:
+        entry = _responses.get(key)
+        if entry is None or entry[0] != etag:
+            return None
+        _responses.move_to_end(key)
+        return entry
+
+
+def store(key, entry):
+    with _responses_lock:
+        _responses[key] = entry
+        _responses.move_to_end(key)
+        while len(_responses) > MAX_ENTRIES:
+            _responses.popitem(last=False)
+
+
+def validators(catalogs, rows, full_path, media_type):
+    """
+    ETag и время последнего изменения по строкам (справочник, версия, время изменения).
+    Общая часть для синхронных и асинхронных представлений.
+    """
+
+    versions = {name: (version, updated_at) for name, version, updated_at in rows}
+
+    state = '|'.join(f"{name}:{versions.get(name, (0, None))[0]}" for name in catalogs)
+    digest = md5(f"{state}|{full_path}|{media_type}".encode()).hexdigest()
+    modified = [updated_at for _, updated_at in versions.values()]
+
+    return f'"{digest}"', max(modified) if modified else None
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_cache_control(response, private=True, no_cache=True)  # Ответ только для авторизованных
+    return response
+
+
+def clear():
+    with _responses_lock:
+        _responses.clear()
+
+
+class CatalogCacheMixin:
+    """
+    Conditional GET для ListAPIView справочника: ETag и Last-Modified по версиям справочников,
+    ответ 304 без сериализации и кэш отрендеренного JSON в памяти процесса.
+    """
+
+    catalogs = ()  # Справочники, от изменения которых зависит ответ
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+
+        if self.not_modified(request, etag, last_modified):
+            response = HttpResponseNotModified()
+        else:
+            key = (type(self).__name__, request.build_absolute_uri(), request.accepted_media_type)
+            entry = cached(key, etag)
+            if entry:
+                response = HttpResponse(entry[1], content_type=entry[2])
+            else:
+                response = super().get(request, *args, **kwargs)
+                request._catalog_pending = (key, etag)  # Сохраняется после рендеринга в finalize_response
+
+        return set_validators(response, etag, last_modified)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+
+        pending = getattr(request, '_catalog_pending', None)
+        if pending and isinstance(response, Response) and response.status_code == 200 \
+                and response.accepted_renderer.format == 'json':
+            key, etag = pending
+            response.render()
+            store(key, (etag, response.content, response['Content-Type']))
+
+        return response
+
+    def get_validators(self, request):
+        """
+        Возвращает (ETag, время последнего изменения или None) одним запросом к версиям.
+        """
+
+        rows = CatalogVersion.objects.filter(name__in=self.catalogs).values_list('name', 'version', 'updated_at')
+        return validators(self.catalogs, rows, request.get_full_path(), request.accepted_media_type)
+
+    @staticmethod
+    def not_modified(request, etag, last_modified):
+        """
+        Проверка If-None-Match, а при его отсутствии — If-Modified-Since.
+        """
+
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            return etag in [value.strip().removeprefix('W/') for value in if_none_match.split(',')] \
+                or if_none_match.strip() == '*'
+
+        if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        return bool(last_modified and if_modified_since and int(last_modified.timestamp()) <= if_modified_since)
@@ -0,0 +1,108 @@
+import random
+from datetime import date as date_cls, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+
+from . import availability_cache, catalog_cache
+from .models import Hall, Service, Client, Employee, Visit
+from .service_halls import sync_service_halls
+
+
+# Функция генерации синтетических данных
+def generate_demo_data(halls=5, employees=20, services=10, clients=200, visits=5000, days=30, seed=42,
+                       start_date=None, prefix='demo', batch_size=1000):
+    """
+    Заполняет базу детерминированными синтетическими данными (одинаковое зерно — одинаковые данные).
+    Данные вставляются через bulk_create.
+
+    :param start_date: первая дата визитов (по умолчанию сегодня)
+    :param prefix: префикс логинов пользователей
+    :return: словарь с созданными объектами для сценариев нагрузки
+    """
+
+    rng = random.Random(seed)
+    start_date = start_date or date_cls.today()
+    password = make_password(None)  # Непригодный для входа пароль без затрат на хэширование
+
+    # Залы с разным расписанием и вместимостью
+    hall_objects = Hall.objects.bulk_create([
+        Hall(name=f"Зал {i + 1}", description='Синтетический зал', capacity=rng.randint(1, 4),
+             location=f"{i + 1} этаж", start_time=time(rng.choice([8, 9, 10]), 0),
+             end_time=time(rng.choice([19, 20, 21]), 0))
+        for i in range(halls)
+    ])
+
+    # Услуги длительностью от 15 минут до 1,5 часа
+    service_objects = Service.objects.bulk_create([
+        Service(name=f"Услуга {i + 1}", description='Синтетическая услуга', price=rng.randrange(500, 5000, 100),
+                duration=time(*divmod(rng.choice([15, 30, 45, 60, 90]), 60)))
+        for i in range(services)
+    ])
+
+    # Пользователи сотрудников и клиентов
+    User.objects.bulk_create([
+        User(username=f"{prefix}_master_{i}", first_name='Мастер', last_name=str(i + 1), password=password)
+        for i in range(employees)
+    ] + [
+        User(username=f"{prefix}_client_{i}", first_name='Клиент', last_name=str(i + 1), password=password)
+        for i in range(clients)
+    ], batch_size=batch_size)
+    users = {user.username: user for user in User.objects.filter(username__startswith=f"{prefix}_")}
+
+    employee_objects = Employee.objects.bulk_create([
+        Employee(user=users[f"{prefix}_master_{i}"], position='Мастер', phone_number=f"+79{i:09d}")
+        for i in range(employees)
+    ])
+    client_objects = Client.objects.bulk_create([
+        Client(user=users[f"{prefix}_client_{i}"], gender=rng.choice(['Мужской', 'Женский']))
+        for i in range(clients)
+    ], batch_size=batch_size)
+
+    # Залы и услуги сотрудников; связи «услуга-зал» строятся одной синхронизацией на всех
+    employee_halls = {employee.id: rng.sample(hall_objects, min(len(hall_objects), rng.randint(1, 2)))
+                      for employee in employee_objects}
+    employee_services = {employee.id: rng.sample(service_objects, min(len(service_objects), rng.randint(2, 5)))
+                         for employee in employee_objects}
+
+    Employee.halls.through.objects.bulk_create([
+        Employee.halls.through(employee_id=employee.id, hall_id=hall.id)
+        for employee in employee_objects for hall in employee_halls[employee.id]
+    ])
+    Employee.services.through.objects.bulk_create([
+        Employee.services.through(employee_id=employee.id, service_id=service.id)
+        for employee in employee_objects for service in employee_services[employee.id]
+    ])
+    sync_service_halls([employee.id for employee in employee_objects])
+
+    # Зал визита — первый зал сотрудника для услуги, как при бронировании
+    visit_halls = {}
+    for employee_id, service_id, hall_id in Employee.service_halls.through.objects.filter(
+            employee_id__in=[employee.id for employee in employee_objects]).order_by('servicehall_id').values_list(
+            'employee_id', 'servicehall__service_id', 'servicehall__hall_id'):
+        visit_halls.setdefault((employee_id, service_id), hall_id)
+    halls_by_id = {hall.id: hall for hall in hall_objects}
+
+    def random_visit():
+        employee = rng.choice(employee_objects)
+        service = rng.choice(employee_services[employee.id])
+        hall = halls_by_id[visit_halls[(employee.id, service.id)]]
+        minute = rng.randrange(hall.start_time.hour * 60, hall.end_time.hour * 60, 15)
+        return Visit(client=rng.choice(client_objects), employee=employee, service=service, hall=hall,
+                     date=start_date + timedelta(days=rng.randrange(days)), time=time(*divmod(minute, 60)))
+
+    for offset in range(0, visits, batch_size):
+        Visit.objects.bulk_create([random_visit() for _ in range(min(batch_size, visits - offset))])
+
+    catalog_cache.bump('hall', 'service', 'employee')
+    availability_cache.clear()  # bulk_create не вызывает сигналы сброса кэша
+
+    return {
+        'halls': hall_objects,
+        'services': service_objects,
+        'employees': employee_objects,
+        'clients': client_objects,
+        'employee_services': employee_services,
+        'start_date': start_date,
+        'days': days,
+    }
@@ -0,0 +1,40 @@
+import json
+from datetime import date as date_cls, datetime, timedelta
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from barbershopapp.reports import utilization_report
+
+
+class Command(BaseCommand):
+    help = 'Отчёт о загрузке и свободных слотах всех залов и загрузке мастеров за период в JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', help='Первая дата YYYY-MM-DD (по умолчанию первое число текущего месяца)')
+        parser.add_argument('--days', type=int, default=31, help='Количество дней начиная с --date-from')
+        parser.add_argument('--duration', type=int, default=60, help='Длительность слота в минутах')
+        parser.add_argument('--output', help='Файл для JSON-отчёта (по умолчанию stdout)')
+
+    def handle(self, *args, **options):
+        try:
+            date_from = (datetime.strptime(options['date_from'], '%Y-%m-%d').date()
+                         if options['date_from'] else date_cls.today().replace(day=1))
+        except ValueError:
+            raise CommandError("Дата должна быть в формате YYYY-MM-DD")
+        if options['days'] <= 0 or options['duration'] <= 0:
+            raise CommandError("--days и --duration должны быть положительными")
+
+        started = perf_counter()
+        report = utilization_report(date_from, date_from + timedelta(days=options['days'] - 1), options['duration'])
+        report['seconds'] = round(perf_counter() - started, 3)
+
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+            self.stdout.write(self.style.SUCCESS(
+                f"Залов: {len(report['halls'])}, мастеров: {len(report['employees'])}, "
+                f"время расчёта: {report['seconds']} с"))
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import random
+from base64 import urlsafe_b64encode
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import AsyncClient, Client
+from django.urls import reverse
+from rest_authtoken.models import AuthToken
+
+from barbershopapp.demo_data import generate_demo_data
+from barbershopapp.management.commands.seed_demo_data import add_demo_data_arguments, demo_data_options
+from barbershopproject.metrics import percentile
+
+
+class Command(BaseCommand):
+    help = ('Сравнение пропускной способности синхронных (WSGI) и асинхронных (ASGI) вариантов '
+            'читающих эндпоинтов при параллельных запросах, отчёт в JSON')
+
+    def add_arguments(self, parser):
+        add_demo_data_arguments(parser)
+        parser.add_argument('--requests', type=int, default=200, help='Количество запросов на сценарий')
+        parser.add_argument('--concurrency', type=int, default=8, help='Количество одновременных запросов')
+        parser.add_argument('--output', help='Файл для JSON-отчёта (по умолчанию stdout)')
+
+    def handle(self, *args, **options):
+        # Временная база, чтобы прогон не изменял рабочие данные
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+
+        try:
+            data = generate_demo_data(**demo_data_options(options))
+            report = {
+                'database': connection.vendor,
+                'options': {key: options[key] for key in ('halls', 'employees', 'services', 'visits', 'days', 'seed',
+                                                          'requests', 'concurrency')},
+                'endpoints': self.run_scenarios(data, options['requests'], options['concurrency'],
+                                                random.Random(options['seed'])),
+            }
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+    def run_scenarios(self, data, requests, concurrency, rng):
+        """
+        Для каждого эндпоинта — одинаковый набор запросов через WSGI и через ASGI.
+        """
+
+        tokens = [urlsafe_b64encode(AuthToken.create_token_for_user(client.user)).decode()
+                  for client in data['clients'][:20]]
+
+        def available_time():
+            employee = rng.choice(data['employees'])
+            service = rng.choice(data['employee_services'][employee.id])
+            day = data['start_date'] + timedelta(days=rng.randrange(data['days']))
+            return {'employee': employee.id, 'service': service.id, 'date': day.isoformat()}
+
+        scenarios = {
+            'get_available_time': available_time,
+            'get_employee_for_service': lambda: {'service': rng.choice(data['services']).id},
+            'hall_show': dict,
+            'employee_show': dict,
+        }
+
+        report = {}
+        for name, params in scenarios.items():
+            calls = [(rng.choice(tokens), params()) for _ in range(requests)]
+            wsgi = self.measure_wsgi(reverse(name), calls, concurrency)
+            asgi = asyncio.run(self.measure_asgi(reverse(f'async_{name}'), calls, concurrency))
+            report[name] = {'wsgi': wsgi, 'asgi': asgi,
+                            'asgi_speedup': round(asgi['throughput_rps'] / wsgi['throughput_rps'], 2)}
+        return report
+
+    @classmethod
+    def measure_wsgi(cls, url, calls, concurrency):
+        """
+        Синхронный обработчик: каждый запрос занимает поток пула из concurrency потоков.
+        """
+
+        def call(args):
+            token, params = args
+            started = perf_counter()
+            response = Client().get(url, params, headers={'Authorization': f'Token {token}'})
+            return (perf_counter() - started) * 1000, response.status_code
+
+        started = perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            results = list(executor.map(call, calls))
+        return cls.summary(results, perf_counter() - started)
+
+    @classmethod
+    async def measure_asgi(cls, url, calls, concurrency):
+        """
+        Асинхронный обработчик: до concurrency запросов одновременно в одном событийном цикле.
+        """
+
+        semaphore = asyncio.Semaphore(concurrency)
+        client = AsyncClient()
+
+        async def call(token, params):
+            async with semaphore:
+                started = perf_counter()
+                response = await client.get(url, params, headers={'Authorization': f'Token {token}'})
+                return (perf_counter() - started) * 1000, response.status_code
+
+        started = perf_counter()
+        results = await asyncio.gather(*(call(token, params) for token, params in calls))
+        return cls.summary(results, perf_counter() - started)
+
+    @staticmethod
+    def summary(results, elapsed):
+        latencies = sorted(latency for latency, _ in results)
+        statuses = {}
+        for _, status in results:
+            statuses[status] = statuses.get(status, 0) + 1
+
+        return {
+            'requests': len(results),
+            'throughput_rps': round(len(results) / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 0.5), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+            'statuses': statuses,
+        }
@@ -0,0 +1,150 @@
+import json
+import os
+import random
+import subprocess
+import sys
+from base64 import urlsafe_b64encode
+from datetime import timedelta
+from threading import Thread
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection, close_old_connections
+from django.urls import reverse
+from rest_authtoken.models import AuthToken
+from rest_framework.test import APIClient
+
+from barbershopapp.demo_data import generate_demo_data
+from barbershopproject.metrics import percentile
+
+# Профили базы: переменные окружения для database_config
+PROFILES = {
+    'sqlite': {'DB_ENGINE': 'sqlite', 'DB_SQLITE_TUNING': '0', 'DB_CONN_MAX_AGE': '0'},  # Настройки по умолчанию Django
+    'sqlite-tuned': {'DB_ENGINE': 'sqlite', 'DB_SQLITE_TUNING': '1'},
+    'postgres': {'DB_ENGINE': 'postgres', 'DB_POOL': '0'},
+    'postgres-pool': {'DB_ENGINE': 'postgres', 'DB_POOL': '1'},
+}
+
+
+class Command(BaseCommand):
+    help = ('Пропускная способность параллельных бронирований для профилей базы данных '
+            '(каждый профиль — отдельный процесс с временной тестовой базой), отчёт в JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', nargs='+', choices=sorted(PROFILES), default=['sqlite', 'sqlite-tuned'],
+                            help='Профили базы (postgres требует запущенный сервер и DB_HOST, DB_USER, ...)')
+        parser.add_argument('--requests', type=int, default=400, help='Количество бронирований на профиль')
+        parser.add_argument('--concurrency', type=int, default=8, help='Количество рабочих потоков')
+        parser.add_argument('--seed', type=int, default=42, help='Зерно генератора')
+        parser.add_argument('--output', help='Файл для JSON-отчёта (по умолчанию stdout)')
+        parser.add_argument('--worker', action='store_true', help='Прогон в текущем профиле (внутренний режим)')
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            self.stdout.write(json.dumps(self.run_worker(options)))
+            return
+
+        report = {'options': {key: options[key] for key in ('requests', 'concurrency', 'seed')}, 'profiles': {}}
+        for profile in options['profiles']:
+            report['profiles'][profile] = self.run_profile(profile, options)
+
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+    @staticmethod
+    def run_profile(profile, options):
+        """
+        Запускает прогон в отдельном процессе: настройки базы читаются при старте Django.
+        """
+
+        env = {**os.environ, **PROFILES[profile], 'DB_TEST_NAME': f"test_bench_{profile.replace('-', '_')}.sqlite3"}
+        result = subprocess.run(
+            [sys.executable, sys.argv[0], 'bench_booking', '--worker', '--requests', str(options['requests']),
+             '--concurrency', str(options['concurrency']), '--seed', str(options['seed'])],
+            env=env, capture_output=True, text=True)
+
+        if result.returncode:
+            return {'error': result.stderr.strip().splitlines()[-1] if result.stderr.strip() else result.returncode}
+        return json.loads(result.stdout)
+
+    def run_worker(self, options):
+        # Временная база, чтобы прогон не изменял рабочие данные
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+
+        try:
+            data = generate_demo_data(halls=3, employees=12, services=5, clients=options['concurrency'], visits=0,
+                                      days=5, seed=options['seed'])
+            result = self.book_concurrently(data, options['requests'], options['concurrency'],
+                                            random.Random(options['seed']))
+        finally:
+            connection.close()
+            if getattr(connection, 'pool', None):
+                connection.close_pool()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        settings_dict = connection.settings_dict
+        return {
+            'database': connection.vendor,
+            'conn_max_age': settings_dict['CONN_MAX_AGE'],
+            'options': {key: value for key, value in settings_dict.get('OPTIONS', {}).items() if key != 'password'},
+            **result,
+        }
+
+    @staticmethod
+    def book_concurrently(data, requests, concurrency, rng):
+        """
+        Рабочие потоки бронируют визиты через API. Соединения между запросами обрабатываются
+        как в обработчике запросов Django (close_old_connections), поэтому CONN_MAX_AGE и пул влияют на замер.
+        """
+
+        tokens = [urlsafe_b64encode(AuthToken.create_token_for_user(client.user)).decode()
+                  for client in data['clients']]
+
+        calls = []
+        for _ in range(requests):
+            employee = rng.choice(data['employees'])
+            service = rng.choice(data['employee_services'][employee.id])
+            day = data['start_date'] + timedelta(days=rng.randrange(data['days']))
+            calls.append({'employee': employee.id, 'service': service.id, 'date': day.isoformat(),
+                          'time': f"{rng.randrange(10, 18):02d}:{rng.choice([0, 30]):02d}"})
+
+        results = [[] for _ in range(concurrency)]
+
+        def work(index):
+            api_client = APIClient(raise_request_exception=False)  # Ошибки базы считаются ответами 500
+            api_client.credentials(HTTP_AUTHORIZATION=f"Token {tokens[index % len(tokens)]}")
+            for params in calls[index::concurrency]:
+                close_old_connections()
+                started = perf_counter()
+                response = api_client.post(reverse('book_visit'), params, format='json')
+                results[index].append(((perf_counter() - started) * 1000, response.status_code))
+                close_old_connections()
+            connection.close()
+
+        threads = [Thread(target=work, args=(index,)) for index in range(concurrency)]
+        started = perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = perf_counter() - started
+
+        results = [result for worker in results for result in worker]
+        latencies = sorted(latency for latency, _ in results)
+        statuses = {}
+        for _, status in results:
+            statuses[status] = statuses.get(status, 0) + 1
+
+        return {
+            'requests': len(results),
+            'throughput_rps': round(len(results) / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 0.5), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+            'errors': sum(count for status, count in statuses.items() if status >= 500),
+            'statuses': statuses,
+        }
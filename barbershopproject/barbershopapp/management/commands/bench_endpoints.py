@@ -0,0 +1,140 @@
+import json
+import random
+from base64 import urlsafe_b64encode
+from datetime import timedelta
+from time import perf_counter
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_authtoken.models import AuthToken
+from rest_framework.test import APIClient
+
+from barbershopapp.demo_data import generate_demo_data
+from barbershopapp.management.commands.seed_demo_data import add_demo_data_arguments, demo_data_options
+from barbershopproject.metrics import percentile
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный прогон эндпоинтов на синтетических данных: '
+            'пропускная способность, p50/p95/p99 и количество запросов к базе в JSON')
+
+    def add_arguments(self, parser):
+        add_demo_data_arguments(parser)
+        parser.add_argument('--requests', type=int, default=200, help='Количество запросов на сценарий')
+        parser.add_argument('--output', help='Файл для JSON-отчёта (по умолчанию stdout)')
+        parser.add_argument('--current-db', action='store_true',
+                            help='Использовать текущую базу вместо временной тестовой')
+
+    def handle(self, *args, **options):
+        old_name = None
+        if not options['current_db']:
+            # Временная база, чтобы прогон не изменял рабочие данные
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+
+        try:
+            started = perf_counter()
+            data = generate_demo_data(**demo_data_options(options))
+            seeded = perf_counter() - started
+
+            report = {
+                'database': connection.vendor,
+                'options': {key: options[key] for key in ('halls', 'employees', 'services', 'clients', 'visits',
+                                                          'days', 'seed', 'requests')},
+                'seed_seconds': round(seeded, 3),
+                'endpoints': self.run_scenarios(data, options['requests'], random.Random(options['seed'])),
+            }
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+    def run_scenarios(self, data, requests, rng):
+        """
+        Выполняет сценарии и возвращает статистику по каждому эндпоинту.
+        """
+
+        # Клиенты с настоящими токенами, чтобы в замер входила аутентификация
+        tokens = [urlsafe_b64encode(AuthToken.create_token_for_user(client.user)).decode()
+                  for client in data['clients'][:20]]
+
+        admin_client = APIClient()
+        admin_client.force_login(User.objects.create_superuser('bench_admin', password=None))
+
+        def api_client():
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f"Token {rng.choice(tokens)}")
+            return client
+
+        def visit_params():
+            employee = rng.choice(data['employees'])
+            service = rng.choice(data['employee_services'][employee.id])
+            day = data['start_date'] + timedelta(days=rng.randrange(data['days']))
+            return employee, service, day
+
+        def available_time():
+            employee, service, day = visit_params()
+            return api_client().get(reverse('get_available_time'), {
+                'employee': employee.id, 'service': service.id, 'date': day.isoformat()})
+
+        def nearest_available_time():
+            _, service, day = visit_params()
+            return api_client().get(reverse('get_nearest_available_time'), {
+                'service': service.id, 'datetime': f"{day.isoformat()}T{rng.randrange(10, 18):02d}:00"})
+
+        def book_visit():
+            employee, service, day = visit_params()
+            return api_client().post(reverse('book_visit'), {
+                'employee': employee.id, 'service': service.id, 'date': day.isoformat(),
+                'time': f"{rng.randrange(10, 18):02d}:{rng.choice([0, 15, 30, 45]):02d}"}, format='json')
+
+        scenarios = {
+            'get_available_time': available_time,
+            'get_nearest_available_time': nearest_available_time,
+            'book_visit': book_visit,
+            'visit_show_client': lambda: api_client().get(reverse('visit_show_client')),
+            'employee_show': lambda: api_client().get(reverse('employee_show')),
+            'admin_visit_changelist': lambda: admin_client.get(reverse('admin:barbershopapp_visit_changelist')),
+            'admin_employee_changelist': lambda: admin_client.get(
+                reverse('admin:barbershopapp_employee_changelist')),
+        }
+
+        return {name: self.measure(scenario, requests) for name, scenario in scenarios.items()}
+
+    @staticmethod
+    def measure(scenario, requests):
+        """
+        Замеряет сценарий requests раз: задержки, количество запросов к базе и коды ответов.
+        """
+
+        latencies, queries, statuses = [], [], {}
+
+        started = perf_counter()
+        for _ in range(requests):
+            with CaptureQueriesContext(connection) as context:
+                request_started = perf_counter()
+                response = scenario()
+                latencies.append((perf_counter() - request_started) * 1000)
+            queries.append(len(context.captured_queries))
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        elapsed = perf_counter() - started
+
+        latencies.sort()
+        return {
+            'requests': requests,
+            'throughput_rps': round(requests / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 0.5), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+            'queries_avg': round(sum(queries) / requests, 2),
+            'queries_max': max(queries),
+            'statuses': statuses,
+        }
@@ -0,0 +1,55 @@
+import pickle
+import random
+import tracemalloc
+from datetime import time
+from timeit import default_timer
+
+from django.core.management.base import BaseCommand
+
+from barbershopapp.availability import HallAvailability, format_minutes
+
+# Представления слотов одного дня: как их хранит кэш и держит в памяти ответ
+FORMATS = {
+    'time': lambda slots: [time(slot // 60, slot % 60) for slot in slots],  # Объекты datetime.time
+    'str': lambda slots: [format_minutes(slot) for slot in slots],  # Строки 'HH:MM'
+    'minutes': lambda slots: slots,  # array('H') минут от начала суток
+}
+
+
+class Command(BaseCommand):
+    help = ('Память под свободные слоты диапазона дат (tracemalloc) и размер записей кэша: '
+            'datetime.time, строки и array минут')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=20, help='Количество мастеров')
+        parser.add_argument('--days', type=int, default=62, help='Количество дней')
+        parser.add_argument('--visits', type=int, default=20, help='Визитов на мастера в день')
+        parser.add_argument('--duration', type=int, default=15, help='Длительность услуги в минутах')
+        parser.add_argument('--seed', type=int, default=42, help='Зерно генератора')
+
+    def handle(self, *args, **options):
+        duration = options['duration']
+        rng = random.Random(options['seed'])
+        start, end = 8 * 60, 22 * 60
+
+        # Занятость мастеров по дням, одинаковая для всех представлений
+        days = []
+        for _ in range(options['employees'] * options['days']):
+            minutes = [rng.randrange(start, end - duration) for _ in range(options['visits'])]
+            days.append([(minute, minute + duration) for minute in minutes])
+
+        self.stdout.write(f"{'format':>8} {'slots':>8} {'peak, KiB':>10} {'retained, KiB':>14} "
+                          f"{'pickled, KiB':>13} {'time, ms':>9}")
+
+        for name, convert in FORMATS.items():
+            tracemalloc.start()
+            started = default_timer()
+            result = [convert(HallAvailability(1, start, end, blocked).free_slots(duration)) for blocked in days]
+            elapsed = default_timer() - started
+            retained, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            slots = sum(len(day) for day in result)
+            pickled = sum(len(pickle.dumps(day, pickle.HIGHEST_PROTOCOL)) for day in result)  # Как в кэше
+            self.stdout.write(f"{name:>8} {slots:>8} {peak / 1024:>10.1f} {retained / 1024:>14.1f} "
+                              f"{pickled / 1024:>13.1f} {elapsed * 1000:>9.1f}")
@@ -0,0 +1,80 @@
+import random
+from datetime import date as date_cls, datetime, time, timedelta
+from timeit import default_timer
+
+from django.core.management.base import BaseCommand
+
+from barbershopapp.availability import HallAvailability, format_minutes
+
+
+# Исходный алгоритм get_time_slots (линейный перебор), работающий по списку времён визитов
+def linear_time_slots(start_time, end_time, service_duration, visit_times, date):
+    occupied_time_slots = []
+
+    for visit_time in visit_times:
+        visit_start_time = datetime.combine(date, visit_time)
+        visit_end_time = visit_start_time + timedelta(minutes=service_duration)
+        occupied_time_slots.append((visit_start_time, visit_end_time))
+
+    available_time_slots = []
+    current_time_temp = datetime.combine(date, start_time)
+
+    while current_time_temp.time() < end_time:
+        slot_start = current_time_temp
+        slot_end = slot_start + timedelta(minutes=service_duration)
+
+        if not any(oc_start < slot_end and slot_start < oc_end for oc_start, oc_end in occupied_time_slots):
+            available_time_slots.append(slot_start.time().strftime('%H:%M'))
+
+        current_time_temp += timedelta(minutes=service_duration)
+
+    return available_time_slots
+
+
+class Command(BaseCommand):
+    help = 'Микробенчмарк расчёта свободных слотов: линейный перебор против индекса занятости'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--visits', type=int, nargs='+', default=[1000, 5000, 20000],
+                            help='Количество визитов в синтетическом зале')
+        parser.add_argument('--duration', type=int, default=15, help='Длительность услуги в минутах')
+        parser.add_argument('--repeat', type=int, default=5, help='Количество повторов замера')
+        parser.add_argument('--seed', type=int, default=42, help='Зерно генератора')
+
+    def handle(self, *args, **options):
+        duration = options['duration']
+        repeat = options['repeat']
+        rng = random.Random(options['seed'])
+        date = date_cls(2025, 1, 1)
+        start_time, end_time = time(8, 0), time(22, 0)
+        start, end = 8 * 60, 22 * 60
+        peak_start, peak_end = 12 * 60, 18 * 60  # Визиты сосредоточены в часы пик, остальное время свободно
+
+        self.stdout.write(f"{'visits':>8} {'linear, ms':>12} {'index, ms':>12} {'speedup':>9}")
+
+        for visits in options['visits']:
+            minutes = [rng.randrange(peak_start, peak_end) for _ in range(visits)]
+            visit_times = [time(minute // 60, minute % 60) for minute in minutes]
+
+            # Вместимость подбирается так, чтобы часть слотов оставалась свободной
+            capacity = max(1, visits * duration // (peak_end - peak_start))
+
+            linear = self._measure(repeat, lambda: linear_time_slots(
+                start_time, end_time, duration, visit_times, date))
+            indexed = self._measure(repeat, lambda: [format_minutes(slot) for slot in HallAvailability(
+                capacity, start, end, [(minute, minute + duration) for minute in minutes]).free_slots(duration)])
+
+            self.stdout.write(f"{visits:>8} {linear * 1000:>12.2f} {indexed * 1000:>12.2f} {linear / indexed:>8.1f}x")
+
+    @staticmethod
+    def _measure(repeat, func):
+        """
+        Возвращает лучшее время выполнения func из repeat попыток (в секундах).
+        """
+
+        best = float('inf')
+        for _ in range(repeat):
+            started = default_timer()
+            func()
+            best = min(best, default_timer() - started)
+        return best
@@ -0,0 +1,66 @@
+from datetime import date as date_cls
+from timeit import default_timer
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.renderers import JSONRenderer
+
+from barbershopapp.demo_data import generate_demo_data
+from barbershopapp.models import Visit
+from barbershopapp.serializers import VisitHistorySerializer, VisitHistoryRowSerializer
+
+
+class Command(BaseCommand):
+    help = ('Бенчмарк сериализации истории визитов: VisitHistorySerializer по объектам моделей '
+            'против плоских строк Visit.objects.history()')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Количество визитов в истории')
+        parser.add_argument('--repeat', type=int, default=3, help='Количество повторов замера')
+
+    def handle(self, *args, **options):
+        # Временная база, чтобы прогон не изменял рабочие данные
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+
+        try:
+            generate_demo_data(employees=20, clients=1, visits=options['rows'], start_date=date_cls(2025, 1, 1))
+            visits = Visit.objects.order_by('-date', '-time', '-id')
+
+            scenarios = {
+                # Как было: select_related без пользователя мастера — запрос на каждую строку
+                'serializer': lambda: VisitHistorySerializer(
+                    visits.select_related('employee', 'service').with_effective_status(), many=True).data,
+                'serializer_user_joined': lambda: VisitHistorySerializer(
+                    visits.select_related('employee__user', 'service').with_effective_status(), many=True).data,
+                'rows': lambda: VisitHistoryRowSerializer(visits.history()).data,
+            }
+
+            self.stdout.write(f"{'scenario':<24} {'ms':>10} {'queries':>8} {'bytes':>10}")
+            for name, scenario in scenarios.items():
+                elapsed, queries, size = self._measure(options['repeat'], scenario)
+                self.stdout.write(f"{name:<24} {elapsed * 1000:>10.1f} {queries:>8} {size:>10}")
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    @staticmethod
+    def _measure(repeat, scenario):
+        """
+        Лучшее время загрузки, сериализации и рендеринга JSON из repeat попыток,
+        количество запросов и размер ответа.
+        """
+
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        best = float('inf')
+        for _ in range(repeat):
+            queries.clear()
+            with connection.execute_wrapper(count):
+                started = default_timer()
+                content = JSONRenderer().render(scenario())
+                best = min(best, default_timer() - started)
+
+        return best, len(queries), len(content)
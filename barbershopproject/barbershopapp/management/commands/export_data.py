@@ -0,0 +1,30 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from barbershopapp.transfer import TRANSFERS, FORMATS, detect_format, export_file
+
+
+class Command(BaseCommand):
+    help = 'Потоковый экспорт залов, услуг, клиентов, сотрудников или визитов в CSV или JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=sorted(TRANSFERS), help='Что экспортировать')
+        parser.add_argument('path', help='Путь к файлу (формат определяется по расширению)')
+        parser.add_argument('--format', choices=FORMATS, help='Формат файла, если расширение другое')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Количество записей в одном запросе')
+
+    def handle(self, *args, **options):
+        try:
+            fmt = detect_format(options['path'], options['format'])
+        except ValueError as error:
+            raise CommandError(error)
+
+        def progress(total):
+            sys.stderr.write(f"\rЭкспортировано: {total}")
+
+        with open(options['path'], 'w', encoding='utf-8', newline='') as file:
+            total = export_file(file, fmt, TRANSFERS[options['model']](), options['batch_size'], progress)
+
+        sys.stderr.write('\n')
+        self.stdout.write(self.style.SUCCESS(f"Экспортировано записей: {total}"))
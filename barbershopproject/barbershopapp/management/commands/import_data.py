@@ -0,0 +1,31 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from barbershopapp.transfer import TRANSFERS, FORMATS, detect_format, import_file
+
+
+class Command(BaseCommand):
+    help = ('Потоковый импорт залов, услуг, клиентов, сотрудников или визитов из CSV или JSONL. '
+            'Порядок: hall, service, client, employee, visit')
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=sorted(TRANSFERS), help='Что импортировать')
+        parser.add_argument('path', help='Путь к файлу (формат определяется по расширению)')
+        parser.add_argument('--format', choices=FORMATS, help='Формат файла, если расширение другое')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Количество строк в одном bulk_create')
+
+    def handle(self, *args, **options):
+        try:
+            fmt = detect_format(options['path'], options['format'])
+        except ValueError as error:
+            raise CommandError(error)
+
+        def progress(total):
+            sys.stderr.write(f"\rИмпортировано: {total}")
+
+        with open(options['path'], encoding='utf-8', newline='') as file:
+            total = import_file(file, fmt, TRANSFERS[options['model']](), options['batch_size'], progress)
+
+        sys.stderr.write('\n')
+        self.stdout.write(self.style.SUCCESS(f"Импортировано записей: {total}"))
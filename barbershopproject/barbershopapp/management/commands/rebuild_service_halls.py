@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from barbershopapp.models import Employee
+from barbershopapp.service_halls import sync_service_halls
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает связи всех сотрудников с парами «услуга-зал» (после массового импорта персонала)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Количество сотрудников в одном пакете')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        employee_ids = list(Employee.objects.order_by('id').values_list('id', flat=True))
+
+        added = removed = 0
+        for offset in range(0, len(employee_ids), batch_size):
+            batch_added, batch_removed = sync_service_halls(employee_ids[offset:offset + batch_size])
+            added += batch_added
+            removed += batch_removed
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Сотрудников: {len(employee_ids)}, добавлено связей: {added}, удалено связей: {removed}"))
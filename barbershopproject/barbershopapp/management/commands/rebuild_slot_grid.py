@@ -0,0 +1,40 @@
+from datetime import date as date_cls, datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from barbershopapp import slot_grid
+from barbershopapp.models import Hall, SlotGrid
+
+
+class Command(BaseCommand):
+    help = ('Перестраивает сетки мест залов по визитам из базы '
+            '(после включения SLOT_GRID_ENABLED, массового импорта или восстановления данных)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', help='Первая дата YYYY-MM-DD (по умолчанию сегодня)')
+        parser.add_argument('--days', type=int, default=30, help='Количество дней начиная с --date-from')
+        parser.add_argument('--hall', type=int, action='append', help='id зала (можно несколько раз)')
+        parser.add_argument('--clear', action='store_true',
+                            help='Предварительно удалить все сетки (в том числе за пределами диапазона)')
+
+    def handle(self, *args, **options):
+        try:
+            date_from = (datetime.strptime(options['date_from'], '%Y-%m-%d').date()
+                         if options['date_from'] else date_cls.today())
+        except ValueError:
+            raise CommandError("Дата должна быть в формате YYYY-MM-DD")
+
+        if options['clear']:
+            SlotGrid.objects.all().delete()
+
+        halls = Hall.objects.order_by('id')
+        if options['hall']:
+            halls = halls.filter(id__in=options['hall'])
+
+        built = 0
+        for hall in halls:
+            for day in range(options['days']):
+                slot_grid.build(hall, date_from + timedelta(days=day))
+                built += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Перестроено сеток: {built}"))
@@ -0,0 +1,54 @@
+from datetime import datetime
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from barbershopapp.demo_data import generate_demo_data
+
+
+def add_demo_data_arguments(parser):
+    """
+    Параметры объёма синтетических данных (общие с bench_endpoints).
+    """
+
+    parser.add_argument('--halls', type=int, default=5, help='Количество залов')
+    parser.add_argument('--employees', type=int, default=20, help='Количество сотрудников')
+    parser.add_argument('--services', type=int, default=10, help='Количество услуг')
+    parser.add_argument('--clients', type=int, default=200, help='Количество клиентов')
+    parser.add_argument('--visits', type=int, default=5000, help='Количество визитов')
+    parser.add_argument('--days', type=int, default=30, help='Количество дней с визитами')
+    parser.add_argument('--seed', type=int, default=42, help='Зерно генератора')
+    parser.add_argument('--start-date', help='Первая дата визитов YYYY-MM-DD (по умолчанию сегодня)')
+    parser.add_argument('--prefix', default='demo', help='Префикс логинов пользователей')
+
+
+def demo_data_options(options):
+    """
+    Переводит параметры команды в аргументы generate_demo_data.
+    """
+
+    start_date = datetime.strptime(options['start_date'], '%Y-%m-%d').date() if options['start_date'] else None
+    return {
+        'halls': options['halls'], 'employees': options['employees'], 'services': options['services'],
+        'clients': options['clients'], 'visits': options['visits'], 'days': options['days'],
+        'seed': options['seed'], 'start_date': start_date, 'prefix': options['prefix'],
+    }
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу детерминированными синтетическими данными для нагрузочного тестирования'
+
+    def add_arguments(self, parser):
+        add_demo_data_arguments(parser)
+
+    def handle(self, *args, **options):
+        if User.objects.filter(username__startswith=f"{options['prefix']}_").exists():
+            raise CommandError(f"Данные с префиксом '{options['prefix']}' уже есть, укажите другой --prefix")
+
+        with transaction.atomic():
+            generate_demo_data(**demo_data_options(options))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Создано: залов {options['halls']}, сотрудников {options['employees']}, услуг {options['services']}, "
+            f"клиентов {options['clients']}, визитов {options['visits']}"))
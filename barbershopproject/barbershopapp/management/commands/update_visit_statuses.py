@@ -0,0 +1,59 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from barbershopapp.time_slots import update_status_visits
+
+
+class Command(BaseCommand):
+    help = ('Сохраняет статус «Выполнена» для прошедших визитов. '
+            'API вычисляет эффективный статус при чтении, поэтому команду можно запускать в часы низкой нагрузки')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Интервал между запусками в секундах (0 — выполнить один раз)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Количество визитов в одном UPDATE')
+        parser.add_argument('--window', help='Окно низкой нагрузки HH:MM-HH:MM, вне его обновление пропускается')
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        window = self._parse_window(options['window']) if options['window'] else None
+
+        try:
+            while True:
+                if window is None or self._in_window(window, datetime.now().time()):
+                    updated = update_status_visits(batch_size=options['batch_size'])
+                    self.stdout.write(f"Обновлено визитов: {updated}")
+                else:
+                    self.stdout.write("Вне окна низкой нагрузки, обновление пропущено")
+
+                if interval <= 0:
+                    break
+                time.sleep(interval)
+
+        except KeyboardInterrupt:
+            self.stdout.write("Остановлено")
+
+    @staticmethod
+    def _parse_window(value):
+        """
+        Разбирает окно 'HH:MM-HH:MM' в пару объектов time.
+        """
+
+        try:
+            start, end = value.split('-')
+            return datetime.strptime(start, '%H:%M').time(), datetime.strptime(end, '%H:%M').time()
+        except ValueError:
+            raise CommandError("Окно должно быть в формате HH:MM-HH:MM")
+
+    @staticmethod
+    def _in_window(window, current):
+        """
+        Проверяет попадание времени в окно, в том числе переходящее через полночь.
+        """
+
+        start, end = window
+        if start <= end:
+            return start <= current < end
+        return current >= start or current < end
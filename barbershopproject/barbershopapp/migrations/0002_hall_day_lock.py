@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('barbershopapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='employee',
+            name='service_halls',
+            field=models.ManyToManyField(blank=True, related_name='employees', to='barbershopapp.servicehall'),
+        ),
+        migrations.CreateModel(
+            name='HallDayLock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('hall', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_locks', to='barbershopapp.hall')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('hall', 'date'), name='unique_hall_day_lock')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('barbershopapp', '0002_hall_day_lock'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(fields=['hall', 'date', 'time'], name='visit_hall_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(fields=['client', 'date', 'time'], name='visit_client_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(condition=models.Q(('status', 'Запланирована')), fields=['date', 'time'], name='visit_planned_date_time_idx'),
+        ),
+        # Одиночные индексы внешних ключей удаляются после создания составных
+        migrations.AlterField(
+            model_name='visit',
+            name='client',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='visits', to='barbershopapp.client'),
+        ),
+        migrations.AlterField(
+            model_name='visit',
+            name='hall',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='visits', to='barbershopapp.hall'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:04
+
+from django.db import migrations, models
+
+
+def merge_duplicate_service_halls(apps, schema_editor):
+    """Объединяет дубликаты (услуга, зал) перед добавлением ограничения уникальности."""
+    ServiceHall = apps.get_model('barbershopapp', 'ServiceHall')
+    Employee = apps.get_model('barbershopapp', 'Employee')
+    through = Employee.service_halls.through
+
+    keep = {}  # (услуга, зал) -> id оставляемой записи
+    duplicates = {}  # id дубликата -> id оставляемой записи
+    for service_hall_id, service_id, hall_id in ServiceHall.objects.order_by('id').values_list('id', 'service_id', 'hall_id'):
+        key = (service_id, hall_id)
+        if key in keep:
+            duplicates[service_hall_id] = keep[key]
+        else:
+            keep[key] = service_hall_id
+
+    if not duplicates:
+        return
+
+    # Переносим связи сотрудников на оставляемые записи без повторов
+    existing = set(through.objects.values_list('employee_id', 'servicehall_id'))
+    links = through.objects.filter(servicehall_id__in=duplicates).values_list('employee_id', 'servicehall_id')
+    through.objects.bulk_create([
+        through(employee_id=employee_id, servicehall_id=duplicates[service_hall_id])
+        for employee_id, service_hall_id in set(links)
+        if (employee_id, duplicates[service_hall_id]) not in existing
+    ], ignore_conflicts=True)
+
+    ServiceHall.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('barbershopapp', '0003_visit_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_service_halls, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='servicehall',
+            constraint=models.UniqueConstraint(fields=('service', 'hall'), name='unique_service_hall'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('barbershopapp', '0004_unique_service_hall'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotGrid',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('start', models.PositiveIntegerField()),
+                ('end', models.PositiveIntegerField()),
+                ('capacity', models.PositiveIntegerField()),
+                ('remaining', models.BinaryField()),
+                ('hall', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_grids', to='barbershopapp.hall')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('hall', 'date'), name='unique_slot_grid')],
+            },
+        ),
+    ]
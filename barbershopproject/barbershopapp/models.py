@@ -1,6 +1,9 @@
+from datetime import datetime
+
 from django.contrib.auth.models import User
 from django.db import models
 from django.core.validators import RegexValidator
+from django.db.models.functions import Concat
 from django.utils.timezone import now
 
 
@@ -53,6 +56,16 @@ class Service(models.Model):
         return self.name
 
 
+class EmployeeQuerySet(models.QuerySet):
+    def with_related(self):
+        """
+        Загружает пользователя, залы и услуги сотрудников фиксированным числом запросов
+        (для вложенных сериализаторов EmployeeSerializer).
+        """
+
+        return self.select_related('user').prefetch_related('halls', 'services')
+
+
 class Employee(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='employee')  # Пользователь
 
@@ -65,35 +78,72 @@ class Employee(models.Model):
 
     services = models.ManyToManyField(Service, related_name='employees')  # Услуги
 
-    # Дополнительная модель для связи услуги с залом
+    # Дополнительная модель для связи услуги с залом.
+    # Заполняется автоматически при изменении halls и services (см. signals.py и service_halls.py)
     service_halls = models.ManyToManyField('ServiceHall', related_name='employees', blank=True)
 
+    objects = EmployeeQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.user.first_name} {self.user.last_name}"
 
-    def save(self, *args, **kwargs):
-        """Метод сохранения сотрудника и связи с услугами и залами."""
-
-        super().save(*args, **kwargs)  # Сначала сохраняем сотрудника
-
-        # Логика автоматического заполнения service_halls
-        for hall in self.halls.all():
-            for service in self.services.all():
-                service_hall, created = ServiceHall.objects.get_or_create(service=service,
-                                                                          hall=hall)  # Проверяем, существует ли связь между Hall и Service. Если такой записи в ServiceHall нет, то создаём.
-                self.service_halls.add(service_hall)
-
 
 class ServiceHall(models.Model):
     service = models.ForeignKey(Service, on_delete=models.CASCADE)  # Услуга
     hall = models.ForeignKey(Hall, on_delete=models.CASCADE)  # Зал
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['service', 'hall'], name='unique_service_hall'),
+        ]
+
     def __str__(self):
         return f"{self.service.name} - {self.hall.name}"
 
 
+# Условие для визитов, время которых уже наступило
+def past_visits_q(current=None):
+    current = current or datetime.now()  # Текущие дата и время
+    return models.Q(date__lt=current.date()) | models.Q(date=current.date(), time__lt=current.time())
+
+
+class VisitQuerySet(models.QuerySet):
+    def with_effective_status(self, current=None):
+        """
+        Добавляет effective_status: прошедшие запланированные визиты считаются выполненными
+        без записи статуса в базу.
+        """
+
+        return self.annotate(effective_status=models.Case(
+            models.When(models.Q(status='Запланирована') & past_visits_q(current), then=models.Value('Выполнена')),
+            default=models.F('status'),
+            output_field=models.CharField(),
+        ))
+
+    def history(self, fields=None):
+        """
+        Плоские строки истории визитов: имя и телефон мастера, название и цена услуги
+        вычисляются в SQL одним запросом, объекты моделей не создаются.
+        Ключи id, date, time и effective_status есть всегда (для пагинации и статуса).
+
+        :param fields: поля VisitHistorySerializer, которые нужны в ответе (None — все)
+        """
+
+        columns = {
+            'employee_name': Concat('employee__user__first_name', models.Value(' '), 'employee__user__last_name',
+                                    output_field=models.CharField()),
+            'employee_phone': models.F('employee__phone_number'),
+            'service_name': models.F('service__name'),
+            'service_price': models.F('service__price'),
+        }
+
+        return self.with_effective_status().values('id', 'date', 'time', 'effective_status', **{
+            name: column for name, column in columns.items() if fields is None or name in fields})
+
+
 class Visit(models.Model):
-    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='visits')  # Клиент
+    # Отдельный индекс не нужен: client_id — префикс составного индекса visit_client_date_time_idx
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='visits', db_index=False)  # Клиент
 
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='visits')  # Сотрудник
 
@@ -108,8 +158,33 @@ class Visit(models.Model):
         ('Выполнена', 'Выполнена'),
     ], default='Запланирована')  # Статус
 
-    # Автоматически выбираем зал в зависимости от услуги и мастера
-    hall = models.ForeignKey(Hall, on_delete=models.CASCADE, related_name='visits', null=True, blank=True)
+    # Автоматически выбираем зал в зависимости от услуги и мастера.
+    # Отдельный индекс не нужен: hall_id — префикс составного индекса visit_hall_date_time_idx
+    hall = models.ForeignKey(Hall, on_delete=models.CASCADE, related_name='visits', null=True, blank=True,
+                             db_index=False)
+
+    objects = VisitQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Занятость зала на дату и проверка вместимости
+            models.Index(fields=['hall', 'date', 'time'], name='visit_hall_date_time_idx'),
+            # История визитов клиента
+            models.Index(fields=['client', 'date', 'time'], name='visit_client_date_time_idx'),
+            # Обновление статусов: только запланированные визиты
+            models.Index(fields=['date', 'time'], name='visit_planned_date_time_idx',
+                         condition=models.Q(status='Запланирована')),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминаем исходные зал, мастера, дату и время, чтобы при переносе визита обновить и старый день."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_visit_day = (instance.__dict__.get('hall_id'), instance.__dict__.get('employee_id'),
+                                      instance.__dict__.get('date'))
+        instance._loaded_slot = (instance.__dict__.get('hall_id'), instance.__dict__.get('date'),
+                                 instance.__dict__.get('time'), instance.__dict__.get('service_id'))
+        return instance
 
     def save(self, *args, **kwargs):
         """Метод сохранения визита и автоматического выбора зала."""
@@ -121,3 +196,58 @@ class Visit(models.Model):
 
     def __str__(self):
         return f"{self.client} - {self.service.name} с {self.employee}"
+
+
+class HallDayLock(models.Model):
+    """Строка-блокировка записи в зал на дату: сериализует конкурирующие бронирования."""
+
+    hall = models.ForeignKey(Hall, on_delete=models.CASCADE, related_name='day_locks')  # Зал
+
+    date = models.DateField()  # Дата
+
+    version = models.PositiveIntegerField(default=0)  # Счётчик изменений записи на дату
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['hall', 'date'], name='unique_hall_day_lock'),
+        ]
+
+    def __str__(self):
+        return f"{self.hall} - {self.date}"
+
+
+class SlotGrid(models.Model):
+    """Остаток мест зала на дату по шагам фиксированной длины (см. slot_grid.py)."""
+
+    hall = models.ForeignKey(Hall, on_delete=models.CASCADE, related_name='slot_grids')  # Зал
+
+    date = models.DateField()  # Дата
+
+    start = models.PositiveIntegerField()  # Начало сетки в минутах (начало работы зала при построении)
+
+    end = models.PositiveIntegerField()  # Конец сетки в минутах (конец работы зала при построении)
+
+    capacity = models.PositiveIntegerField()  # Вместимость зала при построении
+
+    remaining = models.BinaryField()  # Остаток мест на каждый шаг: array('h') в байтах
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['hall', 'date'], name='unique_slot_grid'),
+        ]
+
+    def __str__(self):
+        return f"{self.hall} - {self.date}"
+
+
+class CatalogVersion(models.Model):
+    """Счётчик изменений справочника (залы, услуги, сотрудники) для ETag и кэша ответов (см. catalog_cache.py)."""
+
+    name = models.CharField(max_length=50, unique=True)  # Имя справочника
+
+    version = models.PositiveBigIntegerField(default=0)  # Номер версии, растёт при каждом изменении
+
+    updated_at = models.DateTimeField()  # Время последнего изменения (Last-Modified)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
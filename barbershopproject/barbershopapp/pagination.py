@@ -0,0 +1,121 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date as date_cls, time as time_cls
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class CatalogCursorPagination(CursorPagination):
+    """
+    Постраничная выдача справочников (сотрудники, залы, услуги) по id без OFFSET.
+    """
+
+    ordering = 'id'  # Уникальный ключ: позиция курсора однозначна
+    page_size = 100  # Размер страницы по умолчанию
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class VisitKeysetPagination(BasePagination):
+    """
+    Постраничная выдача визитов от новых к старым по ключу (дата, время, id).
+
+    Курсор хранит ключ крайней строки страницы и направление: следующая страница выбирается
+    условием «ключ меньше курсора», предыдущая — «ключ больше курсора» по индексу
+    (client, date, time) без OFFSET, поэтому время ответа не зависит от номера страницы.
+    Ответ в том же формате, что у CursorPagination справочников: next, previous, results.
+    """
+
+    ordering = ('-date', '-time', '-id')
+    page_size = 50  # Размер страницы по умолчанию
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = "Некорректный курсор."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor[3]
+        if cursor is not None:
+            date, time, pk, _ = cursor
+            before = Q(date__lt=date) | Q(date=date, time__lt=time) | Q(date=date, time=time, id__lt=pk)
+            after = Q(date__gt=date) | Q(date=date, time__gt=time) | Q(date=date, time=time, id__gt=pk)
+            queryset = queryset.filter(after if reverse else before)
+
+        # Лишняя строка показывает, есть ли страница дальше в направлении чтения
+        ordering = [field[1:] for field in self.ordering] if reverse else self.ordering
+        rows = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        # Назад от первой страницы и вперёд от предыдущей страницы строки есть всегда
+        self.has_next = bool(rows) and (reverse or has_more)
+        self.has_previous = bool(rows) and (has_more if reverse else cursor is not None)
+        self.next_key = _key(rows[-1]) if self.has_next else None
+        self.previous_key = _key(rows[0]) if self.has_previous else None
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        """
+        Возвращает (дата, время, id, назад) из параметра cursor или None.
+        """
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            date, time, pk, direction = urlsafe_b64decode(encoded.encode()).decode().split('|')
+            if direction not in ('n', 'p'):
+                raise ValueError(direction)
+            return date_cls.fromisoformat(date), time_cls.fromisoformat(time), int(pk), direction == 'p'
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, key, reverse=False):
+        date, time, pk = key
+        encoded = urlsafe_b64encode(
+            f"{date.isoformat()}|{time.isoformat()}|{pk}|{'p' if reverse else 'n'}".encode()).decode()
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        return self.encode_cursor(self.next_key) if self.has_next else None
+
+    def get_previous_link(self):
+        return self.encode_cursor(self.previous_key, reverse=True) if self.has_previous else None
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'previous': self.get_previous_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+def _key(row):
+    # Ключ строки: объект модели или словарь из values()
+    if isinstance(row, dict):
+        return row['date'], row['time'], row['id']
+    return row.date, row.time, row.id
@@ -0,0 +1,118 @@
+"""
+Чтение с реплики для читающих эндпоинтов (свободные слоты, история визитов, справочники).
+
+Реплика включается настройкой DATABASE_REPLICA (алиас в DATABASES, см. database.py). Роутер
+отправляет чтение на реплику только внутри reads(): представления с ReplicaReadMixin входят
+в него после аутентификации, всё остальное, а также любые запросы внутри транзакции основной
+базы, идут в основную базу.
+
+Read-your-writes: после бронирования, переноса или удаления визита пользователь на
+REPLICA_PIN_SECONDS закрепляется за основной базой (ключ в кэше default; при нескольких
+процессах кэш должен быть общим), чтобы сразу увидеть свою запись, даже если реплика отстаёт.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+_reads = ContextVar('replica_reads', default=False)  # Чтение с реплики разрешено в текущем контексте
+
+
+def alias():
+    return getattr(settings, 'DATABASE_REPLICA', None)
+
+
+def _pin_key(user_id):
+    return f"replica:pin:{user_id}"
+
+
+def pin(user):
+    """
+    Закрепляет пользователя за основной базой на REPLICA_PIN_SECONDS.
+    """
+
+    if alias() and user and user.is_authenticated:
+        cache.set(_pin_key(user.pk), True, getattr(settings, 'REPLICA_PIN_SECONDS', 5))
+
+
+def is_pinned(user):
+    return bool(user and user.is_authenticated and cache.get(_pin_key(user.pk)))
+
+
+@contextmanager
+def reads(user):
+    """
+    Разрешает чтение с реплики, если она настроена и пользователь не закреплён за основной базой.
+    """
+
+    token = _reads.set(bool(alias()) and not is_pinned(user))
+    try:
+        yield
+    finally:
+        _reads.reset(token)
+
+
+def cache_timeout():
+    """
+    TTL для кэша свободных слотов: посчитанное по реплике может отставать от сброса кэша
+    бронированием, поэтому хранится не дольше окна закрепления.
+    """
+
+    if ReadReplicaRouter().db_for_read(None):
+        return getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+    return DEFAULT_TIMEOUT
+
+
+class ReadReplicaRouter:
+    """
+    Роутер: чтение внутри reads() — с реплики, запись и всё остальное — в основную базу.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _reads.get() and alias() and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика содержит те же данные: объекты с реплики и основной базы можно связывать
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема на реплику приходит репликацией
+        return False if db == alias() else None
+
+
+class ReplicaReadMixin:
+    """
+    Чтение с реплики в обработчике представления DRF (аутентификация и права — по основной базе).
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._replica_reads = reads(request.user)
+        self._replica_reads.__enter__()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        replica_reads = getattr(self, '_replica_reads', None)
+        if replica_reads is not None:
+            self._replica_reads = None
+            replica_reads.__exit__(None, None, None)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class PinPrimaryMixin:
+    """
+    Закрепление пользователя за основной базой после успешной записи.
+    """
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
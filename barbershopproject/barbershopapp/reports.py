@@ -0,0 +1,159 @@
+"""
+Отчёт о загрузке залов и мастеров за период.
+
+Визиты периода загружаются одним запросом в массивы NumPy (зал, мастер, день,
+начало, длительность). Занятость считается векторно: начала и концы визитов
+разносятся в разностный массив (зал × день × минута) через np.add.at, затем
+накопленная сумма по минутам даёт число одновременных визитов. По ней за один
+проход получаются загрузка и количество свободных слотов для всех залов и дней.
+
+Занятость считается поминутно, а не по шагам сетки slot_grid: при времени визитов и слотов,
+не кратном 5 минутам, округление до шага занимало бы лишние минуты и расходилось с get_time_slots.
+"""
+from datetime import timedelta
+
+import numpy as np
+
+from .availability import to_minutes
+from .models import Hall, Employee, Visit
+
+MINUTES = 24 * 60  # Минут в сутках: занятость считается без округления времени визитов
+
+
+def load_visits(date_from, date_to, halls, employees):
+    """
+    Загружает визиты периода в массивы одним запросом.
+
+    :param halls: словарь {id зала: индекс}
+    :param employees: словарь {id мастера: индекс}
+    :return: словарь массивов hall, employee, day, start, duration (минуты)
+    """
+
+    rows = Visit.objects.filter(date__range=(date_from, date_to), hall_id__isnull=False).values_list(
+        'hall_id', 'employee_id', 'date', 'time', 'service__duration')
+
+    hall, employee, day, start, duration = [], [], [], [], []
+    for hall_id, employee_id, date, time, service_duration in rows.iterator(chunk_size=5000):
+        hall.append(halls[hall_id])
+        employee.append(employees[employee_id])
+        day.append((date - date_from).days)
+        start.append(to_minutes(time))
+        duration.append(to_minutes(service_duration))
+
+    return {
+        'hall': np.array(hall, dtype=np.intp),
+        'employee': np.array(employee, dtype=np.intp),
+        'day': np.array(day, dtype=np.intp),
+        'start': np.array(start, dtype=np.int32),
+        'duration': np.array(duration, dtype=np.int32),
+    }
+
+
+def occupancy(visits, hall_count, day_count):
+    """
+    Число одновременных визитов в каждом зале на каждый день и минуту.
+
+    :return: массив формы (залы, дни, MINUTES)
+    """
+
+    first = visits['start']
+    last = np.minimum(visits['start'] + visits['duration'], MINUTES)
+    keep = last > first
+
+    # Разностный массив: +1 на первой минуте визита, -1 после последней
+    diff = np.zeros((hall_count, day_count, MINUTES + 1), dtype=np.int32)
+    np.add.at(diff, (visits['hall'][keep], visits['day'][keep], first[keep]), 1)
+    np.add.at(diff, (visits['hall'][keep], visits['day'][keep], last[keep]), -1)
+
+    return np.cumsum(diff, axis=2)[:, :, :MINUTES]
+
+
+def utilization_report(date_from, date_to, duration=60):
+    """
+    Загрузка и свободные слоты всех залов и загрузка всех мастеров за период.
+
+    Загрузка зала — доля занятых мест-минут в часы работы (визиты сверх вместимости не учитываются).
+    Свободный слот — как в get_time_slots без мастера: слоты длительностью duration
+    с шагом duration от начала работы, заканчивающиеся до закрытия зала, в которых в зале есть место.
+
+    :param date_from: первая дата периода
+    :param date_to: последняя дата периода (включительно)
+    :param duration: длительность слота в минутах
+    :return: словарь с отчётами по залам и мастерам
+    """
+
+    day_count = (date_to - date_from).days + 1
+    dates = [(date_from + timedelta(days=day)).isoformat() for day in range(day_count)]
+
+    halls = list(Hall.objects.order_by('id'))
+    hall_index = {hall.id: index for index, hall in enumerate(halls)}
+    employees = list(Employee.objects.select_related('user').order_by('id'))
+    employee_index = {employee.id: index for index, employee in enumerate(employees)}
+
+    visits = load_visits(date_from, date_to, hall_index, employee_index)
+    load = occupancy(visits, len(halls), day_count)
+
+    capacity = np.array([hall.capacity for hall in halls], dtype=np.int32)
+    opens = np.array([to_minutes(hall.start_time) for hall in halls], dtype=np.int32)
+    closes = np.array([to_minutes(hall.end_time) for hall in halls], dtype=np.int32)
+
+    # Часы работы залов по минутам: (залы, MINUTES)
+    minutes = np.arange(MINUTES)
+    open_mask = (minutes >= opens[:, None]) & (minutes < closes[:, None])
+
+    # Загрузка: занятые места-минуты / доступные места-минуты в часы работы
+    seats = np.minimum(load, capacity[:, None, None]) * open_mask[:, None, :]
+    available = capacity * open_mask.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        utilization = np.where(available[:, None] > 0, seats.sum(axis=2) / available[:, None], 0.0)
+
+    # Свободные слоты: число заполненных минут в окне слота через накопленную сумму
+    full = np.concatenate([np.zeros((len(halls), day_count, 1), dtype=np.int32),
+                           np.cumsum(load >= capacity[:, None, None], axis=2, dtype=np.int32)], axis=2)
+    free_slots = np.zeros((len(halls), day_count), dtype=np.int32)
+    if duration > 0:
+        slot_hall, slot_start = [], []
+        for index in range(len(halls)):
+            starts = np.arange(opens[index], closes[index] - duration + 1, duration)
+            slot_hall.append(np.full(len(starts), index, dtype=np.intp))
+            slot_start.append(starts)
+        slot_hall = np.concatenate(slot_hall) if halls else np.zeros(0, dtype=np.intp)
+        slot_start = np.concatenate(slot_start) if halls else np.zeros(0, dtype=np.int32)
+
+        last = np.minimum(slot_start + duration, MINUTES)
+        blocked = full[slot_hall, :, last] - full[slot_hall, :, slot_start]  # (слоты, дни)
+        np.add.at(free_slots, slot_hall, (blocked == 0).astype(np.int32))
+
+    # Мастера: количество визитов и занятые минуты по дням
+    employee_visits = np.zeros((len(employees), day_count), dtype=np.int32)
+    employee_minutes = np.zeros((len(employees), day_count), dtype=np.int32)
+    np.add.at(employee_visits, (visits['employee'], visits['day']), 1)
+    np.add.at(employee_minutes, (visits['employee'], visits['day']), visits['duration'])
+
+    hall_visits = np.zeros((len(halls), day_count), dtype=np.int32)
+    np.add.at(hall_visits, (visits['hall'], visits['day']), 1)
+
+    return {
+        'date_from': date_from.isoformat(),
+        'date_to': date_to.isoformat(),
+        'slot_duration': duration,
+        'halls': [{
+            'hall': hall.id,
+            'name': hall.name,
+            'utilization': round(float(seats[index].sum() / (available[index] * day_count)), 4)
+            if available[index] else 0.0,
+            'days': {date: {'visits': int(hall_visits[index, day]),
+                            'utilization': round(float(utilization[index, day]), 4),
+                            'free_slots': int(free_slots[index, day])}
+                     for day, date in enumerate(dates)},
+        } for index, hall in enumerate(halls)],
+        'employees': [{
+            'employee': employee.id,
+            'name': str(employee),
+            'visits': int(employee_visits[index].sum()),
+            'booked_minutes': int(employee_minutes[index].sum()),
+            'days': {date: {'visits': int(employee_visits[index, day]),
+                            'booked_minutes': int(employee_minutes[index, day])}
+                     for day, date in enumerate(dates)},
+        } for index, employee in enumerate(employees)],
+    }
@@ -1,8 +1,12 @@
+from operator import itemgetter
+
 from django.contrib.auth.models import User
 from django.utils.translation import gettext_lazy as _
 from rest_framework.fields import SerializerMethodField
-from rest_framework.serializers import ModelSerializer, PrimaryKeyRelatedField, CharField, ValidationError
+from rest_framework.serializers import ModelSerializer, PrimaryKeyRelatedField, CharField, ValidationError, \
+    Serializer, IntegerField, DateField, TimeField
 
+from .booking import book_visit, reschedule_visit
 from .models import Client, Employee, Hall, Service, Visit
 
 
@@ -145,6 +149,7 @@ class VisitHistorySerializer(ModelSerializer):
     service_price = SerializerMethodField()  # Добавляем сериализатор для отображения цены услуги
     service_name = SerializerMethodField()  # Добавляем сериализатор для отображения названия услуги
     date_time = SerializerMethodField()  # Добавляем сериализатор для отображения даты и времени
+    status = CharField(source='effective_status', read_only=True)  # Статус с учётом наступившего времени визита
 
     class Meta:
         model = Visit
@@ -186,6 +191,32 @@ class VisitHistorySerializer(ModelSerializer):
         return f"{obj.date} {obj.time.strftime('%H:%M')}"
 
 
+class VisitHistoryRowSerializer:
+    """
+    Быстрая сериализация строк Visit.objects.history() без объектов моделей и полей-методов.
+    Ответ совпадает с VisitHistorySerializer; fields — выборка полей (параметр запроса fields=id,status).
+    """
+
+    getters = {
+        'id': itemgetter('id'),
+        'employee_name': itemgetter('employee_name'),
+        'employee_phone': itemgetter('employee_phone'),
+        'service_name': itemgetter('service_name'),
+        'service_price': itemgetter('service_price'),
+        'date_time': lambda row: f"{row['date']} {row['time'].strftime('%H:%M')}",
+        'status': itemgetter('effective_status'),
+    }
+
+    def __init__(self, rows, fields=None):
+        self.rows = rows
+        self.fields = [(name, self.getters[name]) for name in fields or VisitHistorySerializer.Meta.fields]
+
+    @property
+    def data(self):
+        fields = self.fields
+        return [{name: getter(row) for name, getter in fields} for row in self.rows]
+
+
 class VisitSerializer(ModelSerializer):
     employee = PrimaryKeyRelatedField(queryset=Employee.objects.all())  # Сериализуем данные сотрудника
     service = PrimaryKeyRelatedField(queryset=Service.objects.all())  # Сериализуем данные услуги
@@ -198,26 +229,21 @@ class VisitSerializer(ModelSerializer):
 
     def validate(self, attrs):
         """
-        Проверка переполненности зала при валидации данных
+        Автоматический выбор зала при валидации данных.
+        Переполненность зала проверяется под блокировкой при сохранении (см. booking.py).
         """
 
         employee = attrs.get('employee')  # Получаем данные сотрудника
         service = attrs.get('service')  # Получаем данные услуги
-        date = attrs.get('date')  # Получаем данные даты
-        time = attrs.get('time')  # Получаем данные времени
 
-        if employee and service and date and time:
+        if employee and service:
             # Найти доступные залы для сотрудника
-            service_hall = employee.service_halls.filter(service=service).first()
-
-            hall = service_hall.hall  # Найти зал
-            existing_visits = Visit.objects.filter(hall=hall, date=date, time=time)  # Найти существующие визиты
+            service_hall = employee.service_halls.filter(service=service).select_related('hall').first()
 
-            # Проверка переполненности зала
-            if existing_visits.count() >= hall.capacity:
-                raise ValidationError("Зал переполнен на выбранное время.")
+            if service_hall is None:
+                raise ValidationError("Сотрудник не оказывает выбранную услугу.")
 
-            attrs['hall'] = hall  # Устанавливаем автоматически зал
+            attrs['hall'] = service_hall.hall  # Устанавливаем автоматически зал
 
         return attrs
 
@@ -232,15 +258,9 @@ class VisitSerializer(ModelSerializer):
         date = validated_data.get('date')  # Получаем данные даты
         time = validated_data.get('time')  # Получаем данные времени
 
-        # Создание визита с учетом зала
-        visit = Visit.objects.create(
-            employee=employee,
-            service=service,
-            date=date,
-            time=time,
-            hall=validated_data.get('hall'),
-            client=client
-        )
+        # Создание визита с учетом зала: проверка вместимости и вставка выполняются атомарно
+        visit = book_visit(client=client, employee=employee, service=service, date=date, time=time,
+                           hall=validated_data.get('hall'))
 
         return visit
 
@@ -249,10 +269,17 @@ class VisitSerializer(ModelSerializer):
         Обновляем существующий визит
         """
 
-        # Обновляем поля визита
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
+        # Обновляем поля визита и сохраняем его под блокировкой с проверкой вместимости
+        return reschedule_visit(instance, validated_data)
 
-        # Сохраняем обновленный визит
-        instance.save()
-        return instance
+
+class VisitBatchItemSerializer(Serializer):
+    employee = IntegerField()  # id сотрудника
+    service = IntegerField()  # id услуги
+    date = DateField()  # Дата визита
+    time = TimeField()  # Время визита
+
+
+class VisitBatchSerializer(Serializer):
+    # Позиции пакета; сотрудники, услуги и залы проверяются пакетно при бронировании (см. booking.py)
+    visits = VisitBatchItemSerializer(many=True, allow_empty=False, max_length=10)
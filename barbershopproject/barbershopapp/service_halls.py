@@ -0,0 +1,79 @@
+from collections import defaultdict
+
+from django.db import transaction
+
+from .models import Employee, ServiceHall
+
+
+# Функция синхронизации связей сотрудников с парами «услуга-зал»
+def sync_service_halls(employee_ids):
+    """
+    Приводит Employee.service_halls в соответствие с halls × services для набора сотрудников.
+
+    Нужные пары вычисляются в памяти, недостающие ServiceHall создаются одним bulk_create,
+    связи сотрудников добавляются и удаляются по одному запросу на весь набор.
+
+    :param employee_ids: итерируемое id сотрудников
+    :return: (количество добавленных связей, количество удалённых связей)
+    """
+
+    employee_ids = list(employee_ids)
+    if not employee_ids:
+        return 0, 0
+
+    halls = defaultdict(set)  # Залы сотрудников
+    for employee_id, hall_id in Employee.halls.through.objects.filter(
+            employee_id__in=employee_ids).values_list('employee_id', 'hall_id'):
+        halls[employee_id].add(hall_id)
+
+    services = defaultdict(set)  # Услуги сотрудников
+    for employee_id, service_id in Employee.services.through.objects.filter(
+            employee_id__in=employee_ids).values_list('employee_id', 'service_id'):
+        services[employee_id].add(service_id)
+
+    # Нужные пары (услуга, зал) для каждого сотрудника
+    wanted = {employee_id: {(service_id, hall_id) for hall_id in halls[employee_id]
+                            for service_id in services[employee_id]}
+              for employee_id in employee_ids}
+    pairs = set().union(*wanted.values())
+
+    service_hall_ids = _service_hall_ids(pairs)
+    if len(service_hall_ids) < len(pairs):
+        # Недостающие пары создаются одним запросом; параллельно созданные пропускаются ограничением уникальности
+        ServiceHall.objects.bulk_create([ServiceHall(service_id=service_id, hall_id=hall_id)
+                                         for service_id, hall_id in pairs - service_hall_ids.keys()],
+                                        ignore_conflicts=True)
+        service_hall_ids = _service_hall_ids(pairs)
+
+    wanted_links = {(employee_id, service_hall_ids[pair])
+                    for employee_id, employee_pairs in wanted.items() for pair in employee_pairs}
+
+    through = Employee.service_halls.through
+    existing_links = {(employee_id, service_hall_id): link_id
+                      for link_id, employee_id, service_hall_id in through.objects.filter(
+                          employee_id__in=employee_ids).values_list('id', 'employee_id', 'servicehall_id')}
+
+    to_add = wanted_links - existing_links.keys()
+    to_remove = [link_id for link, link_id in existing_links.items() if link not in wanted_links]
+
+    if to_add or to_remove:
+        with transaction.atomic():
+            if to_add:
+                through.objects.bulk_create([through(employee_id=employee_id, servicehall_id=service_hall_id)
+                                             for employee_id, service_hall_id in to_add], ignore_conflicts=True)
+            if to_remove:
+                through.objects.filter(id__in=to_remove).delete()
+
+    return len(to_add), len(to_remove)
+
+
+def _service_hall_ids(pairs):
+    # id записей ServiceHall для пар (услуга, зал) одним запросом
+    if not pairs:
+        return {}
+
+    service_halls = ServiceHall.objects.filter(service_id__in={service_id for service_id, _ in pairs},
+                                               hall_id__in={hall_id for _, hall_id in pairs})
+    return {(service_id, hall_id): service_hall_id
+            for service_hall_id, service_id, hall_id in service_halls.values_list('id', 'service_id', 'hall_id')
+            if (service_id, hall_id) in pairs}
@@ -0,0 +1,165 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from rest_authtoken.models import AuthToken
+
+from . import authentication, availability_cache, catalog_cache, slot_grid
+from .models import Visit, Employee, Service, SlotGrid, Hall, Client
+from .service_halls import sync_service_halls
+
+
+@receiver(post_save, sender=Visit)
+def invalidate_availability_on_save(sender, instance, **kwargs):
+    """
+    Сброс кэша свободных слотов зала и мастера для дня визита (и прежнего дня, если визит перенесли)
+    """
+
+    visit_days = [(instance.hall_id, instance.employee_id, instance.date)]
+
+    loaded_visit_day = getattr(instance, '_loaded_visit_day', None)
+    if loaded_visit_day:
+        visit_days.append(loaded_visit_day)
+
+    availability_cache.invalidate(visit_days)
+    instance._loaded_visit_day = (instance.hall_id, instance.employee_id, instance.date)
+
+    if slot_grid.enabled():
+        # Место освобождается в прежнем слоте и занимается в новом
+        current = (instance.hall_id, instance.date, instance.time, instance.service_id)
+        loaded = getattr(instance, '_loaded_slot', None)
+        if loaded != current:
+            slot_grid.apply(([loaded + (1,)] if loaded else []) + [current + (-1,)])
+        instance._loaded_slot = current
+
+
+@receiver(post_delete, sender=Visit)
+def invalidate_availability_on_delete(sender, instance, **kwargs):
+    """
+    Сброс кэша свободных слотов зала и мастера для дня удалённого визита
+    """
+
+    availability_cache.invalidate([(instance.hall_id, instance.employee_id, instance.date)])
+
+    if slot_grid.enabled():
+        slot_grid.apply([(instance.hall_id, instance.date, instance.time, instance.service_id, 1)])
+
+
+@receiver(post_save, sender=Service)
+def invalidate_availability_on_service_change(sender, instance, created, **kwargs):
+    """
+    Сброс всего кэша свободных слотов при изменении услуги: визиты занимают время по её длительности
+    """
+
+    if not created:
+        availability_cache.clear()
+        SlotGrid.objects.filter(hall__in=instance.visits.values('hall_id')).delete()
+
+
+@receiver(post_save, sender=Hall)
+def invalidate_availability_on_hall_change(sender, instance, created, **kwargs):
+    """
+    Сброс всего кэша свободных слотов при изменении зала: слоты зависят от часов работы и вместимости.
+    Сетка слотов зала сверяет их сама и перестраивается при расхождении.
+    """
+
+    if not created:
+        availability_cache.clear()
+
+
+@receiver(m2m_changed, sender=Employee.halls.through)
+@receiver(m2m_changed, sender=Employee.services.through)
+def sync_service_halls_on_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Синхронизация связей сотрудника с парами «услуга-зал» при изменении его залов или услуг
+    """
+
+    if reverse and action == 'pre_clear':
+        # После очистки со стороны зала или услуги список сотрудников уже не получить
+        instance._cleared_employee_ids = list(instance.employees.values_list('id', flat=True))
+        return
+
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        employee_ids = [instance.pk]
+    elif action == 'post_clear':
+        employee_ids = getattr(instance, '_cleared_employee_ids', [])
+    else:
+        employee_ids = pk_set
+
+    sync_service_halls(employee_ids)
+
+
+@receiver(post_save, sender=Hall)
+@receiver(post_delete, sender=Hall)
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def bump_catalog_version(sender, **kwargs):
+    """
+    Новая версия справочника при изменении зала, услуги или сотрудника (ETag списков меняется)
+    """
+
+    catalog_cache.bump(sender._meta.model_name)
+
+
+@receiver(m2m_changed, sender=Employee.halls.through)
+@receiver(m2m_changed, sender=Employee.services.through)
+def bump_employee_catalog_on_change(sender, action, **kwargs):
+    """
+    Новая версия списка сотрудников при изменении их залов или услуг
+    """
+
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        catalog_cache.bump('employee')
+
+
+@receiver(post_save, sender=User)
+def bump_employee_catalog_on_user_change(sender, instance, update_fields, **kwargs):
+    """
+    Новая версия списка сотрудников при изменении данных пользователя-сотрудника.
+    Обновление времени входа (last_login) в ответ не попадает и пропускается.
+    """
+
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+
+    if Employee.objects.filter(user_id=instance.pk).exists():
+        catalog_cache.bump('employee')
+
+
+@receiver(post_delete, sender=AuthToken)
+def invalidate_auth_token_on_delete(sender, instance, **kwargs):
+    """
+    Сброс кэша аутентификации при выходе, удалении или истечении токена
+    """
+
+    authentication.invalidate([instance.hashed_token])
+
+
+@receiver(post_save, sender=User)
+def invalidate_auth_tokens_on_user_change(sender, instance, created, update_fields, **kwargs):
+    """
+    Сброс кэша аутентификации пользователя при изменении его данных, в том числе деактивации.
+    Новый пользователь ещё без токенов, обновление времени входа (last_login) пропускается.
+    """
+
+    if created or update_fields and set(update_fields) <= {'last_login'}:
+        return
+
+    authentication.invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Client)
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def invalidate_auth_tokens_on_profile_change(sender, instance, **kwargs):
+    """
+    Сброс кэша аутентификации при изменении профиля клиента или сотрудника: профиль кэшируется вместе с пользователем
+    """
+
+    authentication.invalidate_user(instance.user_id)
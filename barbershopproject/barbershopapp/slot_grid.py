@@ -0,0 +1,213 @@
+"""
+Материализованная сетка остатка мест зала на дату.
+
+Рабочий день зала делится на шаги по TICK минут, для каждого шага хранится
+остаток мест (вместимость минус число визитов). Сетка обновляется инкрементально
+при создании, переносе и удалении визита, а свободные слоты любой длительности
+находятся минимумом в скользящем окне без загрузки визитов зала.
+
+Сетки записываются только командой rebuild_slot_grid и при изменении визитов (signals.py,
+пакетное бронирование). Чтение ничего не пишет и не берёт блокировку (зал, дата): если сетки
+нет или она устарела, остаток мест считается в памяти по визитам.
+
+Визит занимает каждый шаг, который он задевает хотя бы на минуту, поэтому при времени
+визитов, не кратном TICK (например, 10:02), сетка может отклонить слот, который точный
+расчёт (HallAvailability) считает свободным; свободным слот по сетке бывает только
+если он свободен и при точном расчёте.
+
+Включается настройкой SLOT_GRID_ENABLED; после включения сетки нужно перестроить
+командой rebuild_slot_grid (пока сетка выключена, она не обновляется).
+"""
+from array import array
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.db import transaction
+
+from . import booking
+from .availability import MINUTES, to_minutes, visit_rows
+from .models import SlotGrid, Visit, Service, Hall
+
+TICK = 5  # Шаг сетки в минутах
+
+
+def enabled():
+    return getattr(settings, 'SLOT_GRID_ENABLED', False)
+
+
+def _span(grid_start, size, start, duration):
+    # Шаги сетки, которые задевает интервал [start, start + duration), в пределах сетки
+    first = max(0, (start - grid_start) // TICK)
+    last = min(size, -(-(start + duration - grid_start) // TICK))
+    return first, last
+
+
+def _pack(remaining):
+    return array('h', remaining).tobytes()
+
+
+def _unpack(data):
+    remaining = array('h')
+    remaining.frombytes(bytes(data))
+    return remaining
+
+
+def _is_current(grid, hall):
+    # Сетка устарела, если у зала изменились часы работы или вместимость
+    return (grid.start, grid.end, grid.capacity) == (
+        to_minutes(hall.start_time), to_minutes(hall.end_time), hall.capacity)
+
+
+def compute(hall, date):
+    """
+    Считает остаток мест зала на дату по визитам из базы, не сохраняя сетку.
+
+    :return: остаток мест array('h')
+    """
+
+    start, end = to_minutes(hall.start_time), to_minutes(hall.end_time)
+    size = max(0, -(-(end - start) // TICK))
+
+    remaining = array('h', [hall.capacity]) * size
+    for _, _, _, visit_start, duration in visit_rows(Visit.objects.filter(hall=hall, date=date)):
+        first, last = _span(start, size, visit_start, duration)
+        for tick in range(first, last):
+            remaining[tick] -= 1
+    return remaining
+
+
+def build(hall, date):
+    """
+    Строит сетку зала на дату по визитам из базы и сохраняет её.
+    Запись идёт под блокировкой (зал, дата), поэтому параллельное бронирование
+    либо уже учтено в визитах, либо обновит готовую сетку после неё.
+
+    :return: остаток мест array('h')
+    """
+
+    with transaction.atomic():
+        booking.lock_hall_day(hall, date)
+
+        remaining = compute(hall, date)
+        SlotGrid.objects.update_or_create(hall=hall, date=date, defaults={
+            'start': to_minutes(hall.start_time), 'end': to_minutes(hall.end_time), 'capacity': hall.capacity,
+            'remaining': _pack(remaining)})
+
+    return remaining
+
+
+def load(hall, date):
+    """
+    Возвращает остаток мест зала на дату: из сетки или, если её нет или она устарела, по визитам (без записи).
+    """
+
+    grid = SlotGrid.objects.filter(hall=hall, date=date).first()
+    if grid is None or not _is_current(grid, hall):
+        return compute(hall, date)
+    return _unpack(grid.remaining)
+
+
+def apply(changes):
+    """
+    Инкрементально обновляет сетки после изменения визитов.
+    Отсутствующие и устаревшие сетки строятся по визитам из базы, в которых изменение уже учтено.
+
+    :param changes: список (id зала, дата, время, id услуги, изменение числа мест: -1 — визит добавлен, +1 — удалён)
+    """
+
+    changes = [change for change in changes if change[0] is not None]
+    if not changes:
+        return
+
+    durations = dict(Service.objects.filter(id__in={change[3] for change in changes}).values_list('id', 'duration'))
+
+    grouped = defaultdict(list)  # (зал, дата) -> [(начало, длительность, изменение)]
+    for hall_id, date, time, service_id, delta in changes:
+        grouped[(hall_id, date)].append((to_minutes(time), to_minutes(durations[service_id]), delta))
+
+    halls = Hall.objects.in_bulk({hall_id for hall_id, _ in grouped})
+
+    with transaction.atomic():
+        for (hall_id, date), intervals in sorted(grouped.items()):
+            hall = halls.get(hall_id)
+            if hall is None:
+                continue  # Зал удаляется вместе с сетками
+
+            grid = SlotGrid.objects.select_for_update().filter(hall_id=hall_id, date=date).first()
+            if grid is None or not _is_current(grid, hall):
+                build(hall, date)
+                continue
+
+            remaining = _unpack(grid.remaining)
+            for visit_start, duration, delta in intervals:
+                first, last = _span(grid.start, len(remaining), visit_start, duration)
+                for tick in range(first, last):
+                    remaining[tick] += delta
+
+            grid.remaining = _pack(remaining)
+            grid.save(update_fields=['remaining'])
+
+
+def discard(hall_days):
+    """
+    Удаляет сетки (зал, дата) после массовых изменений в обход сигналов; до перестроения
+    (rebuild_slot_grid или следующее изменение визитов) остаток мест считается по визитам.
+    """
+
+    hall_ids = {hall_id for hall_id, _ in hall_days}
+    dates = {date for _, date in hall_days}
+    if hall_ids:
+        SlotGrid.objects.filter(hall_id__in=hall_ids, date__in=dates).delete()
+
+
+def window_minimum(values, width):
+    """
+    Минимум в каждом окне из width подряд идущих значений (монотонная очередь, O(n)).
+
+    :return: список длины len(values) - width + 1
+    """
+
+    minimums = []
+    window = deque()  # Индексы значений по возрастанию, значения не убывают
+
+    for index, value in enumerate(values):
+        while window and values[window[-1]] >= value:
+            window.pop()
+        window.append(index)
+
+        if window[0] <= index - width:
+            window.popleft()
+        if index >= width - 1:
+            minimums.append(values[window[0]])
+
+    return minimums
+
+
+def free_slots(hall, date, duration):
+    """
+    Возвращает начала слотов (array('H') минут от начала суток), в которых в зале есть место на всю длительность услуги.
+    Слоты идут с шагом duration от начала работы зала, как в HallAvailability.free_slots.
+    """
+
+    if duration <= 0:
+        return array(MINUTES)
+
+    remaining = load(hall, date)
+    start, end = to_minutes(hall.start_time), to_minutes(hall.end_time)
+
+    # Хвост из полных шагов: слот, выходящий за конец сетки, проверяется только внутри неё
+    width = -(-duration // TICK)
+    minimums = window_minimum(list(remaining) + [hall.capacity] * width, width)
+
+    slots = array(MINUTES)
+    for slot_start in range(start, end - duration + 1, duration):  # Слот заканчивается до закрытия зала
+        first, last = _span(start, len(remaining), slot_start, duration)
+        if last - first == width:
+            free = minimums[first]
+        else:
+            # Начало слота не кратно шагу сетки: окно шире на один шаг
+            free = min(remaining[first:last], default=hall.capacity)
+        if free > 0:
+            slots.append(slot_start)
+
+    return slots
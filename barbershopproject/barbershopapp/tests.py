@@ -1,3 +1,1091 @@
-from django.test import TestCase
+import io
+import json
+from base64 import urlsafe_b64encode
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time
+from timeit import default_timer
+from unittest import skipUnless
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import Q
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_authtoken.models import AuthToken
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import BaseSerializer
+from rest_framework.test import APIClient
+
+from barbershopproject.database import database_config, replica_config
+from barbershopproject.metrics import (registry, install_serializer_timing, instrument_serializers,
+                                       uninstrument_serializers)
+
+from . import authentication, availability_cache, catalog_cache, replica, slot_grid
+from .availability import HallAvailability, ScheduleAvailability, to_minutes
+from .booking import book_visit
+from .demo_data import generate_demo_data
+from .models import Hall, Service, Client, Employee, ServiceHall, Visit, SlotGrid, HallDayLock
+from .reports import utilization_report
+from .serializers import VisitHistorySerializer, VisitHistoryRowSerializer
+from .service_halls import sync_service_halls
+from .transfer import TRANSFERS, export_file, import_file
+from .time_slots import get_time_slots, get_time_slots_range, update_status_visits, find_nearest_slots
+
+
+class HallAvailabilityTests(SimpleTestCase):
+    """
+    Проверка индекса занятости зала
+    """
+
+    def test_slot_blocked_only_at_capacity(self):
+        availability = HallAvailability(2, 600, 720, [(600, 660), (630, 690)])
+
+        self.assertTrue(availability.is_free(600, 630))  # Один визит из двух мест
+        self.assertFalse(availability.is_free(630, 660))  # Два визита одновременно
+        self.assertTrue(availability.is_free(660, 720))
+
+    def test_free_slots_step_by_duration(self):
+        availability = HallAvailability(1, 600, 780, [(660, 720)])
+
+        self.assertEqual(list(availability.free_slots(60)), [600, 720])
+
+    def test_adjacent_blocked_intervals_are_merged(self):
+        availability = HallAvailability(1, 600, 780, [(600, 660), (660, 720)])
+
+        self.assertFalse(availability.is_free(650, 670))
+        self.assertEqual(list(availability.free_slots(60)), [720])
+
+    def test_zero_capacity_blocks_everything(self):
+        availability = HallAvailability(0, 600, 720, [])
+
+        self.assertEqual(list(availability.free_slots(30)), [])
+
+    def test_union_blocks_both_indexes(self):
+        hall = HallAvailability(1, 600, 780, [(600, 630), (700, 720)])
+        employee = HallAvailability(1, 600, 780, [(620, 660)])
+
+        availability = hall.union(employee)
+
+        self.assertFalse(availability.is_free(640, 650))
+        self.assertTrue(availability.is_free(660, 700))
+        self.assertEqual(list(availability.free_slots(30)), [660, 720, 750])
+
+
+class GetTimeSlotsTests(TestCase):
+    """
+    Проверка расчёта свободных слотов по визитам из базы
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hall = Hall.objects.create(name='Зал', description='', capacity=2, location='',
+                                       start_time=time(10, 0), end_time=time(13, 0))
+        cls.service = Service.objects.create(name='Стрижка', description='', price=1000, duration=time(1, 0))
+        cls.employee = Employee.objects.create(user=User.objects.create_user('master'), position='Мастер')
+        cls.employee.halls.add(cls.hall)
+        cls.employee.services.add(cls.service)
+        cls.other_employee = Employee.objects.create(user=User.objects.create_user('other'), position='Мастер')
+        cls.other_employee.halls.add(cls.hall)
+        cls.other_employee.services.add(cls.service)
+        cls.client_obj = Client.objects.create(user=User.objects.create_user('client'), gender='Мужской')
+
+    def setUp(self):
+        caches[availability_cache.CACHE_ALIAS].clear()  # Кэш не откатывается вместе с транзакцией теста
+
+    def book(self, visit_time, employee=None, service=None, hall=None):
+        return Visit.objects.create(client=self.client_obj, employee=employee or self.employee,
+                                    service=service or self.service, hall=hall, date=date(2025, 1, 1),
+                                    time=visit_time)
+
+    def test_slot_free_until_hall_is_full(self):
+        self.book(time(11, 0))
+        self.assertEqual(get_time_slots(self.hall, self.service, date(2025, 1, 1)), ['10:00', '11:00', '12:00'])
+
+        self.book(time(11, 0))
+        self.assertEqual(get_time_slots(self.hall, self.service, date(2025, 1, 1)), ['10:00', '12:00'])
+
+    def test_employee_busy_in_other_hall_and_actual_durations(self):
+        other_hall = Hall.objects.create(name='Второй зал', description='', capacity=5, location='',
+                                         start_time=time(10, 0), end_time=time(13, 0))
+        long_service = Service.objects.create(name='Окрашивание', description='', price=3000, duration=time(1, 30))
+
+        # Мастер занят во втором зале 10:00–11:30, в своём зале коллега занимает место 12:00–13:00
+        self.book(time(10, 0), service=long_service, hall=other_hall)
+        self.book(time(12, 0), employee=self.other_employee)
+
+        day = date(2025, 1, 1)
+        self.assertEqual(get_time_slots(self.hall, self.service, day), ['10:00', '11:00', '12:00'])
+        self.assertEqual(get_time_slots(self.hall, self.service, day, self.employee), ['12:00'])
+        self.assertEqual(get_time_slots(self.hall, self.service, day, self.other_employee), ['10:00', '11:00'])
+
+        # Визит длиной 1,5 часа блокирует 11:00, хотя запрошенная услуга длится час
+        with self.assertRaisesMessage(ValidationError, "Мастер занят в выбранное время."):
+            book_visit(self.client_obj, self.employee, self.service, day, time(11, 0), self.hall)
+
+    def test_range_matches_single_day(self):
+        self.book(time(11, 0))
+        self.book(time(11, 0), employee=self.other_employee)
+
+        time_slots = get_time_slots_range({self.employee.id: self.hall, self.other_employee.id: self.hall},
+                                          self.service, date(2025, 1, 1), date(2025, 1, 2))
+
+        for employee in (self.employee, self.other_employee):
+            self.assertEqual(time_slots[employee.id], {
+                '2025-01-01': get_time_slots(self.hall, self.service, date(2025, 1, 1), employee),
+                '2025-01-02': get_time_slots(self.hall, self.service, date(2025, 1, 2), employee),
+            })
+
+    def test_raw_minutes_share_cache_with_formatted_slots(self):
+        self.book(time(11, 0))
+        day = date(2025, 1, 1)
+
+        self.assertEqual(get_time_slots(self.hall, self.service, day, self.employee), ['10:00', '12:00'])
+        with self.assertNumQueries(0):  # Кэш хранит минуты, строки получаются только при выдаче
+            self.assertEqual(get_time_slots(self.hall, self.service, day, self.employee, raw=True), [600, 720])
+
+        api_client = APIClient()
+        api_client.force_authenticate(self.client_obj.user)
+        response = api_client.get(reverse('get_available_time_range'), {
+            'employee': self.employee.id, 'service': self.service.id, 'date_from': '2025-01-01',
+            'date_to': '2025-01-01', 'minutes': '1'})
+        self.assertEqual(response.json(), {str(self.employee.id): {'2025-01-01': [600, 720]}})
+
+    def test_range_endpoint_uses_constant_queries(self):
+        api_client = APIClient()
+        api_client.force_authenticate(self.client_obj.user)
+
+        with self.assertNumQueries(3):
+            response = api_client.get(reverse('get_available_time_range'), {
+                'employee': self.employee.id, 'service': self.service.id,
+                'date_from': '2025-01-01', 'date_to': '2025-01-14'})
+
+        self.assertEqual(len(response.data[self.employee.id]), 14)
+
+    def test_range_endpoint_rejects_unknown_service_and_employees(self):
+        api_client = APIClient()
+        api_client.force_authenticate(self.client_obj.user)
+        params = {'employee': self.employee.id, 'service': self.service.id,
+                  'date_from': '2025-01-01', 'date_to': '2025-01-02'}
+        url = reverse('get_available_time_range')
+
+        self.assertEqual(api_client.get(url, {**params, 'service': 999999}).status_code, 404)
+        self.assertEqual(api_client.get(url, {**params, 'service': 'abc'}).status_code, 400)
+
+        # Неизвестный мастер не отбрасывается молча
+        response = api_client.get(url, {**params, 'employee': f"{self.employee.id},999999"})
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('999999', response.data['detail'])
+
+    def test_cached_slots_invalidated_on_visit_change(self):
+        visit = self.book(time(11, 0))
+        self.book(time(11, 0))
+        get_time_slots(self.hall, self.service, date(2025, 1, 1))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_time_slots(self.hall, self.service, date(2025, 1, 1)), ['10:00', '12:00'])
+
+        # Перенос визита сбрасывает и старый, и новый день
+        visit.date = date(2025, 1, 2)
+        visit.save()
+        self.assertEqual(get_time_slots(self.hall, self.service, date(2025, 1, 1)), ['10:00', '11:00', '12:00'])
+
+        Visit.objects.create(client=self.client_obj, employee=self.employee, service=self.service,
+                             date=date(2025, 1, 2), time=time(11, 0))
+        self.assertEqual(get_time_slots(self.hall, self.service, date(2025, 1, 2)), ['10:00', '12:00'])
+
+        Visit.objects.get(pk=visit.pk).delete()
+        self.assertEqual(get_time_slots(self.hall, self.service, date(2025, 1, 2)), ['10:00', '11:00', '12:00'])
+
+    def test_cached_slots_invalidated_on_hall_change(self):
+        self.book(time(11, 0))
+        self.assertEqual(get_time_slots(self.hall, self.service, date(2025, 1, 1)), ['10:00', '11:00', '12:00'])
+
+        # Закрытие зала на час раньше и одно место вместо двух
+        hall = Hall.objects.get(pk=self.hall.pk)
+        hall.end_time, hall.capacity = time(12, 0), 1
+        hall.save()
+        self.assertEqual(get_time_slots(hall, self.service, date(2025, 1, 1)), ['10:00'])
+
+    def test_batch_booking_is_atomic_and_suggests_chain(self):
+        api_client = APIClient()
+        api_client.force_authenticate(self.client_obj.user)
+        self.book(time(10, 0), employee=self.other_employee)
+
+        item = {'employee': self.employee.id, 'service': self.service.id, 'date': '2025-01-01'}
+        response = api_client.post(reverse('book_visit_batch'), {'visits': [
+            dict(item, time='10:00'), dict(item, time='10:00')]}, format='json')
+
+        # Второй визит на 10:00 превышает вместимость: не создаётся ни один
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'], [None, "Зал переполнен на выбранное время."])
+        self.assertEqual([visit['time'] for visit in response.data['chain']], ['10:00', '11:00'])
+        self.assertEqual(Visit.objects.count(), 1)
+
+        response = api_client.post(reverse('book_visit_batch'), {'visits': [
+            dict(item, time='11:00'), dict(item, time='12:00')]}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Visit.objects.count(), 3)
+        self.assertEqual(get_time_slots(self.hall, self.service, date(2025, 1, 1)), ['10:00', '11:00', '12:00'])
+
+    @override_settings(SLOT_GRID_ENABLED=True)
+    def test_offered_slots_end_before_closing_and_can_be_booked(self):
+        # 50 минут не делят окно 10:00–13:00 нацело: слот 12:30–13:20 не предлагается
+        service = Service.objects.create(name='Укладка', description='', price=800, duration=time(0, 50))
+        self.employee.services.add(service)
+        day = date(2025, 1, 1)
+
+        self.assertEqual(get_time_slots(self.hall, service, day, self.employee), ['10:00', '10:50', '11:40'])
+        self.assertEqual(list(slot_grid.free_slots(self.hall, day, 50)), [600, 650, 700])
+        self.assertEqual(utilization_report(day, day, duration=50)['halls'][0]['days'][day.isoformat()]['free_slots'],
+                         3)
+
+        for slot in get_time_slots(self.hall, service, day, self.employee):
+            book_visit(self.client_obj, self.employee, service, day, datetime.strptime(slot, '%H:%M').time(),
+                       self.hall)
+        self.assertEqual(Visit.objects.count(), 3)
+
+    def test_booking_outside_hall_hours_is_rejected(self):
+        api_client = APIClient()
+        api_client.force_authenticate(self.client_obj.user)
+
+        # Зал работает 10:00–13:00: ни позиция в 03:00, ни цепочка с неё не принимаются
+        item = {'employee': self.employee.id, 'service': self.service.id, 'date': '2025-01-01'}
+        response = api_client.post(reverse('book_visit_batch'), {'visits': [
+            dict(item, time='03:00'), dict(item, time='12:30')]}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'], ["Визит выходит за часы работы зала."] * 2)
+        self.assertIsNone(response.data['chain'])
+
+        with self.assertRaisesMessage(ValidationError, "Визит выходит за часы работы зала."):
+            book_visit(self.client_obj, self.employee, self.service, date(2025, 1, 1), time(3, 0), self.hall)
+        self.assertEqual(Visit.objects.count(), 0)
+
+    def test_nearest_slots_across_employees(self):
+        self.book(time(11, 0), hall=self.hall)
+        self.book(time(11, 0), employee=self.other_employee, hall=self.hall)  # 11:00 — зал заполнен
+
+        slots = find_nearest_slots(self.service, datetime(2025, 1, 1, 11, 0), k=3,
+                                   current=datetime(2024, 12, 31))
+        self.assertEqual([(slot['employee'], slot['time']) for slot in slots],
+                         [(self.employee.id, '10:00'), (self.employee.id, '12:00'), (self.other_employee.id, '10:00')])
+        self.assertEqual({slot['hall'] for slot in slots}, {self.hall.id})
+
+        # Прошедшие слоты не предлагаются, поиск переходит на следующий день
+        slots = find_nearest_slots(self.service, datetime(2025, 1, 1, 11, 0), k=3,
+                                   current=datetime(2025, 1, 1, 10, 30))
+        self.assertEqual([(slot['employee'], slot['date'], slot['time']) for slot in slots],
+                         [(self.employee.id, '2025-01-01', '12:00'), (self.other_employee.id, '2025-01-01', '12:00'),
+                          (self.employee.id, '2025-01-02', '10:00')])
+
+        api_client = APIClient()
+        api_client.force_authenticate(self.client_obj.user)
+        response = api_client.get(reverse('get_nearest_available_time'),
+                                  {'service': self.service.id, 'datetime': '2999-01-01T11:00', 'k': 4})
+        self.assertEqual(len(response.data), 4)
+        self.assertEqual(api_client.get(reverse('get_nearest_available_time'),
+                                        {'service': self.service.id, 'datetime': '2999-01-01T11:00', 'k': 0}
+                                        ).status_code, 400)
+        self.assertEqual(api_client.get(reverse('get_nearest_available_time'),
+                                        {'service': 999999, 'datetime': '2999-01-01T11:00'}).status_code, 404)
+        self.assertEqual(api_client.get(reverse('get_nearest_available_time'),
+                                        {'service': 'abc', 'datetime': '2999-01-01T11:00'}).status_code, 400)
+
+    @override_settings(DATABASE_REPLICA='replica')
+    def test_booking_pins_client_to_primary(self):
+        api_client = APIClient()
+        api_client.force_authenticate(self.client_obj.user)
+        self.assertFalse(replica.is_pinned(self.client_obj.user))
+
+        response = api_client.post(reverse('book_visit'), {'employee': self.employee.id, 'service': self.service.id,
+                                                           'date': '2025-01-01', 'time': '10:00'}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(replica.is_pinned(self.client_obj.user))
+        cache.delete(replica._pin_key(self.client_obj.user.pk))
+
+    def test_update_status_visits_in_batches(self):
+        for _ in range(5):
+            self.book(time(11, 0))
+        future = Visit.objects.create(client=self.client_obj, employee=self.employee, service=self.service,
+                                      date=date(2999, 1, 1), time=time(11, 0))
+
+        self.assertEqual(update_status_visits(batch_size=2), 5)
+        self.assertEqual(Visit.objects.filter(status='Выполнена').count(), 5)
+        self.assertEqual(Visit.objects.get(pk=future.pk).status, 'Запланирована')
+        self.assertEqual(update_status_visits(batch_size=2), 0)
+
+    def test_effective_status_without_writes(self):
+        past = self.book(time(11, 0))
+        future = Visit.objects.create(client=self.client_obj, employee=self.employee, service=self.service,
+                                      date=date(2999, 1, 1), time=time(11, 0))
+
+        statuses = dict(Visit.objects.with_effective_status().values_list('pk', 'effective_status'))
+
+        self.assertEqual(statuses, {past.pk: 'Выполнена', future.pk: 'Запланирована'})
+        self.assertFalse(Visit.objects.filter(status='Выполнена').exists())
+
+
+@override_settings(SLOT_GRID_ENABLED=True)
+class SlotGridTests(TestCase):
+    """
+    Проверка материализованной сетки мест зала
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hall = Hall.objects.create(name='Зал', description='', capacity=2, location='',
+                                       start_time=time(10, 0), end_time=time(13, 0))
+        cls.short = Service.objects.create(name='Стрижка', description='', price=1000, duration=time(0, 30))
+        cls.long = Service.objects.create(name='Окрашивание', description='', price=3000, duration=time(1, 30))
+        cls.employees = [Employee.objects.create(user=User.objects.create_user(f"master{i}"), position='Мастер')
+                         for i in range(3)]
+        cls.client_obj = Client.objects.create(user=User.objects.create_user('client'), gender='Мужской')
+
+    def setUp(self):
+        caches[availability_cache.CACHE_ALIAS].clear()
+
+    def book(self, employee, service, visit_time):
+        return Visit.objects.create(client=self.client_obj, employee=employee, service=service, hall=self.hall,
+                                    date=date(2025, 1, 1), time=visit_time)
+
+    def test_window_minimum(self):
+        self.assertEqual(slot_grid.window_minimum([3, 1, 2, 5, 4, 0], 3), [1, 1, 2, 0])
+
+    def test_incremental_updates_match_rebuild(self):
+        day = date(2025, 1, 1)
+        slot_grid.build(self.hall, day)  # Сетка существует до изменений: дальше она только обновляется
+
+        self.book(self.employees[0], self.long, time(10, 0))
+        moved = self.book(self.employees[1], self.short, time(10, 30))
+        removed = self.book(self.employees[2], self.short, time(12, 0))
+
+        moved.time = time(11, 0)
+        moved.save()
+        removed.delete()
+
+        incremental = list(slot_grid.load(self.hall, day))
+        self.assertEqual(incremental, list(slot_grid.build(self.hall, day)))
+
+        for service in (self.short, self.long):
+            duration = to_minutes(service.duration)
+            self.assertEqual(slot_grid.free_slots(self.hall, day, duration),
+                             ScheduleAvailability.for_date(self.hall, day).free_slots(duration))
+
+    def test_get_time_slots_reads_grid(self):
+        self.book(self.employees[0], self.long, time(10, 0))
+        self.book(self.employees[1], self.short, time(11, 0))
+
+        slot_grid.build(self.hall, date(2025, 1, 1))
+        with self.assertNumQueries(2):  # Сетка зала и визиты мастера
+            time_slots = get_time_slots(self.hall, self.short, date(2025, 1, 1), self.employees[0])
+
+        self.assertEqual(time_slots, ['11:30', '12:00', '12:30'])
+
+    def test_read_without_grid_does_not_write(self):
+        # Визиты в обход сигналов: сетки нет
+        Visit.objects.bulk_create([Visit(client=self.client_obj, employee=self.employees[0], service=self.short,
+                                         hall=self.hall, date=date(2025, 1, 1), time=time(10, 0))])
+
+        time_slots = get_time_slots(self.hall, self.short, date(2025, 1, 1))
+
+        self.assertEqual(time_slots[:2], ['10:00', '10:30'])
+        self.assertFalse(SlotGrid.objects.exists())
+        self.assertFalse(HallDayLock.objects.exists())  # Чтение не берёт блокировку бронирования
+
+    def test_unaligned_visits_only_over_block(self):
+        # Визиты 10:03–10:33 занимают шаг 10:30–10:35 целиком
+        self.book(self.employees[0], self.short, time(10, 3))
+        self.book(self.employees[1], self.short, time(10, 3))
+        day, duration = date(2025, 1, 1), 17
+
+        self.assertTrue(SlotGrid.objects.filter(hall=self.hall, date=day).exists())  # Построена сигналом
+        grid = set(slot_grid.free_slots(self.hall, day, duration))
+        exact = set(ScheduleAvailability.for_date(self.hall, day).free_slots(duration))
+
+        self.assertLessEqual(grid, exact)
+        self.assertEqual(exact - grid, {10 * 60 + 34})  # Слот 10:34 свободен, но попадает в занятый шаг
+
+
+class VisitHistoryTests(TestCase):
+    """
+    Проверка постраничной истории визитов клиента
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hall = Hall.objects.create(name='Зал', description='', capacity=5, location='',
+                                       start_time=time(10, 0), end_time=time(20, 0))
+        cls.service = Service.objects.create(name='Стрижка', description='', price=1000, duration=time(1, 0))
+        cls.employee = Employee.objects.create(user=User.objects.create_user('master', first_name='Иван'),
+                                               position='Мастер', phone_number='+79990000000')
+        cls.client_obj = Client.objects.create(user=User.objects.create_user('client'), gender='Мужской')
+
+        # По два визита на одно время: ключ страницы должен различать их по id
+        Visit.objects.bulk_create([
+            Visit(client=cls.client_obj, employee=cls.employee, service=cls.service, hall=cls.hall,
+                  date=date(2025, 1, 1 + day), time=time(10 + hour, 0))
+            for day in range(3) for hour in range(3) for _ in range(2)
+        ] + [Visit(client=cls.client_obj, employee=cls.employee, service=cls.service, hall=cls.hall,
+                   date=date(2999, 1, 1), time=time(10, 0))])
+
+    def setUp(self):
+        self.api_client = APIClient()
+        self.api_client.force_authenticate(self.client_obj.user)
+
+    def test_pages_cover_all_visits_newest_first(self):
+        pages = []
+        url, params = reverse('visit_show_client'), {'page_size': 4}
+        while url:
+            with self.assertNumQueries(1):  # Страница визитов вместе со связанными таблицами одним запросом
+                response = self.api_client.get(url, params)
+            pages.append([visit['id'] for visit in response.data['results']])
+            url, params = response.data['next'], None
+
+        expected = list(Visit.objects.order_by('-date', '-time', '-id').values_list('id', flat=True))
+        self.assertEqual([visit_id for page in pages for visit_id in page], expected)
+        self.assertIsNone(self.api_client.get(reverse('visit_show_client'), {'page_size': 4}).data['previous'])
+
+        # Обратно по ссылкам previous от последней страницы — те же страницы
+        back = [pages[-1]]
+        url = response.data['previous']
+        while url:
+            response = self.api_client.get(url)
+            back.append([visit['id'] for visit in response.data['results']])
+            url = response.data['previous']
+        self.assertEqual(back[::-1], pages)
+
+    def test_filters_and_sparse_fields(self):
+        response = self.api_client.get(reverse('visit_show_client'), {
+            'status': 'Запланирована', 'date_from': '2025-01-02', 'fields': 'id,status'})
+
+        self.assertEqual(response.data['results'], [{'id': Visit.objects.get(date=date(2999, 1, 1)).id,
+                                                     'status': 'Запланирована'}])
+
+        response = self.api_client.get(reverse('visit_show_client'), {
+            'date_from': '2025-01-02', 'date_to': '2025-01-02', 'fields': 'employee_name'})
+        self.assertEqual(len(response.data['results']), 6)
+        self.assertEqual(response.data['results'][0], {'employee_name': 'Иван '})
+
+        self.assertEqual(self.api_client.get(reverse('visit_show_client'), {'fields': 'client'}).status_code, 400)
+
+    def test_row_serializer_matches_model_serializer(self):
+        visits = Visit.objects.order_by('id')
+
+        self.assertEqual(VisitHistoryRowSerializer(visits.history()).data,
+                         VisitHistorySerializer(visits.with_effective_status(), many=True).data)
+
+    def test_catalog_views_are_paginated(self):
+        for i in range(3):
+            Service.objects.create(name=f"Услуга {i}", description='', price=1000, duration=time(1, 0))
+
+        response = self.api_client.get(reverse('service_show'), {'page_size': 2})
+        names = [service['name'] for service in response.data['results']]
+        names += [service['name'] for service in self.api_client.get(response.data['next']).data['results']]
+
+        self.assertEqual(names, list(Service.objects.order_by('id').values_list('name', flat=True)))
+
+
+class ServiceHallSyncTests(TestCase):
+    """
+    Проверка синхронизации связей сотрудника с парами «услуга-зал»
+    """
+
+    def test_links_follow_halls_and_services(self):
+        halls = [Hall.objects.create(name=f"Зал {i}", description='', capacity=1, location='',
+                                     start_time=time(10, 0), end_time=time(13, 0)) for i in range(2)]
+        services = [Service.objects.create(name=f"Услуга {i}", description='', price=1000, duration=time(1, 0))
+                    for i in range(2)]
+        employee = Employee.objects.create(user=User.objects.create_user('master'), position='Мастер')
+
+        employee.halls.add(*halls)
+        employee.services.add(*services)
+        self.assertEqual(set(employee.service_halls.values_list('service_id', 'hall_id')),
+                         {(service.id, hall.id) for service in services for hall in halls})
+
+        halls[0].employees.clear()  # Изменение со стороны зала
+        self.assertEqual(set(employee.service_halls.values_list('service_id', 'hall_id')),
+                         {(service.id, halls[1].id) for service in services})
+
+        # Повторная синхронизация без изменений ничего не пишет
+        with self.assertNumQueries(4):
+            self.assertEqual(sync_service_halls([employee.id]), (0, 0))
+        self.assertEqual(ServiceHall.objects.count(), 4)
+
+
+class EmployeeQueryCountTests(TestCase):
+    """
+    Число запросов списков сотрудников не зависит от количества сотрудников
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hall = Hall.objects.create(name='Зал', description='', capacity=2, location='',
+                                       start_time=time(10, 0), end_time=time(13, 0))
+        cls.service = Service.objects.create(name='Стрижка', description='', price=1000, duration=time(1, 0))
+        cls.user = User.objects.create_user('client')
+
+    def setUp(self):
+        self.api_client = APIClient()
+        self.api_client.force_authenticate(self.user)
+
+    def add_employees(self, count):
+        for _ in range(count):
+            employee = Employee.objects.create(user=User.objects.create_user(f"master{Employee.objects.count()}"),
+                                               position='Мастер')
+            employee.halls.add(self.hall)
+            employee.services.add(self.service)
+
+    def assertConstantQueries(self, num, url, params=None):
+        for count in (1, 5):
+            self.add_employees(count)
+            with self.assertNumQueries(num):
+                response = self.api_client.get(url, params)
+            data = response.data['results'] if 'results' in response.data else response.data  # Страница или список
+            self.assertEqual(len(data), Employee.objects.count())
+
+    def test_employee_show(self):
+        self.assertConstantQueries(4, reverse('employee_show'))  # Версии справочников, сотрудники, залы, услуги
+
+    def test_employees_by_service(self):
+        self.assertConstantQueries(4, reverse('get_employee_for_service'), {'service': self.service.id})
+
+
+class ReadReplicaRouterTests(SimpleTestCase):
+    """
+    Проверка роутера реплики: чтение с реплики только внутри reads() и без закрепления пользователя
+    """
+
+    def setUp(self):
+        self.router = replica.ReadReplicaRouter()
+        self.user = User(pk=1, username='client')
+
+    def tearDown(self):
+        cache.delete(replica._pin_key(self.user.pk))
+
+    @override_settings(DATABASE_REPLICA='replica')
+    def test_reads_routed_until_user_pinned(self):
+        self.assertIsNone(self.router.db_for_read(Visit))
+        with replica.reads(self.user):
+            self.assertEqual(self.router.db_for_read(Visit), 'replica')
+            self.assertEqual(self.router.db_for_write(Visit), 'default')
+        self.assertIsNone(self.router.db_for_read(Visit))
+
+        replica.pin(self.user)
+        with replica.reads(self.user):
+            self.assertIsNone(self.router.db_for_read(Visit))
+        with replica.reads(User(pk=2, username='other')):
+            self.assertEqual(self.router.db_for_read(Visit), 'replica')
+
+        self.assertFalse(self.router.allow_migrate('replica', 'barbershopapp'))
+
+    def test_disabled_without_replica(self):
+        with replica.reads(self.user):
+            self.assertIsNone(self.router.db_for_read(Visit))
+
+
+class DatabaseConfigTests(SimpleTestCase):
+    """
+    Проверка настроек базы из переменных окружения
+    """
+
+    base_dir = Path('/srv/barbershop')
+
+    def test_sqlite_defaults_and_tuning(self):
+        config = database_config(self.base_dir, {})
+
+        self.assertEqual(config['ENGINE'], 'django.db.backends.sqlite3')
+        self.assertEqual(config['NAME'], self.base_dir / 'db.sqlite3')
+        self.assertEqual(config['CONN_MAX_AGE'], 60)
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+        self.assertEqual(config['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        self.assertIn('PRAGMA journal_mode=WAL;', config['OPTIONS']['init_command'])
+
+        config = database_config(self.base_dir, {'DB_SQLITE_TUNING': '0', 'DB_CONN_MAX_AGE': '0',
+                                                 'DB_CONN_HEALTH_CHECKS': '0'})
+        self.assertNotIn('OPTIONS', config)
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertFalse(config['CONN_HEALTH_CHECKS'])
+
+    def test_postgres_pool_disables_persistent_connections(self):
+        env = {'DB_ENGINE': 'postgres', 'DB_NAME': 'shop', 'DB_HOST': 'db', 'DB_CONN_MAX_AGE': '300'}
+
+        config = database_config(self.base_dir, env)
+        self.assertEqual((config['ENGINE'], config['NAME'], config['HOST'], config['PORT']),
+                         ('django.db.backends.postgresql', 'shop', 'db', '5432'))
+        self.assertEqual(config['CONN_MAX_AGE'], 300)
+        self.assertNotIn('OPTIONS', config)
+
+        config = database_config(self.base_dir, {**env, 'DB_POOL': '1', 'DB_POOL_MAX_SIZE': '8'})
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertEqual(config['OPTIONS']['pool'], {'min_size': 2, 'max_size': 8, 'timeout': 10.0})
+
+    def test_unknown_engine(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "'mysql'"):
+            database_config(self.base_dir, {'DB_ENGINE': 'mysql'})
+
+    def test_replica_falls_back_to_primary_settings(self):
+        self.assertIsNone(replica_config(self.base_dir, {'DB_ENGINE': 'postgres'}))
+
+        config = replica_config(self.base_dir, {
+            'DB_ENGINE': 'postgres', 'DB_NAME': 'shop', 'DB_HOST': 'primary', 'DB_USER': 'app',
+            'DB_REPLICA_NAME': 'shop', 'DB_REPLICA_HOST': 'replica'})
+
+        self.assertEqual((config['HOST'], config['USER'], config['NAME']), ('replica', 'app', 'shop'))
+        self.assertEqual(config['TEST'], {'MIRROR': 'default'})
+
+
+class AuthTokenCacheTests(TestCase):
+    """
+    Проверка кэша аутентификации по токену
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_obj = Client.objects.create(user=User.objects.create_user('client', first_name='Иван'),
+                                               gender='Мужской')
+
+    def setUp(self):
+        authentication.clear()
+        self.token = AuthToken.create_token_for_user(self.client_obj.user)
+        self.api_client = APIClient()
+        self.api_client.credentials(HTTP_AUTHORIZATION=f"Token {urlsafe_b64encode(self.token).decode()}")
+
+    def test_profile_without_queries_when_cached(self):
+        with self.assertNumQueries(1):  # Токен, пользователь и профиль одним запросом
+            self.api_client.get(reverse('client_profile'))
+
+        with self.assertNumQueries(0):
+            response = self.api_client.get(reverse('client_profile'))
+        self.assertEqual(response.data['user']['first_name'], 'Иван')
+
+    def test_invalidated_on_profile_change_deactivation_and_logout(self):
+        self.api_client.get(reverse('client_profile'))
+
+        self.client_obj.phone_number = '+79990000000'
+        self.client_obj.save()
+        self.assertEqual(self.api_client.get(reverse('client_profile')).data['phone_number'], '+79990000000')
+
+        user = self.client_obj.user
+        user.is_active = False
+        user.save()
+        self.assertEqual(self.api_client.get(reverse('client_profile')).status_code, 401)
+
+        user.is_active = True
+        user.save()
+        self.assertEqual(self.api_client.get(reverse('client_profile')).status_code, 200)
+
+        AuthToken.objects.get(hashed_token=AuthToken._hash_token(self.token)).logout()
+        self.assertEqual(self.api_client.get(reverse('client_profile')).status_code, 401)
+
+
+class CatalogCacheTests(TestCase):
+    """
+    Проверка условных GET-запросов и кэша ответов справочников
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hall = Hall.objects.create(name='Зал', description='', capacity=1, location='',
+                                       start_time=time(10, 0), end_time=time(13, 0))
+        cls.user = User.objects.create_user('client')
+
+    def setUp(self):
+        catalog_cache.clear()
+        self.api_client = APIClient()
+        self.api_client.force_authenticate(self.user)
+
+    def test_not_modified_until_version_changes(self):
+        response = self.api_client.get(reverse('hall_show'))
+        etag = response['ETag']
+
+        with self.assertNumQueries(1):  # Только версия справочника
+            response = self.api_client.get(reverse('hall_show'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.hall.name = 'Большой зал'
+        self.hall.save()
+
+        response = self.api_client.get(reverse('hall_show'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['results'][0]['name'], 'Большой зал')
+
+    def test_rendered_response_cached_in_process(self):
+        content = self.api_client.get(reverse('hall_show')).content
+
+        with self.assertNumQueries(1):  # Без запроса залов и сериализации
+            response = self.api_client.get(reverse('hall_show'))
+        self.assertEqual(response.content, content)
+
+        # Изменение услуги не затрагивает залы, но меняет список сотрудников
+        etag = self.api_client.get(reverse('employee_show'))['ETag']
+        Service.objects.create(name='Стрижка', description='', price=1000, duration=time(1, 0))
+        self.assertEqual(self.api_client.get(reverse('hall_show'), HTTP_IF_NONE_MATCH=response['ETag']).status_code,
+                         304)
+        self.assertNotEqual(self.api_client.get(reverse('employee_show'))['ETag'], etag)
+
+
+class AsyncViewTests(TestCase):
+    """
+    Проверка асинхронных вариантов эндпоинтов: ответы совпадают с синхронными
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hall = Hall.objects.create(name='Зал', description='', capacity=1, location='',
+                                       start_time=time(10, 0), end_time=time(13, 0))
+        cls.service = Service.objects.create(name='Стрижка', description='', price=1000, duration=time(1, 0))
+        cls.employees = []
+        for index in range(3):
+            employee = Employee.objects.create(user=User.objects.create_user(f'master{index}'), position='Мастер')
+            employee.halls.add(cls.hall)
+            employee.services.add(cls.service)
+            cls.employees.append(employee)
+        cls.client_obj = Client.objects.create(user=User.objects.create_user('client'), gender='Мужской')
+        Visit.objects.create(client=cls.client_obj, employee=cls.employees[0], service=cls.service, hall=cls.hall,
+                             date=date(2025, 1, 1), time=time(11, 0))
+        cls.token = urlsafe_b64encode(AuthToken.create_token_for_user(cls.client_obj.user)).decode()
+
+    def setUp(self):
+        caches[availability_cache.CACHE_ALIAS].clear()
+        catalog_cache.clear()
+        self.headers = {'Authorization': f'Token {self.token}'}
+
+    async def get_both(self, name, params=None):
+        api_client = APIClient()
+        api_client.credentials(HTTP_AUTHORIZATION=self.headers['Authorization'])
+        expected = await sync_to_async(api_client.get)(reverse(name), params)
+        response = await self.async_client.get(reverse(f'async_{name}'), params, headers=self.headers)
+        return expected, response
+
+    async def test_available_time_matches_sync(self):
+        params = {'employee': self.employees[1].id, 'service': self.service.id, 'date': '2025-01-01'}
+        expected, response = await self.get_both('get_available_time', params)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), ['10:00', '12:00'])
+        self.assertEqual(response.content, expected.content)
+
+    async def test_employees_by_service_matches_sync(self):
+        expected, response = await self.get_both('get_employee_for_service', {'service': self.service.id})
+
+        self.assertEqual(len(response.json()), 3)
+        self.assertEqual(response.content, expected.content)
+
+    @staticmethod
+    def cursors(response):
+        # Курсоры ссылок next и previous без адреса эндпоинта
+        return [parse_qs(urlsplit(link).query)['cursor'][0] if link else None
+                for link in (response.json()['next'], response.json()['previous'])]
+
+    async def test_catalog_pages_and_conditional_get(self):
+        expected, response = await self.get_both('employee_show', {'page_size': 2})
+        self.assertEqual(response.json()['results'], expected.json()['results'])
+
+        # Курсор синхронного API подходит асинхронному и наоборот
+        self.assertEqual(self.cursors(response), self.cursors(expected))
+        cursor = self.cursors(response)[0]
+        expected, response = await self.get_both('employee_show', {'page_size': 2, 'cursor': cursor})
+        self.assertEqual([row['id'] for row in response.json()['results']], [self.employees[2].id])
+        self.assertIsNone(response.json()['next'])
+        self.assertEqual(self.cursors(response), self.cursors(expected))
+
+        # Обратный курсор ведёт на первую страницу, как в синхронном API
+        expected, response = await self.get_both('employee_show', {'page_size': 2,
+                                                                   'cursor': self.cursors(response)[1]})
+        self.assertEqual([row['id'] for row in response.json()['results']],
+                         [employee.id for employee in self.employees[:2]])
+        self.assertEqual(response.json()['results'], expected.json()['results'])
+        self.assertEqual(self.cursors(response), self.cursors(expected))
+
+        response = await self.async_client.get(reverse('async_hall_show'), headers=self.headers)
+        response = await self.async_client.get(reverse('async_hall_show'),
+                                               headers={**self.headers, 'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_metrics_record_async_queries(self):
+        registry.clear()
+        await self.async_client.get(reverse('async_hall_show'), headers=self.headers)
+
+        stats = registry.snapshot()['async_hall_show']
+        self.assertEqual(stats['count'], 1)
+        self.assertGreater(stats['queries']['max'], 0)  # Запросы ORM из потока sync_to_async
+
+    async def test_requires_token(self):
+        response = await self.async_client.get(reverse('async_hall_show'))
+        self.assertEqual(response.status_code, 401)
+
+        response = await self.async_client.get(reverse('async_hall_show'), headers={'Authorization': 'Token bad'})
+        self.assertEqual(response.status_code, 401)
+
+        response = await self.async_client.post(reverse('async_hall_show'), headers=self.headers)
+        self.assertEqual(response.status_code, 405)
+
+
+class RequestMetricsTests(TestCase):
+    """
+    Проверка сбора метрик стоимости запросов по имени URL
+    """
+
+    def setUp(self):
+        registry.clear()
+
+    def test_metrics_recorded_per_url_name(self):
+        instrument_serializers()
+        self.addCleanup(uninstrument_serializers)
+        user = User.objects.create_user('admin', is_staff=True)
+        api_client = APIClient()
+        api_client.force_authenticate(user)
+
+        api_client.get(reverse('hall_show'))
+        response = api_client.get(reverse('request_metrics'))
+
+        stats = response.data['endpoints']['hall_show']
+        self.assertEqual(stats['count'], 1)
+        self.assertEqual(stats['queries']['max'], 2)  # Версия справочника и залы
+        self.assertGreater(stats['serializer_ms']['max'], 0)  # Сериализация замеряется отдельно от view
+
+        response = api_client.get(reverse('request_metrics_prometheus'))
+        self.assertIn('barbershop_request_queries_count{endpoint="hall_show"} 1', response.content.decode())
+
+    def test_serializer_timing_only_when_enabled(self):
+        self.addCleanup(uninstrument_serializers)
+        api_client = APIClient()
+        api_client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+
+        # Загрузка middleware не подменяет свойство data
+        api_client.get(reverse('hall_show'))
+        self.assertEqual(registry.snapshot()['hall_show']['serializer_ms']['max'], 0)
+        self.assertFalse(getattr(BaseSerializer.data.fget, 'timed', False))
+
+        with override_settings(REQUEST_METRICS_SERIALIZER_TIMING=True, REQUEST_METRICS_SAMPLE_RATE=0):
+            install_serializer_timing()
+        self.assertFalse(getattr(BaseSerializer.data.fget, 'timed', False))
+
+        with override_settings(REQUEST_METRICS_SERIALIZER_TIMING=True):
+            install_serializer_timing()
+        self.assertTrue(BaseSerializer.data.fget.timed)
+
+
+class DemoDataTests(TestCase):
+    """
+    Проверка генератора синтетических данных для бенчмарков
+    """
+
+    def test_generated_visits_use_employee_service_halls(self):
+        generate_demo_data(halls=2, employees=3, services=4, clients=5, visits=50, seed=1,
+                           start_date=date(2025, 1, 1))
+
+        self.assertEqual(Visit.objects.count(), 50)
+        for visit in Visit.objects.select_related('employee'):
+            hall = visit.employee.service_halls.filter(service=visit.service_id).order_by('id').first().hall_id
+            self.assertEqual(visit.hall_id, hall)
+
+
+class UtilizationReportTests(TestCase):
+    """
+    Проверка векторного отчёта о загрузке залов и мастеров
+    """
+
+    def test_free_slots_match_get_time_slots(self):
+        data = generate_demo_data(halls=3, employees=4, services=4, clients=5, visits=300, days=5, seed=3,
+                                  start_date=date(2025, 1, 1))
+        service = Service.objects.create(name='Час', description='', price=1000, duration=time(1, 0))
+
+        report = utilization_report(date(2025, 1, 1), date(2025, 1, 5), duration=60)
+
+        for hall_report, hall in zip(report['halls'], data['halls']):
+            for day in range(5):
+                visit_date = date(2025, 1, 1 + day)
+                self.assertEqual(hall_report['days'][visit_date.isoformat()]['free_slots'],
+                                 len(get_time_slots(hall, service, visit_date)))
+        self.assertEqual(sum(employee['visits'] for employee in report['employees']), 300)
+
+    def test_unaligned_visit_times_match_get_time_slots(self):
+        hall = Hall.objects.create(name='Зал', description='', capacity=1, location='',
+                                   start_time=time(10, 0), end_time=time(13, 0))
+        service = Service.objects.create(name='Стрижка', description='', price=1000, duration=time(0, 30))
+        short = Service.objects.create(name='Экспресс', description='', price=500, duration=time(0, 17))
+        employee = Employee.objects.create(user=User.objects.create_user('master'), position='Мастер')
+        client_obj = Client.objects.create(user=User.objects.create_user('client'), gender='Мужской')
+        Visit.objects.create(client=client_obj, employee=employee, service=service, hall=hall,
+                             date=date(2025, 1, 1), time=time(10, 3))  # 10:03–10:33, слот 10:34 свободен
+
+        report = utilization_report(date(2025, 1, 1), date(2025, 1, 1), duration=17)
+
+        day = report['halls'][0]['days']['2025-01-01']
+        self.assertEqual(day['free_slots'], len(get_time_slots(hall, short, date(2025, 1, 1))))
+        self.assertEqual(day['utilization'], round(30 / 180, 4))
+
+    def test_utilization_and_admin_only_endpoint(self):
+        hall = Hall.objects.create(name='Зал', description='', capacity=2, location='',
+                                   start_time=time(10, 0), end_time=time(12, 0))
+        service = Service.objects.create(name='Стрижка', description='', price=1000, duration=time(1, 0))
+        employee = Employee.objects.create(user=User.objects.create_user('master'), position='Мастер')
+        client_obj = Client.objects.create(user=User.objects.create_user('client'), gender='Мужской')
+        Visit.objects.create(client=client_obj, employee=employee, service=service, hall=hall,
+                             date=date(2025, 1, 1), time=time(10, 0))
+
+        api_client = APIClient()
+        api_client.force_authenticate(client_obj.user)
+        params = {'date_from': '2025-01-01', 'date_to': '2025-01-02'}
+        self.assertEqual(api_client.get(reverse('availability_report'), params).status_code, 403)
+
+        api_client.force_authenticate(User.objects.create_superuser('admin', password=None))
+        response = api_client.get(reverse('availability_report'), params)
+
+        # Один часовой визит из четырёх мест-часов
+        self.assertEqual(response.data['halls'][0]['days']['2025-01-01'],
+                         {'visits': 1, 'utilization': 0.25, 'free_slots': 2})
+        self.assertEqual(response.data['employees'][0]['booked_minutes'], 60)
+
+
+class TransferTests(TestCase):
+    """
+    Проверка потокового экспорта и импорта данных
+    """
+
+    def test_roundtrip_preserves_data(self):
+        generate_demo_data(halls=2, employees=3, services=4, clients=5, visits=30, seed=1,
+                           start_date=date(2025, 1, 1))
+        before = list(Visit.objects.order_by('id').values_list('id', 'client_id', 'employee_id', 'service_id',
+                                                               'hall_id', 'date', 'time', 'status'))
+        links = set(Employee.service_halls.through.objects.values_list('employee_id', 'servicehall__hall_id',
+                                                                        'servicehall__service_id'))
+
+        files = {}
+        for name, fmt in (('hall', 'csv'), ('service', 'jsonl'), ('client', 'csv'), ('employee', 'csv'),
+                          ('visit', 'jsonl')):
+            files[name] = (io.StringIO(), fmt)
+            export_file(files[name][0], fmt, TRANSFERS[name](), batch_size=7)
+
+        for model in (Visit, Employee, Client, ServiceHall, Service, Hall):
+            model.objects.all().delete()
+        User.objects.all().delete()
+
+        for name, (file, fmt) in files.items():
+            file.seek(0)
+            import_file(file, fmt, TRANSFERS[name](), batch_size=7)
+
+        self.assertEqual(list(Visit.objects.order_by('id').values_list(
+            'id', 'client_id', 'employee_id', 'service_id', 'hall_id', 'date', 'time', 'status')), before)
+        self.assertEqual(set(Employee.service_halls.through.objects.values_list(
+            'employee_id', 'servicehall__hall_id', 'servicehall__service_id')), links)
+
+    def test_malformed_rows_raise_command_error_with_row_number(self):
+        data = generate_demo_data(halls=1, employees=2, services=2, clients=1, visits=0, seed=1,
+                                  start_date=date(2025, 1, 1))
+        employee, client_obj = data['employees'][0], data['clients'][0]
+        service = data['employee_services'][employee.id][0]
+        other_service = Service.objects.create(name='Новая', description='', price=100, duration=time(0, 30))
+
+        def import_jsonl(name, rows):
+            file = io.StringIO(''.join(json.dumps(row) + '\n' for row in rows))
+            return import_file(file, 'jsonl', TRANSFERS[name](), batch_size=2)
+
+        # Статус не указан: значение по умолчанию модели
+        visit = {'client': client_obj.id, 'employee': employee.id, 'service': service.id,
+                 'date': '2025-01-01', 'time': '10:00'}
+        self.assertEqual(import_jsonl('visit', [visit]), 1)
+        self.assertEqual(Visit.objects.get().status, 'Запланирована')
+
+        # Сотрудник не оказывает услугу: номер строки с учётом предыдущих пакетов
+        with self.assertRaisesMessage(CommandError, "Строка 3: Сотрудник"):
+            import_jsonl('visit', [visit, visit, dict(visit, service=other_service.id)])
+
+        with self.assertRaisesMessage(CommandError, f"Строка 2: Пользователь '{client_obj.user.username}'"):
+            import_jsonl('client', [{'username': 'new_client', 'gender': 'Мужской'},
+                                    {'username': client_obj.user.username, 'gender': 'Мужской'}])
+        with self.assertRaisesMessage(CommandError, "Строка 1: Пользователь"):
+            import_jsonl('employee', [{'id': 1000, 'username': employee.user.username, 'position': 'Мастер'}])
+
+    def test_unparsable_jsonl_raises_command_error_with_row_number(self):
+        hall = {'name': 'Зал', 'description': '', 'capacity': 2, 'location': '',
+                'start_time': '10:00', 'end_time': '18:00'}
+
+        def import_lines(lines):
+            return import_file(io.StringIO('\n'.join(lines) + '\n'), 'jsonl', TRANSFERS['hall'](), batch_size=2)
+
+        # Ошибка чтения в третьем пакете: первые два пакета уже сохранены
+        lines = [json.dumps(dict(hall, id=index)) for index in range(1, 5)]
+        with self.assertRaisesMessage(CommandError, "Строка 5: Некорректный JSON"):
+            import_lines(lines + ['{"id": 5,'])
+        self.assertEqual(Hall.objects.count(), 4)
+
+        with self.assertRaisesMessage(CommandError, "Строка 1: Ожидается JSON-объект."):
+            import_lines(['[1, 2]'])
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    """
+    Нагрузочная проверка: параллельные бронирования не превышают вместимость зала
+    """
+
+    threads = 8  # Количество потоков
+    attempts = 40  # Количество попыток бронирования
+
+    def setUp(self):
+        self.hall = Hall.objects.create(name='Зал', description='', capacity=3, location='',
+                                        start_time=time(10, 0), end_time=time(12, 0))
+        self.service = Service.objects.create(name='Стрижка', description='', price=1000, duration=time(1, 0))
+        # Мастеров больше, чем мест: упираемся во вместимость зала, а не в расписание мастера
+        self.employees = [Employee.objects.create(user=User.objects.create_user(f"master{i}"), position='Мастер')
+                          for i in range(self.hall.capacity + 1)]
+        self.client_obj = Client.objects.create(user=User.objects.create_user('client'), gender='Мужской')
+
+    def attempt(self, args):
+        index, visit_time = args
+        employee = self.employees[index // 2 % len(self.employees)]
+        try:
+            book_visit(self.client_obj, employee, self.service, date(2025, 1, 1), visit_time, self.hall)
+            return True
+        except ValidationError:
+            return False
+        finally:
+            connection.close()  # У каждого потока своё соединение
+
+    def test_capacity_never_exceeded(self):
+        visit_times = [time(10, 0), time(11, 0)] * (self.attempts // 2)
+
+        started = default_timer()
+        with ThreadPoolExecutor(self.threads) as executor:
+            booked = sum(executor.map(self.attempt, enumerate(visit_times)))
+        elapsed = default_timer() - started
+
+        self.assertEqual(booked, 2 * self.hall.capacity)
+        for visit_time in (time(10, 0), time(11, 0)):
+            self.assertEqual(Visit.objects.filter(hall=self.hall, time=visit_time).count(), self.hall.capacity)
+
+        self.assertLess(elapsed, 10)  # Все попытки укладываются в разумное время
+
+
+@skipUnless(connection.vendor == 'sqlite', 'План запроса проверяется на SQLite')
+class VisitQueryPlanTests(TestCase):
+    """
+    Проверка, что горячие запросы к визитам используют составные индексы (EXPLAIN QUERY PLAN)
+    """
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(f"USING INDEX {index_name}", plan)
+
+    def test_hall_day_queries(self):
+        self.assertUsesIndex(Visit.objects.filter(hall=1, date=date(2025, 1, 1)), 'visit_hall_date_time_idx')
+        self.assertUsesIndex(Visit.objects.filter(hall=1, date=date(2025, 1, 1), time=time(10, 0)),
+                             'visit_hall_date_time_idx')
+
+    def test_client_history_query(self):
+        self.assertUsesIndex(Visit.objects.filter(client=1), 'visit_client_date_time_idx')
+
+    def test_planned_status_query(self):
+        today = date(2025, 1, 1)
+        planned = Visit.objects.filter((Q(date__lt=today) | Q(date=today, time__lt='10:00')) & Q(status='Запланирована'))
+        self.assertUsesIndex(planned, 'visit_planned_date_time_idx')
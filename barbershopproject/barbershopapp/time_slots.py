@@ -1,55 +1,191 @@
-from datetime import timedelta, datetime
+import heapq
+from array import array
+from datetime import datetime, timedelta, time
 
 from django.db.models import Q
 
-from .models import Visit, Employee
+from . import availability_cache, replica, slot_grid
+from .availability import MINUTES, ScheduleAvailability, format_minutes, to_minutes, visit_rows
+from .models import Visit, Employee, past_visits_q
+
+
+def format_slots(slots, raw=False):
+    """
+    Слоты для ответа API: строки 'HH:MM' или, при raw, минуты от начала суток.
+    Внутри расчёта и в кэше слоты хранятся как array('H') минут.
+    """
+
+    return list(slots) if raw else [format_minutes(slot) for slot in slots]
 
 
 # Функция для генерации временных слотов
-def get_time_slots(hall, service, date):
-    start_time = hall.start_time  # Начало работы
-    end_time = hall.end_time  # Конец работы
+def get_time_slots(hall, service, date, employee=None, raw=False):
+    """
+    Возвращает свободные временные слоты зала на дату для услуги.
+    Слот занят, если число одновременных визитов достигло вместимости зала
+    или у мастера в это время есть другой визит (в любом зале).
+    При SLOT_GRID_ENABLED места в зале берутся из сетки slot_grid.
 
-    # Длительность услуги
-    service_duration = service.duration.hour * 60 + service.duration.minute  # В минутах
+    :param hall: объект Hall
+    :param service: объект Service
+    :param date: дата
+    :param employee: объект Employee или None (учитывается только зал)
+    :param raw: вернуть минуты от начала суток вместо строк
+    :return: список строк 'HH:MM' (или минут)
+    """
 
-    # Все записи для данного зала на указанную дату
-    existing_visits = Visit.objects.filter(hall=hall, date=date)
+    service_duration = to_minutes(service.duration)  # Длительность услуги в минутах
+    key = (hall.id, employee.id if employee else None, date)
 
-    # Создание занятых временных слотов
-    occupied_time_slots = []
+    # Сначала ищем слоты в кэше
+    cached, generations = availability_cache.get_many([key], service_duration)
+    if cached:
+        return format_slots(cached[key], raw)
 
-    for visit in existing_visits:
+    if slot_grid.enabled():
+        # Места в зале — из материализованной сетки, визиты загружаются только у мастера
+        slots = slot_grid.free_slots(hall, date, service_duration)
+        if employee:
+            busy = ScheduleAvailability(hall, employee.id, visit_rows(
+                Visit.objects.filter(employee=employee, date=date))).employee
+            slots = array(MINUTES, (slot for slot in slots if busy.is_free(slot, slot + service_duration)))
+    else:
+        # Занятость зала и мастера строится одним запросом
+        slots = ScheduleAvailability.for_date(hall, date, key[1]).free_slots(service_duration)
+
+    availability_cache.set_many({key: slots}, service_duration, generations, replica.cache_timeout())
+    return format_slots(slots, raw)
 
-        # Проверка типа данных приходящего из класса времени, если строка то преобразуем в тип данных datetime
-        if isinstance(visit.time, str):
-            time = datetime.strptime(visit.time, '%H:%M:%S').time()
-        else:
-            time = visit.time
 
-        visit_start_time = datetime.combine(date, time)  # Время начала визита
-        visit_end_time = visit_start_time + timedelta(minutes=service_duration)  # Время окончания визита
+# Функция для генерации временных слотов на диапазон дат
+def get_time_slots_range(employee_halls, service, date_from, date_to, raw=False):
+    """
+    Возвращает свободные временные слоты нескольких мастеров на каждый день диапазона.
+    Визиты всех залов и мастеров за диапазон загружаются одним запросом.
+
+    :param employee_halls: словарь {id мастера: объект Hall}
+    :param service: объект Service
+    :param date_from: первая дата диапазона
+    :param date_to: последняя дата диапазона (включительно)
+    :param raw: вернуть минуты от начала суток вместо строк
+    :return: словарь {id мастера: {'YYYY-MM-DD': список строк 'HH:MM' (или минут)}}
+    """
+
+    service_duration = to_minutes(service.duration)  # Длительность услуги в минутах
 
-        # Добавление занятых временных слотов
-        occupied_time_slots.append((visit_start_time, visit_end_time))
+    keys = [(hall.id, employee_id, date_from + timedelta(days=day))
+            for employee_id, hall in employee_halls.items() for day in range((date_to - date_from).days + 1)]
 
-    # Генерация свободных временных слотов
-    available_time_slots = []
+    # Если весь диапазон есть в кэше, к базе не обращаемся
+    cached, generations = availability_cache.get_many(keys, service_duration)
 
-    current_time_temp = datetime.combine(date, start_time)  # Текущее время (datetime)
+    if len(cached) < len(keys):
+        availability = ScheduleAvailability.for_range(employee_halls, date_from, date_to)
+        computed = {key: availability[key[1:]].free_slots(service_duration) for key in keys if key not in cached}
 
-    while current_time_temp.time() < end_time and current_time_temp.time() not in occupied_time_slots:  # Пока текущее время меньше конечного времени
-        slot_start = current_time_temp  # Начало временного слота
-        slot_end = slot_start + timedelta(minutes=service_duration)  # Конец временного слота
+        availability_cache.set_many(computed, service_duration, generations, replica.cache_timeout())
+        cached.update(computed)
 
-        # Проверяем, пересекается ли этот слот с занятыми
-        if not any(oc_start < slot_end and slot_start < oc_end for oc_start, oc_end in occupied_time_slots):
-            available_time_slots.append(slot_start.time().strftime('%H:%M'))
+    time_slots = {employee_id: {} for employee_id in employee_halls}
+    for hall_id, employee_id, date in keys:
+        time_slots[employee_id][date.isoformat()] = format_slots(cached[(hall_id, employee_id, date)], raw)
 
-        # Шаг между выбором времени по умолчанию - 1 час
-        current_time_temp += timedelta(minutes=service_duration)
+    return time_slots
 
-    return available_time_slots
+
+# Функция для получения залов мастеров для услуги
+def get_employee_halls(service, employee_ids=None):
+    """
+    Возвращает зал, в котором каждый мастер оказывает услугу (первая связь, как при бронировании), одним запросом.
+
+    :param service: объект Service
+    :param employee_ids: список id мастеров или None (все мастера услуги)
+    :return: словарь {id мастера: объект Hall}
+    """
+
+    links = Employee.service_halls.through.objects.filter(servicehall__service_id=service.id)
+    if employee_ids is not None:
+        links = links.filter(employee_id__in=employee_ids)
+
+    employee_halls = {}
+    for link in links.select_related('servicehall__hall').order_by('servicehall_id'):
+        employee_halls.setdefault(link.employee_id, link.servicehall.hall)
+    return employee_halls
+
+
+# Функция для поиска ближайших свободных слотов
+def find_nearest_slots(service, target, k=5, days=7, current=None, raw=False):
+    """
+    Возвращает k свободных слотов, ближайших к target, среди всех мастеров услуги
+    (get_employees_by_service) в их залах, в пределах days дней до и после target.
+
+    Очередь с приоритетом хранит дни мастеров с нижней оценкой расстояния (до часов работы
+    зала) и уже найденные слоты с точным расстоянием. Слоты дня берутся из кэша свободных
+    слотов (общего с get_time_slots), а при промахе индекс занятости строится по визитам даты,
+    только когда день оказывается ближайшим, поэтому дальние дни не загружаются.
+
+    :param service: объект Service
+    :param target: желаемые дата и время (datetime)
+    :param current: текущий момент; слоты раньше него не предлагаются
+    :param raw: time в минутах от начала суток вместо строки
+    :return: список словарей employee, hall, date ('YYYY-MM-DD'), time ('HH:MM') по возрастанию расстояния до target
+    """
+
+    current = current or datetime.now()
+    service_duration = to_minutes(service.duration)  # Длительность услуги в минутах
+
+    employee_halls = get_employee_halls(service, get_employees_by_service(service).values('id'))
+
+    date_from = max(target.date() - timedelta(days=days), current.date())
+    date_to = target.date() + timedelta(days=days)
+    if not employee_halls or date_to < date_from or service_duration <= 0:
+        return []
+
+    # Элемент очереди: (расстояние, вид, id мастера, дата, начало слота); день (вид 1) — до раскрытия
+    queue = []
+    for employee_id, hall in employee_halls.items():
+        for day in range((date_to - date_from).days + 1):
+            date = date_from + timedelta(days=day)
+            opens, closes = datetime.combine(date, hall.start_time), datetime.combine(date, hall.end_time)
+            queue.append((max(opens - target, target - closes, timedelta(0)), 1, employee_id, date, 0))
+    heapq.heapify(queue)
+
+    # Слоты дней из кэша одним обращением; для остальных визиты загружаются по датам, когда до даты доходит очередь
+    cached, generations = availability_cache.get_many(
+        [(employee_halls[employee_id].id, employee_id, date) for _, _, employee_id, date, _ in queue], service_duration)
+    halls = {hall.id for hall in employee_halls.values()}
+    visits = Visit.objects.filter(Q(hall_id__in=halls) | Q(employee_id__in=employee_halls.keys()))
+    rows_by_date = {}
+    computed = {}
+
+    slots = []
+    while queue and len(slots) < k:
+        distance, kind, employee_id, date, slot = heapq.heappop(queue)
+        hall = employee_halls[employee_id]
+
+        if kind == 0:
+            slots.append({'employee': employee_id, 'hall': hall.id, 'date': date.isoformat(),
+                          'time': slot if raw else format_minutes(slot)})
+            continue
+
+        # День стал ближайшим: добавляем его свободные слоты
+        key = (hall.id, employee_id, date)
+        if key in cached:
+            day_slots = cached[key]
+        else:
+            if date not in rows_by_date:
+                rows_by_date[date] = visit_rows(visits.filter(date=date))
+            day_slots = computed[key] = ScheduleAvailability(
+                hall, employee_id, rows_by_date[date]).free_slots(service_duration)
+
+        midnight = datetime.combine(date, time())
+        for slot in day_slots:
+            starts_at = midnight + timedelta(minutes=slot)
+            if starts_at >= current:
+                heapq.heappush(queue, (abs(starts_at - target), 0, employee_id, date, slot))
+
+    availability_cache.set_many(computed, service_duration, generations, replica.cache_timeout())
+    return slots
 
 
 # Функция для получения списка мастеров, предоставляющих услугу
@@ -64,10 +200,26 @@ def get_employees_by_service(service):
 
 
 # Функция для обновления статусов визитов
-def update_status_visits():
-    date, time = datetime.now().date(), datetime.now().time()  # Текущая дата и время
+def update_status_visits(batch_size=1000):
+    """
+    Переводит прошедшие запланированные визиты в статус «Выполнена» пакетами.
+    API показывает эффективный статус и без этого (см. VisitQuerySet.with_effective_status),
+    поэтому функция лишь сохраняет его в базу — её достаточно запускать в часы низкой нагрузки.
+    Отбор идёт по частичному индексу запланированных визитов, каждый пакет — короткий UPDATE по первичным ключам.
+
+    :param batch_size: максимальное количество визитов в одном UPDATE
+    :return: количество обновлённых визитов
+    """
+
+    # Запланированные визиты, дата которых прошла, или сегодняшние, время которых уже наступило
+    planned = Visit.objects.filter(past_visits_q() & Q(status='Запланирована'))
+
+    updated = 0
+    while True:
+        ids = list(planned.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+
+        updated += Visit.objects.filter(pk__in=ids, status='Запланирована').update(status='Выполнена')
 
-    # Получаем статусы визитов и обновляем их. Если дата визита равна текущей, но время визита меньше или равно текущему времени
-    Visit.objects.filter(
-        (Q(date__lt=date) | Q(date=date, time__lt=time.strftime('%H:%M'))) & Q(status='Запланирована')).update(
-        status='Выполнена')
+    return updated
@@ -0,0 +1,401 @@
+"""
+Потоковый импорт и экспорт залов, услуг, клиентов, сотрудников и визитов в CSV и JSONL.
+
+Строки читаются и пишутся пакетами фиксированного размера, поэтому расход памяти
+не зависит от размера файла. Идентификаторы сохраняются, чтобы ссылки между
+файлами (визит → сотрудник, клиент, услуга) оставались верными при переносе
+в новую базу.
+
+Ошибка в данных прерывает импорт с CommandError и номером строки файла (без заголовка CSV);
+пакеты до неё уже сохранены.
+"""
+import csv
+import json
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management.base import CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction, IntegrityError
+from django.db.models import F
+
+from . import availability_cache, catalog_cache, slot_grid
+from .models import Hall, Service, Client, Employee, Visit
+from .service_halls import sync_service_halls
+
+FORMATS = ('csv', 'jsonl')  # Поддерживаемые форматы
+LIST_SEPARATOR = ';'  # Разделитель списков id в CSV (залы и услуги сотрудника)
+
+
+class RowError(ValueError):
+    """
+    Недопустимая строка пакета импорта.
+    """
+
+    def __init__(self, index, message):
+        super().__init__(message)
+        self.index = index  # Номер строки в пакете (с нуля)
+
+
+def detect_format(path, fmt=None):
+    """
+    Определяет формат по явному параметру или расширению файла.
+    """
+
+    fmt = fmt or path.rsplit('.', 1)[-1].lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат '{fmt}', допустимы: {', '.join(FORMATS)}")
+    return fmt
+
+
+def read_rows(file, fmt):
+    """
+    Построчно читает словари из CSV или JSONL.
+    Строка JSONL, которая не разбирается в JSON-объект, — RowError с номером строки от начала файла.
+    """
+
+    if fmt == 'csv':
+        yield from csv.DictReader(file)
+    else:
+        index = 0
+        for line in file:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as error:
+                raise RowError(index, f"Некорректный JSON: {error}")
+            if not isinstance(row, dict):
+                raise RowError(index, "Ожидается JSON-объект.")
+            yield row
+            index += 1
+
+
+class RowWriter:
+    """
+    Построчная запись словарей в CSV или JSONL.
+    """
+
+    def __init__(self, file, fmt, fields):
+        self.fmt = fmt
+        self.file = file
+        if fmt == 'csv':
+            self._writer = csv.DictWriter(file, fieldnames=fields)
+            self._writer.writeheader()
+
+    def write(self, row):
+        if self.fmt == 'csv':
+            self._writer.writerow({key: _to_csv(value) for key, value in row.items()})
+        else:
+            self.file.write(json.dumps(row, ensure_ascii=False, default=str) + '\n')
+
+
+def _to_csv(value):
+    # Списки id сотрудника пишутся в одну ячейку
+    if isinstance(value, list):
+        return LIST_SEPARATOR.join(str(item) for item in value)
+    return '' if value is None else value
+
+
+def chunked(iterable, size):
+    """
+    Разбивает итерируемое на списки не длиннее size.
+    """
+
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _ids(value):
+    # Список id из JSON-массива или строки 'id;id;id'
+    if isinstance(value, list):
+        return [int(item) for item in value]
+    return [int(item) for item in str(value or '').split(LIST_SEPARATOR) if item]
+
+
+def _convert(model, row, fields):
+    # Значения строки в типы полей модели; пустые строки CSV — None для необязательных полей,
+    # отсутствующие значения обязательных полей — значение по умолчанию модели
+    values = {}
+    for name in fields:
+        field = model._meta.get_field(name)
+        value = row.get(name)
+        if value in ('', None) and not field.null and field.has_default():
+            value = field.get_default()
+        if value == '' and field.null:
+            value = None
+        values[field.attname] = field.to_python(value) if value is not None else None
+    return values
+
+
+def _convert_rows(model, rows, fields):
+    # Значения всех строк пакета; ошибка преобразования — RowError с номером строки
+    values = []
+    for index, row in enumerate(rows):
+        try:
+            values.append(_convert(model, row, fields))
+        except ValidationError as error:
+            raise RowError(index, '; '.join(error.messages))
+        except (TypeError, ValueError) as error:
+            raise RowError(index, str(error))
+    return values
+
+
+def reset_sequences(*models):
+    """
+    Сдвигает последовательности id после вставки записей с явными id (PostgreSQL).
+    """
+
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def _keyset(queryset, batch_size):
+    # Пакеты записей по возрастанию id без OFFSET
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id).order_by('id')[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1]['id']
+
+
+class HallTransfer:
+    model = Hall
+    fields = ['id', 'name', 'description', 'capacity', 'location', 'start_time', 'end_time']
+    catalog = 'hall'  # Справочник, версия которого меняется после импорта (см. catalog_cache.py)
+
+    def export_rows(self, batch_size):
+        for batch in _keyset(self.model.objects.values(*self.fields), batch_size):
+            yield from batch
+
+    def import_rows(self, rows):
+        self.model.objects.bulk_create([self.model(**values) for values in _convert_rows(self.model, rows, self.fields)])
+        return len(rows)
+
+    def finish(self):
+        reset_sequences(self.model)
+        if self.catalog:
+            catalog_cache.bump(self.catalog)  # bulk_create не вызывает сигналы
+
+
+class ServiceTransfer(HallTransfer):
+    model = Service
+    fields = ['id', 'name', 'description', 'price', 'duration']
+    catalog = 'service'
+
+
+class ClientTransfer(HallTransfer):
+    model = Client
+    catalog = None
+    user_fields = ['username', 'first_name', 'last_name', 'email']
+    fields = ['id'] + user_fields + ['phone_number', 'date_of_birth', 'gender']
+
+    def __init__(self):
+        self._password = make_password(None)  # Вход по паролю после импорта не предусмотрен
+
+    def export_rows(self, batch_size):
+        values = {field: F(f"user__{field}") for field in self.user_fields}
+        own_fields = [field for field in self.fields if field not in values]
+        for batch in _keyset(self.model.objects.values(*own_fields, **values), batch_size):
+            yield from batch
+
+    def create_users(self, rows):
+        """
+        Создаёт пользователей пакета и возвращает {username: id}.
+        Пустое, повторяющееся в пакете или уже занятое имя пользователя — RowError.
+        """
+
+        seen = set()
+        for index, row in enumerate(rows):
+            if not row.get('username'):
+                raise RowError(index, "Не указано имя пользователя (username).")
+            if row['username'] in seen:
+                raise RowError(index, f"Имя пользователя '{row['username']}' повторяется в файле.")
+            seen.add(row['username'])
+
+        existing = set(User.objects.filter(username__in=seen).values_list('username', flat=True))
+        for index, row in enumerate(rows):
+            if row['username'] in existing:
+                raise RowError(index, f"Пользователь '{row['username']}' уже существует.")
+
+        User.objects.bulk_create([User(password=self._password, **{field: row.get(field) or '' for field in
+                                                                    self.user_fields}) for row in rows])
+        return dict(User.objects.filter(username__in=[row['username'] for row in rows]).values_list('username', 'id'))
+
+    def import_rows(self, rows):
+        own_fields = [field for field in self.fields if field not in self.user_fields]
+        values = _convert_rows(self.model, rows, own_fields)
+        users = self.create_users(rows)
+        self.model.objects.bulk_create([self.model(user_id=users[row['username']], **row_values)
+                                        for row, row_values in zip(rows, values)])
+        return len(rows)
+
+
+class EmployeeTransfer(ClientTransfer):
+    model = Employee
+    fields = ['id'] + ClientTransfer.user_fields + ['phone_number', 'position', 'halls', 'services']
+    catalog = 'employee'
+
+    def export_rows(self, batch_size):
+        values = {field: F(f"user__{field}") for field in self.user_fields}
+        queryset = self.model.objects.values('id', 'phone_number', 'position', **values)
+
+        for batch in _keyset(queryset, batch_size):
+            ids = [row['id'] for row in batch]
+            halls = self._relations(Employee.halls.through, 'hall_id', ids)
+            services = self._relations(Employee.services.through, 'service_id', ids)
+            for row in batch:
+                row['halls'] = halls.get(row['id'], [])
+                row['services'] = services.get(row['id'], [])
+                yield row
+
+    @staticmethod
+    def _relations(through, column, ids):
+        # {id сотрудника: [id связанных объектов]} для пакета одним запросом
+        relations = {}
+        for employee_id, related_id in through.objects.filter(employee_id__in=ids).values_list('employee_id', column):
+            relations.setdefault(employee_id, []).append(related_id)
+        return relations
+
+    def import_rows(self, rows):
+        values = _convert_rows(self.model, rows, ['id', 'phone_number', 'position'])
+        relations = []  # (id сотрудника, id залов, id услуг)
+        for index, (row, row_values) in enumerate(zip(rows, values)):
+            if row_values['id'] is None:
+                raise RowError(index, "Не указан id сотрудника.")
+            try:
+                relations.append((row_values['id'], _ids(row.get('halls')), _ids(row.get('services'))))
+            except ValueError as error:
+                raise RowError(index, f"Некорректный список id: {error}")
+
+        users = self.create_users(rows)
+        self.model.objects.bulk_create([self.model(user_id=users[row['username']], **row_values)
+                                        for row, row_values in zip(rows, values)])
+
+        Employee.halls.through.objects.bulk_create([
+            Employee.halls.through(employee_id=employee_id, hall_id=hall_id)
+            for employee_id, hall_ids, _ in relations for hall_id in hall_ids])
+        Employee.services.through.objects.bulk_create([
+            Employee.services.through(employee_id=employee_id, service_id=service_id)
+            for employee_id, _, service_ids in relations for service_id in service_ids])
+
+        # bulk_create не вызывает m2m_changed, поэтому связи «услуга-зал» строятся явно
+        sync_service_halls([employee_id for employee_id, _, _ in relations])
+        return len(rows)
+
+
+class VisitTransfer(HallTransfer):
+    model = Visit
+    fields = ['id', 'client', 'employee', 'service', 'hall', 'date', 'time', 'status']
+    catalog = None
+
+    def __init__(self):
+        self._halls = None  # (сотрудник, услуга) -> зал, загружается один раз перед импортом
+
+    def export_rows(self, batch_size):
+        queryset = self.model.objects.values('id', 'client_id', 'employee_id', 'service_id', 'hall_id',
+                                             'date', 'time', 'status')
+        for batch in _keyset(queryset, batch_size):
+            for row in batch:
+                yield {field: row.get(field, row.get(f"{field}_id")) for field in self.fields}
+
+    def service_halls(self):
+        """
+        Зал для каждой пары (сотрудник, услуга): первая связь, как при бронировании.
+        """
+
+        if self._halls is None:
+            self._halls = {}
+            links = Employee.service_halls.through.objects.order_by('servicehall_id').values_list(
+                'employee_id', 'servicehall__service_id', 'servicehall__hall_id')
+            for employee_id, service_id, hall_id in links.iterator(chunk_size=5000):
+                self._halls.setdefault((employee_id, service_id), hall_id)
+        return self._halls
+
+    def import_rows(self, rows):
+        halls = self.service_halls()
+
+        visits = []
+        for index, values in enumerate(_convert_rows(self.model, rows, self.fields)):
+            if values['hall_id'] is None:
+                hall_id = halls.get((values['employee_id'], values['service_id']))
+                if hall_id is None:
+                    raise RowError(index, f"Сотрудник {values['employee_id']} не оказывает услугу "
+                                          f"{values['service_id']}, зал не указан.")
+                values['hall_id'] = hall_id
+            visits.append(self.model(**values))
+
+        self.model.objects.bulk_create(visits)
+
+        # bulk_create не вызывает сигналы: сбрасываем кэш свободных слотов и сетки затронутых дней
+        availability_cache.invalidate({(visit.hall_id, visit.employee_id, visit.date) for visit in visits})
+        slot_grid.discard({(visit.hall_id, visit.date) for visit in visits})
+        return len(rows)
+
+
+TRANSFERS = {
+    'hall': HallTransfer,
+    'service': ServiceTransfer,
+    'client': ClientTransfer,
+    'employee': EmployeeTransfer,
+    'visit': VisitTransfer,
+}
+
+
+def import_file(file, fmt, transfer, batch_size=1000, progress=None):
+    """
+    Импортирует строки пакетами, каждый пакет — в своей транзакции.
+
+    :param progress: функция, вызываемая с количеством импортированных строк после каждого пакета
+    :return: общее количество импортированных строк
+    :raises CommandError: строка с ошибкой в данных (номер строки и количество уже импортированных)
+    """
+
+    total = 0
+    try:
+        for rows in chunked(read_rows(file, fmt), batch_size):
+            try:
+                with transaction.atomic():
+                    total += transfer.import_rows(rows)
+            except RowError as error:
+                raise CommandError(f"Строка {total + error.index + 1}: {error} (импортировано строк: {total})")
+            except IntegrityError as error:
+                # Ссылки на несуществующие записи проверяет база: известен только пакет
+                raise CommandError(f"Строки {total + 1}–{total + len(rows)}: {error} "
+                                   f"(импортировано строк: {total})")
+            if progress:
+                progress(total)
+    except RowError as error:
+        # Строка не разобралась при чтении файла: номер уже считается от начала файла
+        raise CommandError(f"Строка {error.index + 1}: {error} (импортировано строк: {total})")
+
+    transfer.finish()
+    return total
+
+
+def export_file(file, fmt, transfer, batch_size=1000, progress=None):
+    """
+    Экспортирует записи пакетами по возрастанию id.
+
+    :return: общее количество экспортированных строк
+    """
+
+    writer = RowWriter(file, fmt, transfer.fields)
+
+    total = 0
+    for rows in chunked(transfer.export_rows(batch_size), batch_size):
+        for row in rows:
+            writer.write(row)
+        total += len(rows)
+        if progress:
+            progress(total)
+
+    return total
@@ -1,9 +1,11 @@
 from django.urls import path
 from rest_framework.authtoken.views import obtain_auth_token
 
+from . import async_views
 from .views import ClientRegistrationView, ClientUpdateView, ClientProfileView, EmployeeShowView, HallShowView, \
     ServiceShowView, BookVisitAPIView, GetAvailableTimeAPIView, VisitShowClientAPIView, VisitUpdateClient, \
-    VisitDeleteClient, GetEmployeesByServiceAPIView
+    VisitDeleteClient, GetEmployeesByServiceAPIView, GetAvailableTimeRangeAPIView, BookVisitBatchAPIView, \
+    AvailabilityReportAPIView, GetNearestAvailableTimeAPIView
 
 urlpatterns = [
 
@@ -29,6 +31,7 @@ urlpatterns = [
 
     # Бронирование посещений
     path('book/visit/', BookVisitAPIView.as_view(), name='book_visit'),
+    path('book/visits/', BookVisitBatchAPIView.as_view(), name='book_visit_batch'),
     path('visit/show/client/', VisitShowClientAPIView.as_view(), name='visit_show_client'),
 
     # Обновление и удаление визитов
@@ -37,6 +40,19 @@ urlpatterns = [
 
     # Получение доступного времени для посещений
     path('get_available_time/', GetAvailableTimeAPIView.as_view(), name='get_available_time'),
-    path('get_employee_for_service/', GetEmployeesByServiceAPIView.as_view(), name='get_employee_for_service')
+    path('get_available_time/range/', GetAvailableTimeRangeAPIView.as_view(), name='get_available_time_range'),
+    path('get_available_time/nearest/', GetNearestAvailableTimeAPIView.as_view(), name='get_nearest_available_time'),
+    path('get_employee_for_service/', GetEmployeesByServiceAPIView.as_view(), name='get_employee_for_service'),
+
+    # Отчёт о загрузке залов и мастеров (администраторы)
+    path('report/availability/', AvailabilityReportAPIView.as_view(), name='availability_report'),
+
+    # Асинхронные варианты читающих эндпоинтов (ASGI)
+    path('async/employee/show/', async_views.employee_show, name='async_employee_show'),
+    path('async/hall/show/', async_views.hall_show, name='async_hall_show'),
+    path('async/service/show/', async_views.service_show, name='async_service_show'),
+    path('async/get_available_time/', async_views.get_available_time, name='async_get_available_time'),
+    path('async/get_employee_for_service/', async_views.get_employees_by_service_view,
+         name='async_get_employee_for_service'),
 
 ]
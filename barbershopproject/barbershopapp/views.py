@@ -1,20 +1,40 @@
 from datetime import datetime
 
-from rest_framework.exceptions import ValidationError
+from rest_framework import status
+from rest_framework.exceptions import ValidationError, NotFound
 from rest_framework.generics import RetrieveUpdateAPIView, CreateAPIView, ListAPIView, DestroyAPIView, RetrieveAPIView
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from .booking import book_visits, BatchBookingError
+from .catalog_cache import CatalogCacheMixin
 from .models import Hall, Service, Client, Employee, Visit
+from .pagination import CatalogCursorPagination, VisitKeysetPagination
+from .replica import ReplicaReadMixin, PinPrimaryMixin
+from .reports import utilization_report
 from .serializers import HallSerializer, ClientSerializer, ServiceSerializer, EmployeeSerializer, VisitSerializer, \
-    UserSerializer, ClientUpdateSerializer, VisitHistorySerializer
-from .time_slots import get_time_slots, update_status_visits
+    UserSerializer, ClientUpdateSerializer, VisitHistorySerializer, VisitHistoryRowSerializer, VisitBatchSerializer
+from .time_slots import get_time_slots, get_time_slots_range, get_employees_by_service, get_employee_halls, \
+    find_nearest_slots
 
 
 # Create your views here.
 
 
+def get_service(service_id):
+    """
+    Услуга по id из параметров запроса: 400 при некорректном id, 404 если услуги нет.
+    """
+
+    try:
+        return Service.objects.get(id=int(service_id))
+    except ValueError:
+        raise ValidationError("Некорректные параметры запроса.")
+    except Service.DoesNotExist:
+        raise NotFound("Услуга не найдена.")
+
+
 # функция registration_client
 class ClientRegistrationView(CreateAPIView):
     """
@@ -107,19 +127,21 @@ class ClientProfileView(RetrieveAPIView):
 
 
 # Функция employee_show
-class EmployeeShowView(ListAPIView):
+class EmployeeShowView(ReplicaReadMixin, CatalogCacheMixin, ListAPIView):
     """
     Показ всех сотрудников.
     Доступно только для администраторов.
     """
 
-    queryset = Employee.objects.all()  # Указываем queryset для получения всех сотрудников
+    queryset = Employee.objects.with_related()  # Все сотрудники вместе с пользователями, залами и услугами
     serializer_class = EmployeeSerializer  # Указываем сериализатор для сотрудников
     permission_classes = [IsAuthenticated]  # Доступ только для авторизованных пользователей
+    pagination_class = CatalogCursorPagination  # Страницы по id
+    catalogs = ('employee', 'hall', 'service')  # Вложенные залы и услуги тоже в ответе
 
 
 # Функция hall_show
-class HallShowView(ListAPIView):
+class HallShowView(ReplicaReadMixin, CatalogCacheMixin, ListAPIView):
     """
     Показ всех залов.
     Доступно только для авторизованных пользователей.
@@ -128,10 +150,12 @@ class HallShowView(ListAPIView):
     queryset = Hall.objects.all()  # Указываем queryset для получения всех залов
     serializer_class = HallSerializer  # Указываем сериализатор для залов
     permission_classes = [IsAuthenticated]  # Доступ только для авторизованных пользователей
+    pagination_class = CatalogCursorPagination  # Страницы по id
+    catalogs = ('hall',)  # ETag по версии справочника
 
 
 # Функция service_show
-class ServiceShowView(ListAPIView):
+class ServiceShowView(ReplicaReadMixin, CatalogCacheMixin, ListAPIView):
     """
     Показ всех услуг.
     Доступно только для авторизованных пользователей.
@@ -140,10 +164,12 @@ class ServiceShowView(ListAPIView):
     queryset = Service.objects.all()  # Указываем queryset для получения всех услуг
     serializer_class = ServiceSerializer  # Указываем сериализатор для услуг
     permission_classes = [IsAuthenticated]  # Доступ только для авторизованных пользователей
+    pagination_class = CatalogCursorPagination  # Страницы по id
+    catalogs = ('service',)  # ETag по версии справочника
 
 
 # Функция book_visit
-class BookVisitAPIView(CreateAPIView):
+class BookVisitAPIView(PinPrimaryMixin, CreateAPIView):
     """
     Регистрация визита для клиента.
     Доступно только для авторизованных клиентов.
@@ -160,8 +186,29 @@ class BookVisitAPIView(CreateAPIView):
         serializer.create(client=self.request.user.client)
 
 
+# Функция book_visit_batch
+class BookVisitBatchAPIView(PinPrimaryMixin, APIView):
+    """
+    Регистрация нескольких визитов для клиента одним запросом: все или ни одного.
+    Доступно только для авторизованных клиентов.
+    """
+
+    permission_classes = [IsAuthenticated]  # Только аутентифицированные пользователи
+
+    def post(self, request, *args, **kwargs):
+        serializer = VisitBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            visits, chain = book_visits(request.user.client, serializer.validated_data['visits'])
+        except BatchBookingError as error:
+            return Response({'errors': error.errors, 'chain': error.chain}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'visits': [visit.id for visit in visits], 'chain': chain}, status=status.HTTP_201_CREATED)
+
+
 # Функция get_available_time
-class GetAvailableTimeAPIView(APIView):
+class GetAvailableTimeAPIView(ReplicaReadMixin, APIView):
     """
     Показ временных слотов для выбранного сотрудника, услуги и даты.
     Доступно только для авторизованных клиентов.
@@ -173,6 +220,7 @@ class GetAvailableTimeAPIView(APIView):
         employee_id = request.query_params.get('employee')  # Получение параметров из запроса
         service_id = request.query_params.get('service')
         date_id = request.query_params.get('date')
+        raw = request.query_params.get('minutes') == '1'  # Минуты от начала суток вместо строк 'HH:MM'
 
         if employee_id and service_id and date_id:
             employee = Employee.objects.get(id=employee_id)  # Поиск сотрудника
@@ -182,14 +230,93 @@ class GetAvailableTimeAPIView(APIView):
             date = datetime.strptime(date_id, '%Y-%m-%d').date()  # Поиск даты
 
             # Получение доступных временных слотов
-            available_time = get_time_slots(hall, service, date)
+            available_time = get_time_slots(hall, service, date, employee, raw)
             return Response(available_time)
 
         return Response([])
 
 
+# Функция get_available_time_range
+class GetAvailableTimeRangeAPIView(ReplicaReadMixin, APIView):
+    """
+    Показ временных слотов для одного или нескольких сотрудников, услуги и диапазона дат.
+    Доступно только для авторизованных клиентов.
+    """
+
+    permission_classes = [IsAuthenticated]  # Только аутентифицированные пользователи
+
+    max_days = 62  # Максимальная длина диапазона в днях
+
+    def get(self, request, *args, **kwargs):
+        employee_ids = request.query_params.get('employee')  # Один id или список через запятую
+        service_id = request.query_params.get('service')
+        date_from_id = request.query_params.get('date_from')
+        date_to_id = request.query_params.get('date_to')
+        raw = request.query_params.get('minutes') == '1'  # Минуты от начала суток вместо строк 'HH:MM'
+
+        if not (employee_ids and service_id and date_from_id and date_to_id):
+            return Response({})
+
+        try:
+            employee_ids = [int(employee_id) for employee_id in employee_ids.split(',')]
+            date_from = datetime.strptime(date_from_id, '%Y-%m-%d').date()
+            date_to = datetime.strptime(date_to_id, '%Y-%m-%d').date()
+        except ValueError:
+            raise ValidationError("Некорректные параметры запроса.")
+
+        if date_to < date_from or (date_to - date_from).days >= self.max_days:
+            raise ValidationError(f"Диапазон дат должен быть от 1 до {self.max_days} дней.")
+
+        service = get_service(service_id)  # Поиск услуги
+
+        # Залы всех сотрудников для услуги одним запросом (первая связь, как в get_available_time)
+        employee_halls = get_employee_halls(service, employee_ids)
+        missing = [employee_id for employee_id in dict.fromkeys(employee_ids) if employee_id not in employee_halls]
+        if missing:
+            raise NotFound(f"Сотрудники не найдены или не оказывают услугу: {', '.join(map(str, missing))}.")
+
+        return Response(get_time_slots_range(employee_halls, service, date_from, date_to, raw))
+
+
+# Функция get_nearest_available_time
+class GetNearestAvailableTimeAPIView(ReplicaReadMixin, APIView):
+    """
+    Показ ближайших к желаемому времени свободных слотов у всех сотрудников, оказывающих услугу.
+    Параметры: service, datetime (YYYY-MM-DDTHH:MM), k (количество слотов), days (окно поиска в днях),
+    minutes=1 (время в минутах от начала суток).
+    Доступно только для авторизованных клиентов.
+    """
+
+    permission_classes = [IsAuthenticated]  # Только аутентифицированные пользователи
+
+    max_k = 50  # Максимальное количество слотов
+    max_days = 31  # Максимальное окно поиска в днях
+
+    def get(self, request, *args, **kwargs):
+        service_id = request.query_params.get('service')  # Получение параметров из запроса
+        target_id = request.query_params.get('datetime')
+        raw = request.query_params.get('minutes') == '1'  # Минуты от начала суток вместо строк 'HH:MM'
+
+        if not (service_id and target_id):
+            return Response([])
+
+        try:
+            target = datetime.strptime(target_id[:16], '%Y-%m-%dT%H:%M')
+            k = int(request.query_params.get('k', 5))
+            days = int(request.query_params.get('days', 7))
+        except ValueError:
+            raise ValidationError("Некорректные параметры запроса.")
+
+        if not (1 <= k <= self.max_k and 0 <= days <= self.max_days):
+            raise ValidationError(f"k должно быть от 1 до {self.max_k}, days — от 0 до {self.max_days}.")
+
+        service = get_service(service_id)  # Поиск услуги
+
+        return Response(find_nearest_slots(service, target, k, days, raw=raw))
+
+
 # Функция get_employees_by_service
-class GetEmployeesByServiceAPIView(APIView):
+class GetEmployeesByServiceAPIView(ReplicaReadMixin, APIView):
     """
     Показ сотрудников по выбранной услуге.
     Доступно только для авторизованных клиентов.
@@ -207,7 +334,7 @@ class GetEmployeesByServiceAPIView(APIView):
         try:
             # Логика получения списка сотрудников
             service = Service.objects.get(id=service_id)
-            employees = service.employees.all()
+            employees = get_employees_by_service(service).with_related()
 
             # Используем сериализатор для сериализации данных сотрудников
             serializer = EmployeeSerializer(employees, many=True)
@@ -219,31 +346,75 @@ class GetEmployeesByServiceAPIView(APIView):
 
 
 # Функция visit_show_client
-class VisitShowClientAPIView(APIView):
+class VisitShowClientAPIView(ReplicaReadMixin, APIView):
     """
-    Показ визитов для клиента.
+    Показ визитов для клиента от новых к старым, постранично.
+    Параметры: status, date_from, date_to (фильтры), fields (список полей через запятую), cursor, page_size.
     Доступно только для авторизованных клиентов.
     """
 
     permission_classes = [IsAuthenticated]  # Доступ только для авторизованных клиентов
-
-    update_status_visits()  # Обновляем статусы
+    pagination_class = VisitKeysetPagination  # Курсор по (дата, время, id)
 
     def get(self, request, *args, **kwargs):
         # Получаем текущего клиента
         client = request.user.client
 
-        # Фильтруем визиты текущего клиента
-        visits = Visit.objects.filter(client=client).select_related('employee', 'service')
+        fields = self.get_fields(request)
 
-        # Сериализуем данные
-        serializer = VisitHistorySerializer(visits, many=True)
+        # Плоские строки визитов текущего клиента: связанные поля и фильтры вычисляются в запросе
+        visits = self.filter_visits(Visit.objects.filter(client=client).history(fields), request)
 
-        return Response(serializer.data)
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(visits, request, view=self)
+
+        # Сериализуем словари без объектов моделей
+        serializer = VisitHistoryRowSerializer(page, fields)
+
+        return paginator.get_paginated_response(serializer.data)
+
+    @staticmethod
+    def get_fields(request):
+        """
+        Список запрошенных полей или None (все поля).
+        """
+
+        fields = request.query_params.get('fields')
+        if not fields:
+            return None
+
+        fields = [field.strip() for field in fields.split(',') if field.strip()]
+        allowed = VisitHistorySerializer.Meta.fields
+        unknown = [field for field in fields if field not in allowed]
+        if unknown:
+            raise ValidationError(f"Неизвестные поля: {', '.join(unknown)}. Допустимы: {', '.join(allowed)}.")
+        return fields
+
+    @staticmethod
+    def filter_visits(visits, request):
+        """
+        Фильтры по статусу (с учётом наступившего времени визита) и диапазону дат.
+        """
+
+        visit_status = request.query_params.get('status')
+        if visit_status:
+            visits = visits.filter(effective_status=visit_status)
+
+        try:
+            date_from = request.query_params.get('date_from')
+            if date_from:
+                visits = visits.filter(date__gte=datetime.strptime(date_from, '%Y-%m-%d').date())
+            date_to = request.query_params.get('date_to')
+            if date_to:
+                visits = visits.filter(date__lte=datetime.strptime(date_to, '%Y-%m-%d').date())
+        except ValueError:
+            raise ValidationError("Даты должны быть в формате YYYY-MM-DD.")
+
+        return visits
 
 
 # Функция visit_update_client
-class VisitUpdateClient(RetrieveUpdateAPIView):
+class VisitUpdateClient(PinPrimaryMixin, RetrieveUpdateAPIView):
     """
     Обновление визита для клиента.
     Доступно только для авторизованных клиентов.
@@ -266,7 +437,7 @@ class VisitUpdateClient(RetrieveUpdateAPIView):
 
 
 # Функция visit_delete_client
-class VisitDeleteClient(DestroyAPIView):
+class VisitDeleteClient(PinPrimaryMixin, DestroyAPIView):
     """
     Удаление визита для клиента.
     Доступно только для авторизованных клиентов.
@@ -274,3 +445,30 @@ class VisitDeleteClient(DestroyAPIView):
 
     permission_classes = [IsAuthenticated]  # Доступ только для авторизованных клиентов
     queryset = Visit.objects.all()  # Указываем queryset для получения данных
+
+
+# Функция availability_report
+class AvailabilityReportAPIView(APIView):
+    """
+    Отчёт о загрузке и свободных слотах всех залов и загрузке мастеров за период.
+    Доступно только для администраторов.
+    """
+
+    permission_classes = [IsAdminUser]  # Только администраторы
+
+    max_days = 93  # Максимальная длина периода в днях
+
+    def get(self, request, *args, **kwargs):
+        try:
+            date_from = datetime.strptime(request.query_params['date_from'], '%Y-%m-%d').date()
+            date_to = datetime.strptime(request.query_params['date_to'], '%Y-%m-%d').date()
+            duration = int(request.query_params.get('duration', 60))  # Длительность слота в минутах
+        except (KeyError, ValueError):
+            raise ValidationError("Укажите date_from, date_to в формате YYYY-MM-DD и целое duration.")
+
+        if date_to < date_from or (date_to - date_from).days >= self.max_days:
+            raise ValidationError(f"Период должен быть от 1 до {self.max_days} дней.")
+        if duration <= 0:
+            raise ValidationError("Длительность слота должна быть положительной.")
+
+        return Response(utilization_report(date_from, date_to, duration))
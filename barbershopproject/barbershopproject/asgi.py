@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'barbershopproject.settings')
 
 application = get_asgi_application()
+
+# Замер сериализации в метриках запросов (REQUEST_METRICS_SERIALIZER_TIMING), только при обслуживании запросов
+from barbershopproject.metrics import install_serializer_timing  # noqa: E402
+
+install_serializer_timing()
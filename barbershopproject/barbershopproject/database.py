@@ -0,0 +1,100 @@
+"""
+Настройки базы данных из переменных окружения.
+
+DB_ENGINE выбирает профиль:
+* sqlite (по умолчанию) — файл DB_NAME (по умолчанию db.sqlite3). При DB_SQLITE_TUNING=1 (по умолчанию)
+  соединение открывается с журналом WAL, synchronous=NORMAL, отображением файла в память (DB_SQLITE_MMAP_SIZE)
+  и ожиданием блокировки DB_SQLITE_BUSY_TIMEOUT секунд; транзакции начинаются с BEGIN IMMEDIATE, поэтому
+  пишущие транзакции ждут друг друга вместо ошибки «database is locked» при повышении блокировки;
+* postgres — DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT. При DB_POOL=1 используется пул соединений
+  psycopg (размер DB_POOL_MIN_SIZE..DB_POOL_MAX_SIZE), иначе постоянные соединения.
+
+Реплика для чтения включается переменной DB_REPLICA_NAME: остальные параметры реплики берутся
+из DB_REPLICA_* (DB_REPLICA_HOST, DB_REPLICA_TUNING, ...), а при их отсутствии — из соответствующих DB_*.
+
+DB_CONN_MAX_AGE — время жизни соединения в секундах между запросами (0 — новое соединение на каждый запрос),
+DB_CONN_HEALTH_CHECKS=1 — проверка постоянного соединения перед использованием.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+
+def _flag(env, name, default):
+    return env.get(name, default) == '1'
+
+
+def database_config(base_dir, env=None):
+    """
+    Возвращает настройки базы 'default' для DATABASES.
+    """
+
+    env = os.environ if env is None else env
+    engine = env.get('DB_ENGINE', 'sqlite')
+
+    config = {
+        'CONN_MAX_AGE': int(env.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': _flag(env, 'DB_CONN_HEALTH_CHECKS', '1'),
+    }
+
+    if engine == 'sqlite':
+        config.update({
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': env.get('DB_NAME', base_dir / 'db.sqlite3'),
+            # Файловая тестовая база: общая in-memory база SQLite не поддерживает ожидание блокировок между потоками
+            'TEST': {
+                'NAME': env.get('DB_TEST_NAME', base_dir / 'test_db.sqlite3'),
+            },
+        })
+        if _flag(env, 'DB_SQLITE_TUNING', '1'):
+            config['OPTIONS'] = {
+                'timeout': float(env.get('DB_SQLITE_BUSY_TIMEOUT', 20)),  # busy_timeout в секундах
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    f"PRAGMA mmap_size={int(env.get('DB_SQLITE_MMAP_SIZE', 256 * 1024 * 1024))};"
+                ),
+            }
+
+    elif engine == 'postgres':
+        config.update({
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': env.get('DB_NAME', 'barbershop'),
+            'USER': env.get('DB_USER', 'postgres'),
+            'PASSWORD': env.get('DB_PASSWORD', ''),
+            'HOST': env.get('DB_HOST', 'localhost'),
+            'PORT': env.get('DB_PORT', '5432'),
+        })
+        if _flag(env, 'DB_POOL', '0'):
+            # Пул держит соединения сам: постоянные соединения Django с ним несовместимы
+            config['CONN_MAX_AGE'] = 0
+            config['OPTIONS'] = {
+                'pool': {
+                    'min_size': int(env.get('DB_POOL_MIN_SIZE', 2)),
+                    'max_size': int(env.get('DB_POOL_MAX_SIZE', 20)),
+                    'timeout': float(env.get('DB_POOL_TIMEOUT', 10)),
+                },
+            }
+
+    else:
+        raise ImproperlyConfigured(f"Неизвестный DB_ENGINE: {engine!r} (ожидается sqlite или postgres)")
+
+    return config
+
+
+def replica_config(base_dir, env=None):
+    """
+    Возвращает настройки реплики для чтения или None, если DB_REPLICA_NAME не задана.
+    В тестах реплика — зеркало основной базы.
+    """
+
+    env = os.environ if env is None else env
+    if not env.get('DB_REPLICA_NAME'):
+        return None
+
+    replica_env = {**env, **{f"DB_{name[len('DB_REPLICA_'):]}": value
+                             for name, value in env.items() if name.startswith('DB_REPLICA_')}}
+    config = database_config(base_dir, replica_env)
+    config['TEST'] = {'MIRROR': 'default'}
+    return config
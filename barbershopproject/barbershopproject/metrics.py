@@ -0,0 +1,306 @@
+"""
+Метрики стоимости запросов по эндпоинтам.
+
+Middleware считает для каждого имени URL (book_visit, get_available_time, ...)
+количество и время SQL-запросов, время view, время сериализации (свойство data
+сериализаторов, в том числе ленивые запросы при обходе данных; во время view не входит)
+и время рендеринга ответа. Значения хранятся в скользящем окне последних
+запросов, процентили считаются только при чтении статистики.
+
+Замер сериализации подменяет свойство data сериализаторов DRF во всём процессе, поэтому
+включается явно настройкой REQUEST_METRICS_SERIALIZER_TIMING из точек входа WSGI/ASGI;
+без неё serializer_ms равно 0, а время сериализации входит в view_ms.
+"""
+import random
+from collections import defaultdict, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+from functools import wraps
+from threading import Lock
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.serializers import BaseSerializer
+from rest_framework.views import APIView
+
+from barbershopapp import authentication, availability_cache
+from barbershopapp.serializers import VisitHistoryRowSerializer
+
+METRICS = ('total_ms', 'view_ms', 'serializer_ms', 'render_ms', 'sql_ms', 'queries')  # Метрики одного запроса
+QUANTILES = (0.5, 0.95, 0.99)  # Процентили в статистике
+
+
+class MetricsRegistry:
+    """
+    Скользящие окна значений метрик по имени эндпоинта.
+    """
+
+    def __init__(self, window=1024):
+        self.window = window  # Количество последних запросов в окне
+        self._lock = Lock()
+        self._samples = defaultdict(lambda: {metric: deque(maxlen=self.window) for metric in METRICS})
+        self._counts = defaultdict(int)  # Количество замеренных запросов за всё время
+
+    def record(self, name, values):
+        with self._lock:
+            samples = self._samples[name]
+            for metric in METRICS:
+                samples[metric].append(values[metric])
+            self._counts[name] += 1
+
+    def snapshot(self):
+        """
+        Возвращает {эндпоинт: {'count': ..., метрика: {'p50': ..., 'p95': ..., 'p99': ..., 'max': ...}}}.
+        """
+
+        with self._lock:
+            copies = {name: {metric: list(values) for metric, values in samples.items()}
+                      for name, samples in self._samples.items()}
+            counts = dict(self._counts)
+
+        result = {}
+        for name, samples in copies.items():
+            result[name] = {'count': counts[name]}
+            for metric, values in samples.items():
+                values.sort()
+                summary = {f"p{int(quantile * 100)}": percentile(values, quantile) for quantile in QUANTILES}
+                summary['max'] = values[-1] if values else 0
+                result[name][metric] = summary
+
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+def percentile(values, fraction):
+    # Процентиль по отсортированному списку (ближайший ранг)
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+registry = MetricsRegistry()
+
+_timer = ContextVar('request_metrics_timer', default=None)  # Замер текущего запроса
+
+
+def _timed_data(getter):
+    # Свойство data, время которого добавляется к замеру текущего запроса (вложенные вызовы — один раз)
+    @wraps(getter)
+    def data(serializer):
+        timer = _timer.get()
+        if timer is None or timer.serializing:
+            return getter(serializer)
+
+        timer.serializing = True
+        started = perf_counter()
+        try:
+            return getter(serializer)
+        finally:
+            timer.serializer_time += perf_counter() - started
+            timer.serializing = False
+
+    data.timed = True
+    return property(data)
+
+
+def instrument_serializers(classes=(BaseSerializer, VisitHistoryRowSerializer)):
+    """
+    Оборачивает свойство data сериализаторов для замера времени сериализации (один раз на класс).
+    Serializer и ListSerializer вызывают data базового класса, поэтому достаточно BaseSerializer.
+    """
+
+    for cls in classes:
+        prop = cls.__dict__['data']
+        if not getattr(prop.fget, 'timed', False):
+            cls.data = _timed_data(prop.fget)
+
+
+def uninstrument_serializers(classes=(BaseSerializer, VisitHistoryRowSerializer)):
+    """
+    Возвращает исходное свойство data сериализаторов.
+    """
+
+    for cls in classes:
+        prop = cls.__dict__['data']
+        if getattr(prop.fget, 'timed', False):
+            cls.data = property(prop.fget.__wrapped__)
+
+
+def install_serializer_timing():
+    """
+    Включает замер сериализации, если он разрешён настройкой REQUEST_METRICS_SERIALIZER_TIMING
+    и метрики собираются (REQUEST_METRICS_SAMPLE_RATE больше 0). Вызывается из wsgi.py и asgi.py,
+    поэтому в management-командах и тестах свойство data не подменяется.
+    """
+
+    if (getattr(settings, 'REQUEST_METRICS_SERIALIZER_TIMING', False)
+            and getattr(settings, 'REQUEST_METRICS_SAMPLE_RATE', 1.0) > 0):
+        instrument_serializers()
+
+
+class _RequestTimer:
+    """
+    Замер одного запроса: SQL через execute_wrapper, фазы — через хуки middleware.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False  # Идёт замер data внешнего сериализатора
+        self.view_started = None
+        self.view_finished = None
+        self.render_finished = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += perf_counter() - started
+            self.queries += 1
+
+
+class RequestMetricsMiddleware:
+    """
+    Собирает метрики для доли запросов REQUEST_METRICS_SAMPLE_RATE (от 0 до 1).
+    Работает и в синхронной (WSGI), и в асинхронной (ASGI) цепочке, не переключая async-view в поток.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        if random.random() >= getattr(settings, 'REQUEST_METRICS_SAMPLE_RATE', 1.0):
+            return self.get_response(request)
+
+        timer = _RequestTimer()
+        request._metrics_timer = timer
+        token = _timer.set(timer)
+
+        started = perf_counter()
+        try:
+            with self._wrap_connections(timer):
+                response = self.get_response(request)
+        finally:
+            _timer.reset(token)
+
+        self._record(request, timer, started)
+        return response
+
+    async def __acall__(self, request):
+        if random.random() >= getattr(settings, 'REQUEST_METRICS_SAMPLE_RATE', 1.0):
+            return await self.get_response(request)
+
+        timer = _RequestTimer()
+        request._metrics_timer = timer
+        token = _timer.set(timer)  # sync_to_async копирует контекст: замер виден и в потоке view
+
+        started = perf_counter()
+        # Асинхронный ORM выполняет запросы в потоке sync_to_async(thread_sensitive=True) со своими
+        # соединениями: обёртка execute_wrapper ставится и снимается в этом же потоке
+        stack = await sync_to_async(self._wrap_connections, thread_sensitive=True)(timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close, thread_sensitive=True)()
+            _timer.reset(token)
+
+        self._record(request, timer, started)
+        return response
+
+    @staticmethod
+    def _wrap_connections(timer):
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(timer))
+        return stack
+
+    @staticmethod
+    def _record(request, timer, started):
+        finished = perf_counter()
+
+        match = getattr(request, 'resolver_match', None)
+        name = (match.url_name or match.view_name) if match else 'unresolved'
+
+        view_finished = timer.view_finished or finished
+        view_time = view_finished - (timer.view_started or started)
+        registry.record(name, {
+            'total_ms': (finished - started) * 1000,
+            'view_ms': max(0.0, view_time - timer.serializer_time) * 1000,  # Без сериализации
+            'serializer_ms': timer.serializer_time * 1000,
+            'render_ms': ((timer.render_finished or view_finished) - view_finished) * 1000,
+            'sql_ms': timer.sql_time * 1000,
+            'queries': timer.queries,
+        })
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timer = getattr(request, '_metrics_timer', None)
+        if timer:
+            timer.view_started = perf_counter()
+
+    def process_template_response(self, request, response):
+        # DRF-ответы рендерятся после выхода из view: фиксируем границу и конец рендеринга
+        timer = getattr(request, '_metrics_timer', None)
+        if timer:
+            timer.view_finished = perf_counter()
+            response.add_post_render_callback(lambda rendered: setattr(timer, 'render_finished', perf_counter()))
+        return response
+
+
+def _prometheus(snapshot):
+    # Текстовый формат Prometheus: summary с процентилями для каждой метрики
+    lines = []
+    for metric in METRICS:
+        full_name = f"barbershop_request_{metric}"
+        lines.append(f"# TYPE {full_name} summary")
+        for name, stats in sorted(snapshot.items()):
+            for quantile in QUANTILES:
+                value = stats[metric][f"p{int(quantile * 100)}"]
+                lines.append(f'{full_name}{{endpoint="{name}",quantile="{quantile}"}} {value}')
+            lines.append(f'{full_name}_count{{endpoint="{name}"}} {stats["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+# Функция request_metrics
+class RequestMetricsView(APIView):
+    """
+    Статистика стоимости запросов по эндпоинтам в JSON.
+    Доступно только для администраторов.
+    """
+
+    permission_classes = [IsAdminUser]  # Только администраторы
+
+    def get(self, request, *args, **kwargs):
+        return Response({'endpoints': registry.snapshot(), 'availability_cache': availability_cache.stats(),
+                         'auth_token_cache': authentication.stats()})
+
+
+# Функция request_metrics_prometheus
+class PrometheusMetricsView(APIView):
+    """
+    Статистика стоимости запросов по эндпоинтам в текстовом формате Prometheus.
+    Доступно только для администраторов.
+    """
+
+    permission_classes = [IsAdminUser]  # Только администраторы
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(_prometheus(registry.snapshot()), content_type='text/plain; version=0.0.4')
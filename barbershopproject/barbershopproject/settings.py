@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 import os
 from pathlib import Path
 
+from .database import database_config, replica_config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -43,6 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'barbershopproject.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,11 +79,44 @@ WSGI_APPLICATION = 'barbershopproject.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Профиль задаётся переменными окружения DB_* (см. database.py)
 DATABASES = {
+    'default': database_config(BASE_DIR),
+}
+
+# Реплика для чтения свободных слотов, истории визитов и справочников (DB_REPLICA_*, см. barbershopapp/replica.py)
+if replica := replica_config(BASE_DIR):
+    DATABASES['replica'] = replica
+DATABASE_REPLICA = 'replica' if 'replica' in DATABASES else None
+DATABASE_ROUTERS = ['barbershopapp.replica.ReadReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', 5))  # Чтение с основной базы после записи
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Кэш свободных слотов: ключ (зал, длительность услуги, дата), LRU-вытеснение и TTL
+    'availability': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'availability',
+        'TIMEOUT': int(os.environ.get('AVAILABILITY_CACHE_TIMEOUT', 300)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('AVAILABILITY_CACHE_MAX_ENTRIES', 10000)),
+        },
+    },
+    # Кэш аутентификации: хэш токена -> пользователь с профилями клиента и сотрудника
+    'auth_tokens': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'auth_tokens',
+        'TIMEOUT': int(os.environ.get('AUTH_TOKEN_CACHE_TIMEOUT', 60)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('AUTH_TOKEN_CACHE_MAX_ENTRIES', 10000)),
+        },
+    },
 }
 
 
@@ -105,7 +141,7 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_authtoken.auth.AuthTokenAuthentication',
+        'barbershopapp.authentication.CachedAuthTokenAuthentication',
     ),
 }
 
@@ -134,4 +170,12 @@ STATICFILES_DIRS = [
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-REGISTRATION_ENABLED = True
\ No newline at end of file
+REGISTRATION_ENABLED = True
+
+# Доля запросов, для которых собираются метрики стоимости (barbershopproject/metrics.py)
+REQUEST_METRICS_SAMPLE_RATE = float(os.environ.get('REQUEST_METRICS_SAMPLE_RATE', 1.0))
+# Замер времени сериализации (serializer_ms): подменяет свойство data сериализаторов DRF во всём процессе
+REQUEST_METRICS_SERIALIZER_TIMING = os.environ.get('REQUEST_METRICS_SERIALIZER_TIMING', '0') == '1'
+# Материализованная сетка мест залов для get_time_slots (barbershopapp/slot_grid.py).
+# После включения сетки перестраиваются командой rebuild_slot_grid
+SLOT_GRID_ENABLED = os.environ.get('SLOT_GRID_ENABLED', '0') == '1'
@@ -17,9 +17,13 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from .metrics import RequestMetricsView, PrometheusMetricsView
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('barbershopapp.urls')),
     path('auth/', include('rest_authtoken.urls')),
+    path('metrics/', RequestMetricsView.as_view(), name='request_metrics'),
+    path('metrics/prometheus/', PrometheusMetricsView.as_view(), name='request_metrics_prometheus'),
 ]
\ No newline at end of file
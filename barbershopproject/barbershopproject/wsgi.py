@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'barbershopproject.settings')
 
 application = get_wsgi_application()
+
+# Замер сериализации в метриках запросов (REQUEST_METRICS_SERIALIZER_TIMING), только при обслуживании запросов
+from barbershopproject.metrics import install_serializer_timing  # noqa: E402
+
+install_serializer_timing()